@@ -1,14 +1,324 @@
+import argparse
 import csv
+import io
 import os
 import sys
 from pathlib import Path
 from datetime import datetime, timedelta
 
-def load_csv(file_name, output_name):
+from columnar import ColumnarWriter, build_columns, columns_path
+from encounter_filter import EncounterFilter
+from movement_tracks import build_movement_tracks
+from pipeline_io import (COMPRESSION_CHOICES, COMPRESSION_SUFFIXES, PROGRESS_INTERVAL, OffsetLineReader,
+                         EncounterSpill, PipelineCancelled, ProgressFile, SpillingRowBuffer, check_cancelled,
+                         checkpoint_path, compressed_path, file_fingerprint, find_existing,
+                         load_checkpoint, open_reader, open_writer, resolve_compression,
+                         save_checkpoint, sidecar_path)
+
+# Sidecar tables that a resumed run appends to
+APPENDED_SIDECARS = ("boss_tracks", "auras", "positions")
+
+# GUID the combat log writes when a unit has no owner
+NO_OWNER_GUID = "0000000000000000"
+
+class UnitTable:
+    '''
+    Assign every GUID seen in the log a small integer unit id and record
+    the owner of pets and guardians from the advanced-log owner GUID field,
+    so owner roll-ups become an integer lookup instead of a string join.
+    '''
+
+    def __init__(self):
+        self.ids = {}       # GUID -> unit id
+        self.guids = []     # unit id -> GUID
+        self.names = []     # unit id -> last seen name
+        self.owners = []    # unit id -> owner unit id (-1 if none)
+
+    def get_id(self, guid, name=""):
+        if not guid or guid == NO_OWNER_GUID:
+            return -1
+        unit_id = self.ids.get(guid)
+        if unit_id is None:
+            unit_id = len(self.guids)
+            self.ids[guid] = unit_id
+            self.guids.append(guid)
+            self.names.append(name)
+            self.owners.append(-1)
+        elif name and name != "nil":
+            self.names[unit_id] = name
+        return unit_id
+
+    def set_owner(self, guid, owner_guid):
+        if not owner_guid or owner_guid == NO_OWNER_GUID or owner_guid == guid:
+            return
+        unit_id = self.get_id(guid)
+        if unit_id >= 0:
+            self.owners[unit_id] = self.get_id(owner_guid)
+
+    def resolve_owner(self, unit_id):
+        '''Follow owner links to the top-level unit (e.g. a guardian summoned by a pet).'''
+        seen = set()
+        while unit_id >= 0 and self.owners[unit_id] >= 0 and unit_id not in seen:
+            seen.add(unit_id)
+            unit_id = self.owners[unit_id]
+        return unit_id
+
+    def state(self):
+        return {"guids": self.guids, "names": self.names, "owners": self.owners}
+
+    @classmethod
+    def from_state(cls, state):
+        '''Rebuild a table saved with state(), so a resumed run keeps the same unit ids'''
+        table = cls()
+        table.guids = list(state["guids"])
+        table.names = list(state["names"])
+        table.owners = list(state["owners"])
+        table.ids = {guid: unit_id for unit_id, guid in enumerate(table.guids)}
+        return table
+
+    def write(self, path):
+        with path.open(mode='w', encoding='utf-8', newline='') as outfile:
+            writer = csv.writer(outfile)
+            writer.writerow(["unit id", "guid", "name", "owner id"])
+            for unit_id, guid in enumerate(self.guids):
+                owner_id = self.resolve_owner(unit_id)
+                writer.writerow([unit_id, guid, self.names[unit_id],
+                                 owner_id if owner_id != unit_id else -1])
+
+class BossTrackBuilder:
+    '''
+    Collect creature positions from the advanced-log fields while an encounter
+    is running and keep the boss's (time, x, y, facing) track when it ends.
+    Finished tracks go to a temporary file, so only the running pull is in memory.
+    '''
+
+    def __init__(self):
+        self.samples = {}   # creature GUID -> [(time, x, y, facing)]
+        self.counts = {}    # creature GUID -> number of position events
+        self.names = {}     # creature GUID -> name
+        self.tracks = EncounterSpill()  # encounter id -> boss name + sample, per finished encounter
+
+    def start(self):
+        self.samples = {}
+        self.counts = {}
+        self.names = {}
+
+    def add(self, guid, name, relative_time, x_coord, y_coord, facing_direction):
+        if not guid.startswith(("Creature-", "Vehicle-")):
+            return
+        self.counts[guid] = self.counts.get(guid, 0) + 1
+        if name:
+            self.names[guid] = name
+
+        samples = self.samples.setdefault(guid, [])
+        position = (x_coord, y_coord, facing_direction)
+        sample = (f"{relative_time:.3f}",) + position
+        # Store only the first and last sample of a stationary run
+        if len(samples) >= 2 and samples[-1][1:] == position and samples[-2][1:] == position:
+            samples[-1] = sample
+        else:
+            samples.append(sample)
+
+    def finish(self, encounter_id, encounter_name):
+        if not self.counts:
+            return
+        # Prefer the creature named after the encounter, else the busiest one
+        named = [guid for guid, name in self.names.items() if name == encounter_name]
+        candidates = named or list(self.counts)
+        boss_guid = max(candidates, key=lambda guid: self.counts[guid])
+        boss_name = self.names.get(boss_guid, "")
+        self.tracks.add(encounter_id, ([boss_name] + list(sample) for sample in self.samples[boss_guid]))
+        self.start()
+
+    def write(self, path, id_mapping, append=False):
+        with path.open(mode='a' if append else 'w', encoding='utf-8', newline='') as outfile:
+            writer = csv.writer(outfile)
+            if not append:
+                writer.writerow(["encounter id", "boss name", "relative fight time (s)",
+                                 "X coord", "Y coord", "Facing direction"])
+            writer.writerows([id_mapping[enc_id]] + row for enc_id, row in self.tracks if enc_id in id_mapping)
+        self.tracks.close()
+
+class AuraIntervalBuilder:
+    '''
+    Pair aura APPLIED/DOSE/REMOVED events into (unit, spell, start, end, stacks)
+    intervals while an encounter is running. Open intervals are kept in a
+    per-(unit, spell) map and closed at ENCOUNTER_END; a stack change closes
+    the current interval and opens a new one with the new count. Finished
+    encounters' intervals go to a temporary file.
+    '''
+
+    def __init__(self):
+        self.open = {}       # (unit id, spell id) -> [start, stacks, unit name, spell name, aura type]
+        self.intervals = EncounterSpill()  # (unit id, unit name, spell id, spell name, aura type, start, end, stacks)
+        self.current = []
+
+    def start(self):
+        self.open = {}
+        self.current = []
+
+    def _close(self, key, end_time):
+        start_time, stacks, unit_name, spell_name, aura_type = self.open.pop(key)
+        self.current.append((key[0], unit_name, key[1], spell_name, aura_type,
+                             f"{start_time:.3f}", f"{end_time:.3f}", stacks))
+
+    def add(self, event_type, relative_time, unit_id, unit_name, spell_id, spell_name, aura_type, stacks=""):
+        key = (unit_id if unit_id >= 0 else unit_name, spell_id)
+        if event_type == "SPELL_AURA_APPLIED":
+            if key in self.open:
+                self._close(key, relative_time)
+            self.open[key] = [relative_time, 1, unit_name, spell_name, aura_type]
+        elif event_type in ("SPELL_AURA_APPLIED_DOSE", "SPELL_AURA_REMOVED_DOSE"):
+            try:
+                stacks = int(stacks)
+            except ValueError:
+                return
+            # Without an APPLIED the aura was already up when the pull started
+            start_time = 0.0
+            if key in self.open:
+                self._close(key, relative_time)
+                start_time = relative_time
+            self.open[key] = [start_time, stacks, unit_name, spell_name, aura_type]
+        elif event_type == "SPELL_AURA_REFRESH":
+            if key not in self.open:
+                self.open[key] = [0.0, 1, unit_name, spell_name, aura_type]
+        elif event_type == "SPELL_AURA_REMOVED":
+            if key not in self.open:
+                self.open[key] = [0.0, 1, unit_name, spell_name, aura_type]
+            self._close(key, relative_time)
+
+    def finish(self, encounter_id, end_time):
+        for key in list(self.open):
+            self._close(key, end_time)
+        # Intervals of units without a GUID are keyed by name and have no unit id
+        self.intervals.add(encounter_id, ([unit_key if isinstance(unit_key, int) else -1] + rest
+                                          for unit_key, *rest in self.current))
+        self.start()
+
+    def write(self, path, id_mapping, append=False):
+        with path.open(mode='a' if append else 'w', encoding='utf-8', newline='') as outfile:
+            writer = csv.writer(outfile)
+            if not append:
+                writer.writerow(["encounter id", "unit id", "unit name", "spell id", "spell name",
+                                 "Aura type", "start (s)", "end (s)", "stacks"])
+            writer.writerows([id_mapping[enc_id]] + row for enc_id, row in self.intervals if enc_id in id_mapping)
+        self.intervals.close()
+
+class PositionTrackBuilder:
+    '''
+    Compact per-unit movement tracks: consecutive position rows of a unit
+    with the same X/Y/facing/floor collapse into one run of (start, end,
+    count). Runs are kept per encounter id, like the rows of the main
+    output, and the encounter being collected is closed at the next
+    ENCOUNTER_START so rows after an ENCOUNTER_END stay in its tracks.
+    Closed encounters go to a temporary file, so only the open one is in memory.
+    '''
+
+    def __init__(self):
+        self.finished = EncounterSpill()  # runs of closed encounters
+        self.current_id = None   # encounter id of the runs being collected
+        self.current = {}        # unit key -> runs of that unit, last run still growing
+
+    def add(self, encounter_id, unit_id, unit_name, relative_time, x_coord, y_coord, facing_direction, ui_map_id):
+        try:
+            float(x_coord)
+            float(y_coord)
+        except ValueError:
+            return
+        if encounter_id != self.current_id:
+            self.finish()
+            self.current_id = encounter_id
+        key = unit_id if unit_id >= 0 else unit_name
+        runs = self.current.setdefault(key, [])
+        position = [x_coord, y_coord, facing_direction, ui_map_id]
+        if runs and runs[-1][5:] == position:
+            run = runs[-1]
+            run[4] = relative_time
+            run[2] += 1
+        else:
+            # [unit id, unit name, count, start, end, x, y, facing, ui map id]
+            runs.append([unit_id, unit_name, 1, relative_time, relative_time] + position)
+
+    def finish(self):
+        '''Close the runs of the encounter being collected'''
+        if self.current:
+            self.finished.add(self.current_id, (run for unit_runs in self.current.values() for run in unit_runs))
+        self.current_id = None
+        self.current = {}
+
+    def discard(self, encounter_id):
+        '''Drop a rejected pull's runs'''
+        if self.current_id == encounter_id:
+            self.current_id = None
+            self.current = {}
+
+    def state(self):
+        return {"encounter id": self.current_id, "runs": list(self.current.values())}
+
+    @classmethod
+    def from_state(cls, state):
+        '''Continue collecting the encounter saved with state() in a resumed run'''
+        builder = cls()
+        builder.current_id = state["encounter id"]
+        for unit_runs in state["runs"]:
+            key = unit_runs[0][0] if unit_runs[0][0] >= 0 else unit_runs[0][1]
+            builder.current[key] = unit_runs
+        return builder
+
+    def write(self, path, id_mapping, append=False):
+        '''
+        Write finished encounters, then the one still being collected.
+        Returns the file size before the latter, which a resumed run
+        truncates to and writes again.
+        '''
+        with path.open(mode='a' if append else 'w', encoding='utf-8', newline='') as outfile:
+            writer = csv.writer(outfile)
+            if not append:
+                writer.writerow(["encounter id", "unit id", "unit name", "count", "start (s)", "end (s)",
+                                 "X coord", "Y coord", "Facing direction", "ui map id"])
+            writer.writerows([id_mapping[enc_id]] + run for enc_id, run in self.finished if enc_id in id_mapping)
+            self.finished.close()
+            outfile.flush()
+            finished_size = outfile.tell()
+            if self.current_id in id_mapping:
+                writer.writerows([id_mapping[self.current_id]] + run
+                                 for unit_runs in self.current.values() for run in unit_runs)
+        return finished_size
+
+def parse_time(text):
+    return datetime.fromisoformat(text) if text else None
+
+def load_csv(file_name, output_name, encounter_filter=None, compression=None, memory_budget_mb=None,
+             columnar=True, progress=None, cancel=None, resume=False):
     '''
     Load a CSV file, track encounters, calculate relative fight time,
     and track unit positions for UNIT_DIED events.
+
+    encounter_filter (an EncounterFilter) drops unwanted pulls while streaming:
+    difficulty and group size are checked at ENCOUNTER_START, kill/wipe at
+    ENCOUNTER_END.
+
+    The input may be gzip/zstd compressed (picked up automatically), and
+    compression ("gzip" or "zstd") block-compresses the output.
+
+    memory_budget_mb caps the rows held in memory; beyond it rows are spilled
+    to temporary files and merged back while the output is written.
+
+    columnar also writes the rows as typed columns (filtered_combat_log.cols)
+    that the visualizer reads instead of parsing the CSV, and the
+    multi-resolution movement tracks (filtered_combat_log_movement_*.cols).
+
+    progress(bytes_done, bytes_total) is called as the input is read, and
+    setting the cancel event (threading.Event) raises PipelineCancelled.
+
+    Uncompressed runs save a checkpoint (input byte offset, encounter state,
+    unit table and encounter numbering). With resume, only the rows appended
+    to the input since then are read and the results are appended to the
+    output and sidecar tables; a pull still in progress is processed again
+    from its ENCOUNTER_START.
     '''
+    if encounter_filter is None:
+        encounter_filter = EncounterFilter()
     
     # Define the base directory dynamically based on whether running as exe or script
     if getattr(sys, 'frozen', False):
@@ -19,28 +329,106 @@ def load_csv(file_name, output_name):
         base_dir = Path(__file__).resolve().parent
 
     # Construct full paths
-    file_path = base_dir / file_name
-    output_path = base_dir / output_name
+    file_path = find_existing(base_dir / file_name)
+    compression = resolve_compression(compression)
+    output_path = compressed_path(base_dir / output_name, compression)
+
+    # Checkpoints need byte positions in the input and output, so only plain CSVs support them
+    checkpointing = compression is None and file_path.suffix not in COMPRESSION_SUFFIXES.values()
+    checkpoint_file = checkpoint_path(output_path)
+    settings = {"filter": encounter_filter.describe()}
+    checkpoint = None
+    if resume:
+        if not checkpointing:
+            print("Resume needs an uncompressed input and output, processing the whole file")
+        else:
+            checkpoint = load_checkpoint(checkpoint_file, file_path, output_path, settings)
+            # A checkpoint from an older version without every sidecar cannot be continued
+            if checkpoint is not None and (set(checkpoint.get("sidecar_sizes", {})) != set(APPENDED_SIDECARS) or any(
+                    not sidecar_path(output_path, name).exists()
+                    or sidecar_path(output_path, name).stat().st_size < size
+                    for name, size in checkpoint["sidecar_sizes"].items())):
+                checkpoint = None
+            if checkpoint is None:
+                print("No usable checkpoint, processing the whole file")
+    start_offset = 0
+    if checkpoint is not None:
+        start_offset = checkpoint["input_offset"]
+        print(f"Resuming {file_path.name} at byte {start_offset}")
 
+    all_rows = None
     try:
-        with file_path.open(mode='r', encoding='utf-8') as file:
+        with ProgressFile(file_path) as source, (
+                OffsetLineReader(io.BufferedReader(source), start_offset) if checkpointing
+                else open_reader(file_path, source)) as file:
             reader = csv.reader(file)
             
-            all_rows = []
+            memory_budget = memory_budget_mb * 1024 * 1024 if memory_budget_mb else None
+            all_rows = SpillingRowBuffer(memory_budget)
+            encounter_ids_seen = set()
+            rejected_encounters = set()
+
+            def keep_row(new_row):
+                encounter_ids_seen.add(new_row[12])
+                all_rows.append(new_row)
+
             encounter_durations = {}
             header = [
                 "timestamp", "event type", "Damage source", "Spell destination", 
                 "spell id", "spell name", "X coord", "Y coord", "Facing direction", 
                 "Aura type", "map id", "encounter name", "encounter id", 
-                "relative fight time (s)", "unit died sequence"
+                "relative fight time (s)", "unit died sequence",
+                "source unit id", "destination unit id", "ui map id",
+                "difficulty id", "group size", "success"
             ]
-            all_rows.append(header)
             
             current_encounter_id = 0
             current_encounter_start = None
             current_encounter_end = None
             unit_died_counter = 0
             unit_last_positions = {}
+            units = UnitTable()
+            bosses = BossTrackBuilder()
+            auras = AuraIntervalBuilder()
+            positions = PositionTrackBuilder()
+            skip_encounter = False
+            encounter_start_index = None
+            skipped_encounters = 0
+            if checkpoint is not None:
+                state = checkpoint["state"]
+                current_encounter_id = state["encounter_counter"]
+                current_encounter_start = parse_time(state["encounter_start"])
+                current_encounter_end = parse_time(state["encounter_end"])
+                unit_died_counter = state["unit_died_counter"]
+                unit_last_positions = {unit: tuple(position)
+                                       for unit, position in state["unit_last_positions"].items()}
+                skip_encounter = state["skip_encounter"]
+                units = UnitTable.from_state(checkpoint["units"])
+                positions = PositionTrackBuilder.from_state(checkpoint["positions"])
+
+            def add_position(new_row):
+                # The position belongs to the source for casts/swings, else the destination
+                if new_row[1] in source_events:
+                    unit_id, unit_name = new_row[15], new_row[2]
+                else:
+                    unit_id, unit_name = new_row[16], new_row[3]
+                positions.add(new_row[12], unit_id, unit_name, new_row[13],
+                              new_row[6], new_row[7], new_row[8], new_row[17])
+
+            def encounter_state():
+                '''Everything a resumed run needs to carry on from the current row'''
+                return {
+                    "encounter_counter": current_encounter_id,
+                    "encounter_start": current_encounter_start.isoformat() if current_encounter_start else None,
+                    "encounter_end": current_encounter_end.isoformat() if current_encounter_end else None,
+                    "unit_died_counter": unit_died_counter,
+                    "unit_last_positions": dict(unit_last_positions),
+                    "skip_encounter": skip_encounter,
+                }
+
+            # State and input offset from before the ENCOUNTER_START of a pull that has not ended yet
+            open_state = None
+            open_offset = None
             
             group1_events = ["RANGE_DAMAGE", "SPELL_DAMAGE", "SPELL_PERIODIC_DAMAGE",
                              "SPELL_HEAL", "SPELL_PERIODIC_HEAL", "SPELL_CAST_SUCCESS"]
@@ -49,12 +437,20 @@ def load_csv(file_name, output_name):
             destination_events = ["RANGE_DAMAGE", "SPELL_DAMAGE", "SPELL_PERIODIC_DAMAGE",
                                   "SPELL_HEAL", "SPELL_PERIODIC_HEAL", "SWING_DAMAGE_LANDED"]
             
-            for row in reader:
+            for line_number, row in enumerate(reader):
+                if line_number % PROGRESS_INTERVAL == 0:
+                    check_cancelled(cancel)
+                    if progress is not None:
+                        progress(source.bytes_read, source.total)
                 if not row:
                     continue
                 
                 timestamp = row[0].strip()
                 event_type = row[1]
+
+                # Rows of a rejected pull are dropped until the next ENCOUNTER_START
+                if skip_encounter and event_type != "ENCOUNTER_START":
+                    continue
                 
                 try:
                     event_time = datetime.strptime(timestamp, "%m/%d/%Y %H:%M:%S.%f")
@@ -62,24 +458,51 @@ def load_csv(file_name, output_name):
                     event_time = None
                 
                 if event_type == "ENCOUNTER_START":
+                    start_state = encounter_state() if checkpointing else None
+                    open_state = None
                     current_encounter_id += 1
                     current_encounter_start = event_time
                     current_encounter_end = None
                     unit_died_counter = 0
                     unit_last_positions = {}
+                    bosses.start()
+                    auras.start()
+                    positions.finish()
+
+                    skip_encounter = not encounter_filter.allows_start(row[4], row[5])
+                    if skip_encounter:
+                        skipped_encounters += 1
+                        continue
+                    encounter_start_index = len(all_rows)
+                    if start_state is not None:
+                        open_state, open_offset = start_state, file.line_start
                     
                     map_id = row[2]
-                    encounter_name = row[4]
+                    encounter_name = row[3]
                     new_row = [
                         timestamp, event_type, "", "", "", "", "", "", "", "", 
-                        map_id, encounter_name, current_encounter_id, "0.000", str(unit_died_counter)
+                        map_id, encounter_name, current_encounter_id, "0.000", str(unit_died_counter),
+                        -1, -1, "", row[4], row[5], ""
                     ]
-                    all_rows.append(new_row)
+                    keep_row(new_row)
                 
                 elif event_type == "ENCOUNTER_END":
+                    open_state = None
+                    if not encounter_filter.allows_end(row[4], row[5], row[6]):
+                        # Kill/wipe is only known now, drop the pull's buffered rows
+                        if encounter_start_index is not None:
+                            all_rows.truncate(encounter_start_index)
+                        rejected_encounters.add(current_encounter_id)
+                        bosses.start()
+                        auras.start()
+                        positions.discard(current_encounter_id)
+                        skip_encounter = True
+                        skipped_encounters += 1
+                        continue
+
                     current_encounter_end = event_time
                     map_id = row[2]
-                    encounter_name = row[4]
+                    encounter_name = row[3]
                     relative_time = 0.0
                     if current_encounter_start and current_encounter_end:
                         encounter_duration = (current_encounter_end - current_encounter_start).total_seconds()
@@ -88,17 +511,25 @@ def load_csv(file_name, output_name):
                     new_row = [
                         timestamp, event_type, "", "", "", "", "", "", "", "", 
                         map_id, encounter_name, current_encounter_id, 
-                        f"{relative_time:.3f}", str(unit_died_counter)
+                        f"{relative_time:.3f}", str(unit_died_counter), -1, -1, "",
+                        row[4], row[5], row[6]
                     ]
-                    all_rows.append(new_row)
+                    keep_row(new_row)
                     encounter_durations[current_encounter_id] = relative_time
+                    bosses.finish(current_encounter_id, row[3])
+                    auras.finish(current_encounter_id, relative_time)
                 
                 if event_type in group1_events + group2_events:
                     try:
                         if event_type in group1_events:
-                            x_col, y_col, facing_col = 27, 28, 30
+                            x_col, y_col, map_col, facing_col = 27, 28, 29, 30
+                            info_col, owner_col = 13, 14
                         else:
-                            x_col, y_col, facing_col = 24, 25, 27
+                            x_col, y_col, map_col, facing_col = 24, 25, 26, 27
+                            info_col, owner_col = 10, 11
+
+                        # Record pet/guardian owners from the advanced-log fields
+                        units.set_owner(row[info_col], row[owner_col])
 
                         if event_type in source_events:
                             unit = row[3]
@@ -108,11 +539,20 @@ def load_csv(file_name, output_name):
                         x_coord = row[x_col]
                         y_coord = row[y_col]
                         facing_direction = row[facing_col]
+                        ui_map_id = row[map_col]
 
                         try:
                             float(x_coord)
                             float(y_coord)
-                            unit_last_positions[unit] = (x_coord, y_coord, facing_direction)
+                            unit_last_positions[unit] = (x_coord, y_coord, facing_direction, ui_map_id)
+
+                            # Track creature positions for the boss track
+                            if current_encounter_start and current_encounter_end is None and event_time:
+                                info_guid = row[info_col]
+                                info_name = row[3] if info_guid == row[2] else row[7]
+                                bosses.add(info_guid, info_name,
+                                           (event_time - current_encounter_start).total_seconds(),
+                                           x_coord, y_coord, facing_direction)
                         except (ValueError, IndexError):
                             pass
                     except (IndexError, KeyError, ValueError):
@@ -128,20 +568,21 @@ def load_csv(file_name, output_name):
                         spell_dest = row[7]
                         if spell_dest.endswith(("-EU", "-US")):
                             unit_died_counter += 1
-                            x_coord, y_coord, facing_direction = unit_last_positions.get(spell_dest, ("", "", ""))
+                            x_coord, y_coord, facing_direction, ui_map_id = unit_last_positions.get(spell_dest, ("", "", "", ""))
                             new_row = [
                                 timestamp, event_type, "", spell_dest, "", "", 
                                 x_coord, y_coord, facing_direction, "", "", "", current_encounter_id, 
-                                f"{relative_time:.3f}", str(unit_died_counter)
+                                f"{relative_time:.3f}", str(unit_died_counter),
+                                -1, units.get_id(row[6], spell_dest), ui_map_id, "", "", ""
                             ]
-                            all_rows.append(new_row)
+                            keep_row(new_row)
                     except IndexError:
                         new_row = [
                             timestamp, event_type, "", "", "", "", 
                             "", "", "", "", "", "", current_encounter_id, 
-                            f"{relative_time:.3f}", str(unit_died_counter)
+                            f"{relative_time:.3f}", str(unit_died_counter), -1, -1, "", "", "", ""
                         ]
-                        all_rows.append(new_row)
+                        keep_row(new_row)
                 
                 else:
                     if event_type in ["SPELL_AURA_REMOVED", "SPELL_AURA_REFRESH", "SPELL_AURA_APPLIED"]:
@@ -149,13 +590,25 @@ def load_csv(file_name, output_name):
                         spell_id = row[3]
                         spell_name = row[4]
                         aura_type = row[5]
-                        x_coord, y_coord, facing_direction = unit_last_positions.get(spell_dest, ("", "", ""))
+                        # Older filtered logs have no destination GUID column
+                        dest_guid = row[6] if len(row) > 6 else ""
+                        dest_id = units.get_id(dest_guid, spell_dest)
+                        x_coord, y_coord, facing_direction, ui_map_id = unit_last_positions.get(spell_dest, ("", "", "", ""))
                         new_row = [
                             timestamp, event_type, "", spell_dest, spell_id, spell_name, 
                             x_coord, y_coord, facing_direction, aura_type, "", "", current_encounter_id, 
-                            f"{relative_time:.3f}", str(unit_died_counter)
+                            f"{relative_time:.3f}", str(unit_died_counter),
+                            -1, dest_id, ui_map_id, "", "", ""
                         ]
-                        all_rows.append(new_row)
+                        keep_row(new_row)
+                        if current_encounter_start and current_encounter_end is None:
+                            auras.add(event_type, relative_time, dest_id, spell_dest, spell_id, spell_name, aura_type)
+
+                    elif event_type in ["SPELL_AURA_APPLIED_DOSE", "SPELL_AURA_REMOVED_DOSE"]:
+                        # Stack changes only feed the aura interval table
+                        if current_encounter_start and current_encounter_end is None and len(row) > 7:
+                            auras.add(event_type, relative_time, units.get_id(row[6], row[2]), row[2],
+                                      row[3], row[4], row[5], row[7])
                     
                     elif event_type in ["RANGE_DAMAGE", "SPELL_CAST_SUCCESS", "SPELL_HEAL", 
                                         "SPELL_DAMAGE", "SPELL_PERIODIC_DAMAGE", "SPELL_PERIODIC_HEAL"]:
@@ -166,12 +619,16 @@ def load_csv(file_name, output_name):
                         x_coord = row[27]
                         y_coord = row[28]
                         facing_direction = row[30]
+                        ui_map_id = row[29]
                         new_row = [
                             timestamp, event_type, damage_source, spell_dest, spell_id, 
                             spell_name, x_coord, y_coord, facing_direction, "", 
-                            "", "", current_encounter_id, f"{relative_time:.3f}", str(unit_died_counter)
+                            "", "", current_encounter_id, f"{relative_time:.3f}", str(unit_died_counter),
+                            units.get_id(row[2], damage_source), units.get_id(row[6], spell_dest), ui_map_id,
+                            "", "", ""
                         ]
-                        all_rows.append(new_row)
+                        keep_row(new_row)
+                        add_position(new_row)
                     
                     elif event_type in ["SWING_DAMAGE", "SWING_DAMAGE_LANDED"]:
                         damage_source = row[3]
@@ -180,39 +637,161 @@ def load_csv(file_name, output_name):
                         x_coord = row[24]
                         y_coord = row[25]
                         facing_direction = row[27]
+                        ui_map_id = row[26]
                         new_row = [
                             timestamp, event_type, damage_source, spell_dest, spell_id, 
                             "", x_coord, y_coord, facing_direction, "", "", "", 
-                            current_encounter_id, f"{relative_time:.3f}", str(unit_died_counter)
+                            current_encounter_id, f"{relative_time:.3f}", str(unit_died_counter),
+                            units.get_id(row[2], damage_source), units.get_id(row[6], spell_dest), ui_map_id,
+                            "", "", ""
                         ]
-                        all_rows.append(new_row)
+                        keep_row(new_row)
+                        add_position(new_row)
             
             # Process to filter encounters and adjust IDs
             invalid_encounters = {enc_id for enc_id, duration in encounter_durations.items() if duration <= 35}
-            filtered_data_rows = []
-            for row in all_rows[1:]:  # Skip header
-                enc_id = row[12]
-                if enc_id not in invalid_encounters:
-                    filtered_data_rows.append(row)
-            
-            valid_ids = sorted({row[12] for row in filtered_data_rows})
-            id_mapping = {old_id: new_id for new_id, old_id in enumerate(valid_ids, start=1)}
-            
-            for row in filtered_data_rows:
-                old_id = row[12]
-                row[12] = id_mapping.get(old_id, old_id)
-            
-            processed_rows = [all_rows[0]] + filtered_data_rows
+            invalid_encounters |= rejected_encounters
+            next_output_id = 1
+            carried_mapping = {}
+            if checkpoint is not None:
+                # The pull the last run ended in keeps its number, later pulls are numbered after it
+                last = checkpoint["last_encounter"]
+                if last["invalid"]:
+                    invalid_encounters.add(last["id"])
+                elif last["output_id"] is not None:
+                    carried_mapping[last["id"]] = last["output_id"]
+                next_output_id = checkpoint["next_output_id"]
+            valid_ids = sorted(encounter_ids_seen - invalid_encounters - set(carried_mapping))
+            id_mapping = {old_id: new_id for new_id, old_id in enumerate(valid_ids, start=next_output_id)}
+            id_mapping.update(carried_mapping)
+
+            if all_rows.runs:
+                print(f"Spilled {all_rows.spilled} rows to {len(all_rows.runs)} temporary runs")
             
-            with output_path.open(mode='w', encoding='utf-8', newline='') as outfile:
-                writer = csv.writer(outfile)
-                writer.writerows(processed_rows)
+            if checkpoint is not None:
+                # Drop what was written after the checkpoint (an unfinished pull), it is processed again
+                truncate_sizes = [(output_path, checkpoint["output_size"])] + [
+                    (sidecar_path(output_path, name), size) for name, size in checkpoint["sidecar_sizes"].items()]
+                for path, size in truncate_sizes:
+                    with open(path, "r+b") as f:
+                        f.truncate(size)
+
+            cols_path = columns_path(output_path) if columnar else None
+            columns = None
+            output_size = None
+            split_index = encounter_start_index if open_state is not None else None
+            try:
+                with open_writer(output_path, compression, append=checkpoint is not None) as outfile:
+                    writer = csv.writer(outfile)
+                    if checkpoint is None:
+                        writer.writerow(header)
+                        if cols_path is not None:
+                            columns = ColumnarWriter(cols_path, header)
+                    # Stream rows back (merging any spilled runs) and renumber encounters
+                    for index, row in enumerate(all_rows):
+                        if index == split_index:
+                            # The next run resumes before the unfinished pull's rows
+                            output_size = outfile.tell()
+                        old_id = int(row[12])
+                        if old_id in invalid_encounters:
+                            continue
+                        row[12] = id_mapping.get(old_id, old_id)
+                        writer.writerow(row)
+                        if columns is not None:
+                            columns.append(row)
+                    if checkpointing and output_size is None:
+                        output_size = outfile.tell()
+                # Finish the columns after the CSV so they are never older than it
+                if columns is not None:
+                    columns.close()
+                    columns = None
+                elif checkpoint is not None and cols_path is not None:
+                    # Rows were appended, so rebuild the columns from the whole CSV
+                    build_columns(output_path, cols_path)
+            finally:
+                all_rows.close()
+                if columns is not None:
+                    columns.discard()
+
+            units_path = sidecar_path(output_path, "units")
+            units.write(units_path)
+
+            boss_tracks_path = sidecar_path(output_path, "boss_tracks")
+            bosses.write(boss_tracks_path, id_mapping, append=checkpoint is not None)
+
+            auras_path = sidecar_path(output_path, "auras")
+            auras.write(auras_path, id_mapping, append=checkpoint is not None)
+
+            positions_path = sidecar_path(output_path, "positions")
+            positions_size = positions.write(positions_path, id_mapping, append=checkpoint is not None)
+            # Resampled from the whole positions table, so a resumed run rebuilds them too
+            movement_paths = build_movement_tracks(output_path) if columnar else []
+
+            if checkpointing:
+                if open_state is not None:
+                    state, input_offset = open_state, open_offset
+                else:
+                    state, input_offset = encounter_state(), file.offset
+                last_id = state["encounter_counter"]
+                save_checkpoint(checkpoint_file, {
+                    "input_offset": input_offset,
+                    "input_fingerprint": file_fingerprint(file_path, input_offset),
+                    "output_size": output_size,
+                    "sidecar_sizes": {name: sidecar_path(output_path, name).stat().st_size
+                                      if name != "positions" else positions_size
+                                      for name in APPENDED_SIDECARS},
+                    "state": state,
+                    "units": units.state(),
+                    # An unfinished pull is read again, so its position runs start over
+                    "positions": positions.state() if open_state is None else PositionTrackBuilder().state(),
+                    "last_encounter": {"id": last_id, "output_id": id_mapping.get(last_id),
+                                       "invalid": last_id in invalid_encounters},
+                    "next_output_id": max([new_id for old_id, new_id in id_mapping.items() if old_id <= last_id],
+                                          default=next_output_id - 1) + 1,
+                    "settings": settings,
+                })
         
+        if skipped_encounters:
+            print(f"Skipped {skipped_encounters} encounters ({encounter_filter.describe()})")
         print(f"Filtered CSV successfully created: {output_path}")
+        print(f"Unit owner table created: {units_path}")
+        print(f"Boss position tracks created: {boss_tracks_path}")
+        print(f"Aura intervals created: {auras_path}")
+        print(f"Position tracks created: {positions_path}")
+        for movement_file in movement_paths:
+            print(f"Movement tracks created: {movement_file}")
+        if cols_path is not None:
+            print(f"Columnar data created: {cols_path}")
+        if progress is not None:
+            progress(source.total, source.total)
+        return output_path
+    except PipelineCancelled:
+        raise
     except Exception as e:
         print(f"Error processing CSV: {e}")
+        return None
+    finally:
+        # Spilled rows are left behind if reading stopped early
+        if all_rows is not None:
+            all_rows.close()
 
 if __name__ == "__main__":
-    input_file = "combat_log_with_floats.csv"
-    output_file = "filtered_combat_log.csv"
-    load_csv(input_file, output_file)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Process the filtered combat log into encounter data")
+    EncounterFilter.add_arguments(parser)
+    parser.add_argument("--compress", choices=COMPRESSION_CHOICES, default="none",
+                        help="Block-compress the output CSV on a background thread pool")
+    parser.add_argument("--input", default="combat_log_with_floats.csv",
+                        help="Input CSV from the log filter, relative to the program folder unless absolute")
+    parser.add_argument("--output", default="filtered_combat_log.csv",
+                        help="Output CSV path, relative to the program folder unless absolute")
+    parser.add_argument("--memory-budget", type=float, default=None,
+                        help="MB of rows to keep in memory before spilling to temporary files")
+    parser.add_argument("--no-columnar", action="store_true",
+                        help="Skip writing the typed columnar files the visualizer loads from")
+    parser.add_argument("--resume", action="store_true",
+                        help="Only process rows appended to the input since the last run's checkpoint")
+    args = parser.parse_args()
+
+    if load_csv(args.input, args.output, EncounterFilter.from_args(args), args.compress,
+                args.memory_budget, not args.no_columnar, resume=args.resume) is None:
+        sys.exit(1)
\ No newline at end of file
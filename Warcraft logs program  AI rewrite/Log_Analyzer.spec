@@ -7,7 +7,14 @@ a = Analysis(
     datas=[
         ('main_UI.py', '.'),
         ('log_filter one.py', '.'),
-        ('CSVtoCSV.py', '.')
+        ('CSVtoCSV.py', '.'),
+        ('encounter_filter.py', '.'),
+        ('position_sampler.py', '.'),
+        ('pipeline_io.py', '.'),
+        ('columnar.py', '.'),
+        ('movement_tracks.py', '.'),
+        ('combat_store.py', '.'),
+        ('log_watcher.py', '.')
     ],
     hiddenimports=['tkinterdnd2'],
     hookspath=[],
@@ -1,49 +1,78 @@
 import tkinter as tk
-from tkinter import filedialog, messagebox
+from tkinter import ttk, filedialog, messagebox
 import os
 import sys
+import time
+import queue
+import itertools
 import threading
+import multiprocessing
 import subprocess
 from tkinterdnd2 import DND_FILES, TkinterDnD
 
+from encounter_filter import EncounterFilter, parse_difficulties
+from position_sampler import PositionSampler
+from pipeline import STAGE_NAMES, PipelineJob, PipelineRunner, default_workers
+from pipeline_io import FolderLock
+import log_watcher
+
 class LogAnalyzerGUI:
     def __init__(self, root):
         self.root = root
         self.root.title("WoW Raid Log Analyzer")
-        self.root.geometry("800x400")
+        self.root.geometry("1200x450")
         
-        self.selected_file = None
         self.csv_output_dir = None
+        # Jobs run in parallel worker processes, one per core
+        self.runner = PipelineRunner(default_workers(), processes=True)
+        self.jobs = {}  # job id -> job state shown in the job list
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         
         # Use the directory of the executable if running as an executable
         if getattr(sys, 'frozen', False):
             current_dir = os.path.dirname(sys.executable)
         else:
             current_dir = os.path.dirname(os.path.abspath(__file__))
+        # Each job writes into its own folder so parallel jobs never share files
+        self.output_root = os.path.join(current_dir, "processed_logs")
         
         # Left Side - Log Filtering
         left_frame = tk.Frame(root)
         left_frame.pack(side=tk.LEFT, padx=20, pady=10)
         
-        self.select_button = tk.Button(left_frame, text="Select Log File", command=self.select_file)
+        self.select_button = tk.Button(left_frame, text="Select Log Files", command=self.select_file)
         self.select_button.pack(pady=5)
         
-        self.drop_area = tk.Label(left_frame, text="Drag and Drop Log File Here", relief="solid", width=50, height=5)
+        self.drop_area = tk.Label(left_frame, text="Drag and Drop Log Files Here", relief="solid", width=50, height=5)
         self.drop_area.pack(pady=5)
         
         self.drop_area.drop_target_register(DND_FILES)
         self.drop_area.dnd_bind('<<Drop>>', self.drop_log_file)
         
-        self.file_label = tk.Label(left_frame, text="No file selected", wraplength=400)
+        self.file_label = tk.Label(left_frame, text="Selected logs are queued for filtering and CSV processing",
+                                   wraplength=400)
         self.file_label.pack()
         
-        self.process_button = tk.Button(left_frame, text="Run Log Filter", command=self.run_log_filter_thread, state=tk.DISABLED)
-        self.process_button.pack(pady=5)
-        
-        self.csv_process_button = tk.Button(left_frame, text="Run CSV Processing", command=self.run_csv_processing_thread, state=tk.DISABLED)
-        self.csv_process_button.pack(pady=5)
+        # Encounter filters applied while the log is streamed
+        filter_frame = tk.Frame(left_frame)
+        filter_frame.pack(pady=5)
+        self.kills_only_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(filter_frame, text="Kills only", variable=self.kills_only_var).pack(side=tk.LEFT)
+        tk.Label(filter_frame, text="Difficulty:").pack(side=tk.LEFT, padx=(10, 2))
+        self.difficulty_var = tk.StringVar(value="All difficulties")
+        ttk.Combobox(filter_frame, textvariable=self.difficulty_var, state="readonly", width=16,
+                     values=["All difficulties", "Mythic", "Heroic", "Normal", "Skip LFR"]).pack(side=tk.LEFT)
+
+        # Compress the intermediate and processed CSVs (helps on slow network shares)
+        self.compress_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(left_frame, text="Compress output (gzip)", variable=self.compress_var).pack()
+
+        # Preview: sampled positions (one per unit per second) for a quick look at the map overlay
+        self.preview_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(left_frame, text="Fast preview (sampled positions)", variable=self.preview_var).pack()
         
-        self.status_label = tk.Label(left_frame, text="")
+        self.status_label = tk.Label(left_frame, text=f"Running up to {self.runner.workers} jobs at once",
+                                     wraplength=400)
         self.status_label.pack(pady=5)
         
         self.csv_output_entry = tk.Entry(left_frame, width=50)
@@ -51,57 +80,244 @@ class LogAnalyzerGUI:
         
         self.open_folder_button = tk.Button(left_frame, text="Open CSV Folder", command=self.open_csv_folder, state=tk.DISABLED)
         self.open_folder_button.pack(pady=5)
+
+        self.watcher = None  # LogWatcher running on a background thread
+        self.watch_button = tk.Button(left_frame, text="Watch Logs Folder...", command=self.toggle_watcher)
+        self.watch_button.pack(pady=5)
+
+        # Right Side - Job Queue
+        right_frame = tk.Frame(root)
+        right_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+        columns = ("log", "status", "progress", "elapsed", "throughput")
+        self.job_tree = ttk.Treeview(right_frame, columns=columns, show="headings", height=14)
+        for column, heading, width in (("log", "Log", 200), ("status", "Status", 110),
+                                       ("progress", "Progress", 70), ("elapsed", "Elapsed", 70),
+                                       ("throughput", "Throughput", 90)):
+            self.job_tree.heading(column, text=heading)
+            self.job_tree.column(column, width=width, anchor=tk.W if column == "log" else tk.CENTER)
+        self.job_tree.pack(fill=tk.BOTH, expand=True)
+        self.job_tree.bind("<<TreeviewSelect>>", self.on_job_select)
+
+        job_buttons = tk.Frame(right_frame)
+        job_buttons.pack(pady=5)
+        tk.Button(job_buttons, text="Cancel Selected", command=self.cancel_job).pack(side=tk.LEFT, padx=5)
+        tk.Button(job_buttons, text="Clear Finished", command=self.clear_finished).pack(side=tk.LEFT, padx=5)
+        tk.Button(job_buttons, text="Open in Visualizer", command=self.open_in_visualizer).pack(side=tk.LEFT, padx=5)
+
+        self.root.after(200, self.poll_events)
     
     def select_file(self):
-        file_path = filedialog.askopenfilename(filetypes=[("Text Files", "*.txt"), ("All Files", "*.*")])
-        if file_path:
-            self._set_log_file(file_path)
+        file_paths = filedialog.askopenfilenames(filetypes=[("Text Files", "*.txt"), ("All Files", "*.*")])
+        if file_paths:
+            self.queue_logs(file_paths)
     
     def drop_log_file(self, event):
-        file_path = event.data.strip('{}"\'')
-        if os.path.isfile(file_path) and file_path.lower().endswith('.txt'):
-            self._set_log_file(file_path)
+        file_paths = [path for path in self.root.tk.splitlist(event.data)
+                      if os.path.isfile(path) and path.lower().endswith('.txt')]
+        if file_paths:
+            self.queue_logs(file_paths)
         else:
-            messagebox.showwarning("Invalid File", "Please drop a .txt log file.")
-    
-    def _set_log_file(self, file_path):
-        self.selected_file = file_path
-        self.file_label.config(text=f"Selected: {os.path.basename(file_path)}")
-        self.process_button.config(state=tk.NORMAL)
+            messagebox.showwarning("Invalid File", "Please drop .txt log files.")
     
-    def run_log_filter_thread(self):
-        threading.Thread(target=self.process_log, daemon=True).start()
-    
-    def run_csv_processing_thread(self):
-        threading.Thread(target=self.process_csv, daemon=True).start()
+    def encounter_filter(self):
+        difficulty = self.difficulty_var.get()
+        return EncounterFilter(
+            kills_only=self.kills_only_var.get(),
+            difficulties=parse_difficulties(difficulty) if difficulty in ("Mythic", "Heroic", "Normal") else None,
+            skip_difficulties=parse_difficulties("lfr") if difficulty == "Skip LFR" else None,
+        )
+
+    def job_folder(self, log_path, job_id):
+        """
+        Output folder for a job, named after the log, and its lock. A folder another
+        writer holds (an unfinished job or the log watcher) is skipped for a numbered one.
+        """
+        stem = os.path.splitext(os.path.basename(log_path))[0]
+        names = itertools.chain([stem], (f"{stem}_{job_id}_{n}" if n else f"{stem}_{job_id}"
+                                         for n in itertools.count()))
+        for name in names:
+            folder = os.path.join(self.output_root, name)
+            lock = FolderLock(folder)
+            if lock.acquire():
+                return folder, lock
+
+    def queue_logs(self, file_paths):
+        """Queue one job (log filter then CSV processing) per log"""
+        encounter_filter = self.encounter_filter()
+        compression = "gzip" if self.compress_var.get() else None
+        preview = self.preview_var.get()
+        # Preview files get their own names so they never replace a full run's output
+        suffix = "_preview" if preview else ""
+        for log_path in file_paths:
+            job = PipelineJob(log_path, encounter_filter=encounter_filter, compression=compression,
+                              sampler=PositionSampler(bucket_seconds=1.0) if preview else None)
+            folder, lock = self.job_folder(log_path, job.id)
+            job.floats_csv = os.path.join(folder, f"combat_log_with_floats{suffix}.csv")
+            job.output_csv = os.path.join(folder, f"filtered_combat_log{suffix}.csv")
+            item = self.job_tree.insert("", tk.END, values=(os.path.basename(log_path), "Queued", "", "", ""))
+            self.jobs[job.id] = {
+                "job": job,
+                "future": self.runner.submit(job),
+                "item": item,
+                "folder": folder,
+                "lock": lock,
+                "log_size": os.path.getsize(log_path),
+                "status": "Queued",
+                "stage": None,
+                "started": None,
+                "stage_started": None,
+                "finished": None,
+                "done": 0,
+                "total": 0,
+                "output": None,
+            }
+        self.status_label.config(text=f"Queued {len(file_paths)} log(s), running up to {self.runner.workers} at once")
+
+    def selected_jobs(self):
+        items = set(self.job_tree.selection())
+        return [state for state in self.jobs.values() if state["item"] in items]
+
+    def cancel_job(self):
+        for state in self.selected_jobs():
+            if state["finished"] is not None:
+                continue
+            state["job"].cancel()
+            if state["future"].cancel():
+                # Never started, so no worker will report it
+                self.finish(state, "Cancelled")
+            else:
+                state["status"] = "Cancelling"
+                self.update_row(state)
+
+    def clear_finished(self):
+        for job_id, state in list(self.jobs.items()):
+            if state["finished"] is not None:
+                self.job_tree.delete(state["item"])
+                del self.jobs[job_id]
+
+    def on_job_select(self, event=None):
+        jobs = self.selected_jobs()
+        if jobs:
+            self.csv_output_dir = jobs[0]["folder"]
+            self.csv_output_entry.delete(0, tk.END)
+            self.csv_output_entry.insert(0, self.csv_output_dir)
+            self.open_folder_button.config(state=tk.NORMAL)
+
+    def poll_events(self):
+        """Apply worker events on the Tk thread and refresh the running jobs' timers"""
+        while True:
+            try:
+                event = self.runner.events.get_nowait()
+            except queue.Empty:
+                break
+            kind, job_id, stage = event[:3]
+            state = self.jobs.get(job_id)
+            if state is None or state["finished"] is not None:
+                continue
+            if kind == "started":
+                now = time.time()
+                state["started"] = state["started"] or now
+                state["stage_started"] = now
+                state["stage"] = stage
+                state["done"], state["total"] = 0, 0
+                if state["status"] != "Cancelling":
+                    state["status"] = STAGE_NAMES[stage]
+            elif kind == "progress":
+                state["done"], state["total"] = event[3:]
+            elif kind == "done":
+                if stage == state["job"].stages[-1]:
+                    state["output"] = str(event[3])
+                    self.finish(state, "Done")
+                    self.status_label.config(text=f"Finished {os.path.basename(str(state['job'].log_path))}")
+            elif kind == "cancelled":
+                self.finish(state, "Cancelled")
+            else:
+                self.finish(state, "Failed")
+                self.status_label.config(text=f"{os.path.basename(str(state['job'].log_path))}: {event[3]}")
+
+        for state in self.jobs.values():
+            if state["started"] is not None and state["finished"] is None:
+                self.update_row(state)
+        self.root.after(200, self.poll_events)
+
+    def finish(self, state, status):
+        state["status"] = status
+        state["finished"] = time.time()
+        state["lock"].release()
+        self.update_row(state)
+
+    def update_row(self, state):
+        progress = elapsed = throughput = ""
+        if state["started"] is not None:
+            end = state["finished"] or time.time()
+            elapsed = f"{end - state['started']:.1f}s"
+            if state["status"] == "Done":
+                # Whole job: log size over total time
+                progress = "100%"
+                throughput = f"{state['log_size'] / 1024 / 1024 / max(end - state['started'], 1e-6):.1f} MB/s"
+            elif state["total"]:
+                # Running stage: bytes read over the stage's time
+                stage_index = state["job"].stages.index(state["stage"])
+                fraction = (stage_index + state["done"] / state["total"]) / len(state["job"].stages)
+                progress = f"{fraction * 100:.0f}%"
+                stage_time = max(end - state["stage_started"], 1e-6)
+                throughput = f"{state['done'] / 1024 / 1024 / stage_time:.1f} MB/s"
+        self.job_tree.item(state["item"], values=(
+            os.path.basename(str(state["job"].log_path)), state["status"], progress, elapsed, throughput))
     
-    def process_log(self):
-        if self.selected_file:
-            self.status_label.config(text="Running Log Filter... Please wait.")
-            script_path = os.path.join(os.path.dirname(__file__), "log_filter one.py")
-            os.system(f"python \"{script_path}\" \"{self.selected_file}\"")
-            self.csv_process_button.config(state=tk.NORMAL)
-            self.status_label.config(text="Log Filter Complete!")
+    def on_close(self):
+        if self.watcher is not None:
+            self.watcher.stop()
+        # Stop running stages at their next check so the worker processes can exit
+        for state in self.jobs.values():
+            if state["finished"] is None:
+                state["job"].cancel()
+        self.runner.shutdown()
+        self.root.destroy()
+
+    def toggle_watcher(self):
+        """Start or stop the background watcher that auto-processes new logs in a folder"""
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
+            self.watch_button.config(text="Watch Logs Folder...")
+            self.status_label.config(text="Log watcher stopped")
+            return
+
+        folder = filedialog.askdirectory(title="Select WoW Logs Folder")
+        if not folder:
+            return
+        # Runs in this process, so it works the same from the frozen executable
+        self.watcher = log_watcher.LogWatcher(
+            folder, log_watcher.current_dir / "processed_logs",
+            log_watcher.current_dir / "log_watcher_state.json",
+            encounter_filter=self.encounter_filter(),
+            compress="gzip" if self.compress_var.get() else "none")
+        threading.Thread(target=self.watcher.watch, daemon=True).start()
+        self.watch_button.config(text="Stop Watching")
+        self.status_label.config(text=f"Watching {folder} for new logs")
+
+    def open_in_visualizer(self):
+        """Open the selected finished job's processed CSV in the visualizer"""
+        outputs = [state["output"] for state in self.selected_jobs() if state["output"]]
+        if not outputs:
+            messagebox.showinfo("Open in Visualizer", "Select a finished job first.")
+            return
+        if getattr(sys, 'frozen', False):
+            args = [os.path.join(os.path.dirname(sys.executable), "Combat_Visualizer.exe"), outputs[0]]
         else:
-            messagebox.showwarning("No File", "Please select a file first.")
-    
-    def process_csv(self):
-        self.status_label.config(text="Processing CSV... Please wait.")
-        script_path = os.path.join(os.path.dirname(__file__), "CSVtoCSV.py")
-        os.system(f"python \"{script_path}\"")
-        
-        self.csv_output_dir = os.path.dirname(script_path)
-        self.csv_output_entry.delete(0, tk.END)
-        self.csv_output_entry.insert(0, self.csv_output_dir)
-        self.open_folder_button.config(state=tk.NORMAL)
-        
-        self.status_label.config(text="CSV Processing Complete!")
-    
+            args = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "main_UI.py"),
+                    outputs[0]]
+        subprocess.Popen(args)
+
     def open_csv_folder(self):
         if self.csv_output_dir:
             subprocess.Popen(f'explorer "{self.csv_output_dir}"', shell=True)
 
 if __name__ == "__main__":
+    # Worker processes of the frozen executable must not start the UI
+    multiprocessing.freeze_support()
     root = TkinterDnD.Tk()
     app = LogAnalyzerGUI(root)
     root.mainloop()
\ No newline at end of file
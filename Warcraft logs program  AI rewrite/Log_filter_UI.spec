@@ -16,6 +16,13 @@ a = Analysis(
     datas=[
         ('log_filter one.py', '.'),
         ('CSVtoCSV.py', '.'),
+        ('encounter_filter.py', '.'),
+        ('position_sampler.py', '.'),
+        ('pipeline_io.py', '.'),
+        ('pipeline.py', '.'),
+        ('columnar.py', '.'),
+        ('movement_tracks.py', '.'),
+        ('log_watcher.py', '.'),
         (str(tkdnd_path), 'tkinterdnd2'),
     ],
     hiddenimports=[],
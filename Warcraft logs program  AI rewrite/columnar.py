@@ -0,0 +1,267 @@
+'''
+Typed columnar handoff between CSVtoCSV and the visualizer.
+
+While CSVtoCSV writes the filtered CSV it also writes the same rows as typed
+columns into one file (filtered_combat_log.cols). main_UI reads that file
+instead of parsing the CSV again: numeric and timestamp columns are read
+straight into arrays of their final type, and text columns are stored once as
+a string table plus int32 codes. The reader copies the columns rather than
+mapping the file, since Windows cannot replace a file that is mapped and the
+visualizer keeps the columns while the log may be processed again.
+
+File layout: MAGIC, an 8 byte little-endian header length, a JSON header
+(row count, byte order, and per column: name, kind, dtype, offset,
+categories), then each column's raw values aligned to 64 bytes.
+'''
+import csv
+import json
+import math
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from pipeline_io import open_reader, strip_compression_suffix
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+MAGIC = b"WCLCOLS1"
+ALIGNMENT = 64
+FLUSH_ROWS = 65536
+NAT = -2 ** 63  # numpy's NaT for datetime64
+EPOCH = datetime(1970, 1, 1)
+TIMESTAMP_FORMAT = "%m/%d/%Y %H:%M:%S.%f"
+
+# kind -> (array typecode, numpy dtype)
+KINDS = {
+    "timestamp": ("q", "i8"),   # nanoseconds since the epoch, NaT if unparsable
+    "int": ("q", "i8"),         # -1 if missing
+    "int32": ("i", "i4"),       # -1 if missing
+    "float": ("d", "f8"),       # NaN if missing
+    "float32": ("f", "f4"),     # NaN if missing, for coordinates
+    "text": ("i", "i4"),        # index into the string table, -1 if missing
+}
+
+# Column kinds for the CSVtoCSV output and movement tracks, anything else is text.
+# Coordinates and ids are stored at the width main_UI keeps them in memory, so
+# the columns read are used as they are; fight times keep full precision.
+COLUMN_KINDS = {
+    "timestamp": "timestamp",
+    "spell id": "int32",
+    "X coord": "float32",
+    "Y coord": "float32",
+    "Facing direction": "float32",
+    "map id": "float",
+    "encounter id": "int32",
+    "relative fight time (s)": "float",
+    "unit died sequence": "int32",
+    "source unit id": "int32",
+    "destination unit id": "int32",
+    "unit id": "int32",
+    "ui map id": "float",
+    "difficulty id": "float",
+    "group size": "float",
+    "success": "float",
+}
+
+# Boolean column both visualizer backends (in-memory frame and indexed store)
+# add at load, so the plots read coordinates without checking them again
+VALID_COLUMN = "has position"
+
+def valid_positions(x, y):
+    '''The VALID_COLUMN rule: X and Y are both finite, so NaN and +-inf are rejected alike'''
+    return np.isfinite(x) & np.isfinite(y)
+
+def columns_path(csv_path):
+    '''Columnar file for a processed CSV, e.g. filtered_combat_log.cols'''
+    return strip_compression_suffix(csv_path).with_suffix(".cols")
+
+def is_fresh(cols_path, csv_path):
+    '''True if the columnar file exists and was written after the CSV'''
+    cols_path, csv_path = Path(cols_path), Path(csv_path)
+    return cols_path.exists() and cols_path.stat().st_mtime >= csv_path.stat().st_mtime
+
+class ColumnarWriter:
+    '''
+    Collects rows as typed arrays, flushing each column to its own temporary
+    file so memory stays bounded, and joins them into one file on close.
+    '''
+
+    def __init__(self, path, header):
+        self.path = Path(path)
+        self.header = list(header)
+        self.kinds = [COLUMN_KINDS.get(name, "text") for name in self.header]
+        self.temp_dir = tempfile.mkdtemp(prefix="wow_cols_", dir=self.path.parent)
+        self.buffers = [array(KINDS[kind][0]) for kind in self.kinds]
+        self.files = [open(os.path.join(self.temp_dir, f"{i}.bin"), "wb") for i in range(len(self.header))]
+        self.categories = [{} if kind == "text" else None for kind in self.kinds]
+        self.rows = 0
+        self.last_timestamp = (None, NAT)
+
+    def timestamp_ns(self, text):
+        # Consecutive events often share a timestamp, so remember the last one
+        if text == self.last_timestamp[0]:
+            return self.last_timestamp[1]
+        try:
+            value = (datetime.strptime(text, TIMESTAMP_FORMAT) - EPOCH) // timedelta(microseconds=1) * 1000
+        except (TypeError, ValueError):
+            value = NAT
+        self.last_timestamp = (text, value)
+        return value
+
+    def append(self, row):
+        for i, kind in enumerate(self.kinds):
+            value = row[i] if i < len(row) else ""
+            if kind == "text":
+                if value == "" or value is None:
+                    code = -1
+                else:
+                    key = value if isinstance(value, str) else str(value)
+                    codes = self.categories[i]
+                    code = codes.get(key)
+                    if code is None:
+                        code = codes[key] = len(codes)
+                self.buffers[i].append(code)
+            elif kind in ("float", "float32"):
+                try:
+                    self.buffers[i].append(float(value))
+                except (TypeError, ValueError):
+                    self.buffers[i].append(math.nan)
+            elif kind in ("int", "int32"):
+                try:
+                    self.buffers[i].append(int(value))
+                except (TypeError, ValueError):
+                    self.buffers[i].append(-1)
+            else:
+                self.buffers[i].append(self.timestamp_ns(value))
+        self.rows += 1
+        if self.rows % FLUSH_ROWS == 0:
+            self.flush()
+
+    def flush(self):
+        for buffer, f in zip(self.buffers, self.files):
+            buffer.tofile(f)
+            del buffer[:]
+
+    def close(self):
+        '''Write the final file (atomically) and remove the temporary columns'''
+        try:
+            self.flush()
+            for f in self.files:
+                f.close()
+
+            columns = []
+            offset = 0
+            for i, (name, kind) in enumerate(zip(self.header, self.kinds)):
+                size = os.path.getsize(os.path.join(self.temp_dir, f"{i}.bin"))
+                column = {"name": name, "kind": kind, "dtype": KINDS[kind][1], "offset": offset}
+                if kind == "text":
+                    column["categories"] = list(self.categories[i])
+                columns.append(column)
+                offset += -(-size // ALIGNMENT) * ALIGNMENT
+            header = json.dumps({"rows": self.rows, "byteorder": sys.byteorder, "columns": columns}).encode("utf-8")
+            data_start = -(-(len(MAGIC) + 8 + len(header)) // ALIGNMENT) * ALIGNMENT
+
+            tmp_path = self.path.with_name(self.path.name + ".tmp")
+            with open(tmp_path, "wb") as out:
+                out.write(MAGIC + struct.pack("<Q", len(header)) + header)
+                for i, column in enumerate(columns):
+                    out.seek(data_start + column["offset"])
+                    with open(os.path.join(self.temp_dir, f"{i}.bin"), "rb") as f:
+                        while True:
+                            chunk = f.read(1024 * 1024)
+                            if not chunk:
+                                break
+                            out.write(chunk)
+                out.truncate(data_start + offset)
+            os.replace(tmp_path, self.path)
+        finally:
+            self.discard()
+
+    def discard(self):
+        for f in self.files:
+            f.close()
+        for i in range(len(self.header)):
+            try:
+                os.remove(os.path.join(self.temp_dir, f"{i}.bin"))
+            except OSError:
+                pass
+        try:
+            os.rmdir(self.temp_dir)
+        except OSError:
+            pass
+
+def build_columns(csv_path, cols_path=None):
+    '''Write the columnar file for an existing processed CSV, e.g. after rows were appended to it'''
+    csv_path = Path(csv_path)
+    cols_path = Path(cols_path) if cols_path else columns_path(csv_path)
+    with open_reader(csv_path) as f:
+        reader = csv.reader(f)
+        columns = ColumnarWriter(cols_path, next(reader))
+        try:
+            for row in reader:
+                columns.append(row)
+        except BaseException:
+            columns.discard()
+            raise
+    columns.close()
+    return cols_path
+
+def read_columns(path, exclude=(), text_codes=False):
+    '''
+    Read a columnar file. Returns {name: array}; numeric columns are read
+    straight into arrays of their stored dtype, timestamps as datetime64[ns]
+    and text columns are object arrays built from the string table (NaN where
+    missing). The arrays own their memory, so the file can be replaced while
+    they are in use.
+
+    Columns named in exclude are left out. With text_codes, text columns are
+    (codes, categories) pairs instead, ready for pd.Categorical.from_codes.
+    '''
+    if np is None:
+        raise RuntimeError("numpy is required to read columnar files")
+    path = Path(path)
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path.name} is not a columnar combat log file")
+        header_len = struct.unpack("<Q", f.read(8))[0]
+        header = json.loads(f.read(header_len).decode("utf-8"))
+    data_start = -(-(len(MAGIC) + 8 + header_len) // ALIGNMENT) * ALIGNMENT
+    order = "<" if header["byteorder"] == "little" else ">"
+    rows = header["rows"]
+
+    columns = {}
+    if rows == 0:
+        for column in header["columns"]:
+            if column["name"] in exclude:
+                continue
+            if column["kind"] == "text" and text_codes:
+                columns[column["name"]] = (np.empty(0, dtype=np.int32), column["categories"])
+            else:
+                columns[column["name"]] = np.empty(0, dtype=object if column["kind"] == "text" else column["dtype"])
+        return columns
+
+    with open(path, "rb") as f:
+        for column in header["columns"]:
+            if column["name"] in exclude:
+                continue
+            f.seek(data_start + column["offset"])
+            values = np.fromfile(f, dtype=np.dtype(order + column["dtype"]), count=rows)
+            if len(values) != rows:
+                raise ValueError(f"{path.name} is truncated")
+            if column["kind"] == "timestamp":
+                values = values.view("datetime64[ns]")
+            elif column["kind"] == "text" and text_codes:
+                values = (values, column["categories"])
+            elif column["kind"] == "text":
+                # Code -1 picks the trailing NaN entry
+                table = np.array(column["categories"] + [np.nan], dtype=object)
+                values = table[values]
+            columns[column["name"]] = values
+    return columns
@@ -0,0 +1,305 @@
+'''
+Indexed SQLite store for processed combat data.
+
+The filtered CSV is streamed into an on-disk SQLite database next to it
+(filtered_combat_log.sqlite) with indexes on encounter id, event type, units,
+spell id and relative fight time, so the visualizer's filters become indexed
+lookups instead of full scans of a DataFrame held in memory. Building never
+holds more than one batch of rows in memory, so logs bigger than RAM can be
+queried.
+
+Usage: python combat_store.py filtered_combat_log.csv
+'''
+import argparse
+import csv
+import os
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+from columnar import VALID_COLUMN, valid_positions
+from pipeline_io import (ProgressFile, check_cancelled, find_existing, open_reader, sidecar_path,
+                         strip_compression_suffix)
+
+STORE_VERSION = 1
+TABLE = "events"
+BATCH_SIZE = 50000
+EPOCH = datetime(1970, 1, 1)
+TIMESTAMP_FORMAT = "%m/%d/%Y %H:%M:%S.%f"
+
+# Declared column types, anything else is stored as TEXT.
+# SQLite converts numeric strings to numbers for INTEGER/REAL columns on insert.
+COLUMN_TYPES = {
+    "timestamp": "INTEGER",  # nanoseconds since the epoch, like pandas datetime64
+    "spell id": "INTEGER",
+    "X coord": "REAL",
+    "Y coord": "REAL",
+    "Facing direction": "REAL",
+    "map id": "INTEGER",
+    "encounter id": "INTEGER",
+    "relative fight time (s)": "REAL",
+    "unit died sequence": "INTEGER",
+    "source unit id": "INTEGER",
+    "destination unit id": "INTEGER",
+    "ui map id": "INTEGER",
+    "difficulty id": "INTEGER",
+    "group size": "INTEGER",
+    "success": "INTEGER",
+}
+
+# name -> columns, created after the bulk insert
+INDEXES = {
+    "idx_event_type": ["event type"],
+    "idx_encounter_time": ["encounter id", "relative fight time (s)"],
+    "idx_relative_time": ["relative fight time (s)"],
+    "idx_spell_id": ["spell id"],
+    "idx_source": ["Damage source"],
+    "idx_destination": ["Spell destination"],
+    "idx_source_owner": ["Source owner"],
+    "idx_destination_owner": ["Destination owner"],
+    "idx_ui_map": ["ui map id"],
+}
+
+def quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+def store_path(csv_path):
+    '''Database path for a processed CSV, e.g. filtered_combat_log.sqlite'''
+    return strip_compression_suffix(csv_path).with_suffix(".sqlite")
+
+def timestamp_ns(text):
+    try:
+        dt = datetime.strptime(text, TIMESTAMP_FORMAT)
+    except (TypeError, ValueError):
+        return None
+    return (dt - EPOCH) // timedelta(microseconds=1) * 1000
+
+def load_owner_names(units_path):
+    '''Unit id -> name of its top-level owner (or itself), from the CSVtoCSV unit table'''
+    if not units_path.exists():
+        return []
+    names = {}
+    owners = {}
+    with open(units_path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            unit_id = int(row["unit id"])
+            names[unit_id] = row["name"]
+            owners[unit_id] = int(row["owner id"])
+    owner_names = [""] * (max(names) + 1 if names else 0)
+    for unit_id, name in names.items():
+        owner_id = owners[unit_id]
+        owner_names[unit_id] = names.get(owner_id, name) if owner_id >= 0 else name
+    return owner_names
+
+def build_store(csv_path, db_path=None, progress=None, cancel=None):
+    '''
+    Stream a processed CSV into a fresh indexed database and return its path.
+    progress(bytes_done, bytes_total) is called after every batch, and setting
+    the cancel event (threading.Event) raises PipelineCancelled.
+    '''
+    csv_path = find_existing(Path(csv_path))
+    db_path = Path(db_path) if db_path else store_path(csv_path)
+    owner_names = load_owner_names(sidecar_path(csv_path, "units"))
+
+    # Build into a temporary file so an interrupted build never looks complete
+    tmp_path = db_path.with_name(db_path.name + ".tmp")
+    if tmp_path.exists():
+        tmp_path.unlink()
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute("PRAGMA journal_mode=OFF")
+        conn.execute("PRAGMA synchronous=OFF")
+
+        with ProgressFile(csv_path) as source, open_reader(csv_path, source) as f:
+            reader = csv.reader(f)
+            header = next(reader)
+            columns = header + ["Source owner", "Destination owner"]
+            conn.execute(f"CREATE TABLE {TABLE} (" + ", ".join(
+                f"{quote(name)} {COLUMN_TYPES.get(name, 'TEXT')}" for name in columns) + ")")
+            insert = f"INSERT INTO {TABLE} VALUES ({', '.join('?' * len(columns))})"
+
+            timestamp_col = header.index("timestamp")
+            fallback_names = [header.index("Damage source"), header.index("Spell destination")]
+            owner_sources = [
+                (header.index(id_col), header.index(name_col))
+                for id_col, name_col in (("source unit id", "Damage source"),
+                                         ("destination unit id", "Spell destination"))
+                if id_col in header
+            ]
+
+            batch = []
+            rows = 0
+            for row in reader:
+                values = [value if value != "" else None for value in row]
+                values[timestamp_col] = timestamp_ns(row[timestamp_col])
+                if owner_sources:
+                    for id_index, name_index in owner_sources:
+                        unit_id = int(row[id_index]) if row[id_index] else -1
+                        values.append(owner_names[unit_id] if 0 <= unit_id < len(owner_names)
+                                      else values[name_index])
+                else:
+                    values += [values[index] for index in fallback_names]
+                batch.append(values)
+                if len(batch) >= BATCH_SIZE:
+                    check_cancelled(cancel)
+                    conn.executemany(insert, batch)
+                    rows += len(batch)
+                    batch = []
+                    if progress is not None:
+                        progress(source.bytes_read, source.total)
+            if batch:
+                conn.executemany(insert, batch)
+                rows += len(batch)
+
+        # Indexes are much faster to build once than to maintain during the insert
+        for index_name, index_columns in INDEXES.items():
+            if all(name in columns for name in index_columns):
+                conn.execute(f"CREATE INDEX {index_name} ON {TABLE} ("
+                             + ", ".join(quote(name) for name in index_columns) + ")")
+        stat = csv_path.stat()
+        conn.execute("CREATE TABLE store_info (key TEXT PRIMARY KEY, value TEXT)")
+        conn.executemany("INSERT INTO store_info VALUES (?, ?)", [
+            ("version", str(STORE_VERSION)),
+            ("source", str(csv_path)),
+            ("source_size", str(stat.st_size)),
+            ("source_mtime", str(stat.st_mtime)),
+            ("rows", str(rows)),
+        ])
+        conn.execute("ANALYZE")
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp_path, db_path)
+    return db_path
+
+class CombatStore:
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.columns = [row[1] for row in self.conn.execute(f"PRAGMA table_info({TABLE})")]
+
+    @classmethod
+    def open(cls, csv_path, progress=None, cancel=None):
+        '''Open the store for a processed CSV, (re)building it if missing or out of date'''
+        csv_path = find_existing(Path(csv_path))
+        db_path = store_path(csv_path)
+        if not cls.is_current(db_path, csv_path):
+            build_store(csv_path, db_path, progress, cancel)
+        return cls(db_path)
+
+    @staticmethod
+    def is_current(db_path, csv_path):
+        if not db_path.exists():
+            return False
+        try:
+            conn = sqlite3.connect(db_path)
+            try:
+                info = dict(conn.execute("SELECT key, value FROM store_info"))
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            return False
+        stat = csv_path.stat()
+        return (info.get("version") == str(STORE_VERSION)
+                and info.get("source_size") == str(stat.st_size)
+                and info.get("source_mtime") == str(stat.st_mtime))
+
+    def close(self):
+        self.conn.close()
+
+    def __len__(self):
+        return self.conn.execute(f"SELECT COUNT(*) FROM {TABLE}").fetchone()[0]
+
+    def distinct(self, *columns):
+        '''The distinct combinations of the columns, leaving out rows where any of them is missing'''
+        names = ", ".join(quote(name) for name in columns)
+        not_null = " AND ".join(f"{quote(name)} IS NOT NULL" for name in columns)
+        return pd.read_sql_query(f"SELECT DISTINCT {names} FROM {TABLE} WHERE {not_null}", self.conn)
+
+    def counts(self, column):
+        '''Rows per value of a column, leaving out missing values'''
+        return dict(self.conn.execute(
+            f"SELECT {quote(column)}, COUNT(*) FROM {TABLE} WHERE {quote(column)} IS NOT NULL GROUP BY 1"))
+
+    def query(self, encounter_ids=None, event_types=None, unit=None,
+              unit_columns=("Damage source", "Spell destination"), spell=None,
+              start_time=None, end_time=None, death_threshold=None, ui_map_id=None):
+        '''
+        Return the matching rows as a DataFrame in their original order.
+
+        spell is a spell id (int) or spell name (str). With death_threshold,
+        each encounter is cut at the timestamp of its nth UNIT_DIED event,
+        counting deaths on every floor.
+        '''
+        where = []
+        params = []
+        if encounter_ids:
+            where.append(f'e."encounter id" IN ({", ".join("?" * len(encounter_ids))})')
+            params += [int(enc_id) for enc_id in encounter_ids]
+        if event_types:
+            where.append(f'e."event type" IN ({", ".join("?" * len(event_types))})')
+            params += list(event_types)
+        if unit:
+            where.append(f"(e.{quote(unit_columns[0])} = ? OR e.{quote(unit_columns[1])} = ?)")
+            params += [unit, unit]
+        if isinstance(spell, int):
+            where.append('e."spell id" = ?')
+            params.append(spell)
+        elif spell:
+            where.append('e."spell name" = ?')
+            params.append(spell)
+        if start_time is not None:
+            where.append('e."relative fight time (s)" >= ?')
+            params.append(start_time)
+        if end_time is not None:
+            where.append('e."relative fight time (s)" <= ?')
+            params.append(end_time)
+        if ui_map_id is not None:
+            where.append('e."ui map id" = ?')
+            params.append(ui_map_id)
+
+        sql = ""
+        join = ""
+        if death_threshold:
+            # nth death per encounter, in log order
+            sql = (f'WITH deaths AS (SELECT "encounter id" AS enc, timestamp AS ts, '
+                   f'ROW_NUMBER() OVER (PARTITION BY "encounter id" ORDER BY rowid) AS n '
+                   f'FROM {TABLE} WHERE "event type" = \'UNIT_DIED\'), '
+                   f'cutoffs AS (SELECT enc, ts FROM deaths WHERE n = ?) ')
+            params.insert(0, int(death_threshold))
+            join = 'LEFT JOIN cutoffs c ON c.enc = e."encounter id" '
+            where.append("(c.ts IS NULL OR e.timestamp <= c.ts)")
+
+        sql += f"SELECT e.* FROM {TABLE} e " + join
+        if where:
+            sql += "WHERE " + " AND ".join(where) + " "
+        sql += "ORDER BY e.rowid"
+
+        df = pd.read_sql_query(sql, self.conn, params=params)
+        return self.restore_types(df)
+
+    @staticmethod
+    def restore_types(df):
+        '''Match the dtypes main_UI gives a DataFrame loaded from CSV'''
+        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ns')
+        df['spell id'] = pd.to_numeric(df['spell id'], errors='coerce').fillna(-1).astype('int32')
+        for name in ('X coord', 'Y coord', 'Facing direction'):
+            df[name] = pd.to_numeric(df[name], errors='coerce').astype('float32')
+        df[VALID_COLUMN] = valid_positions(df['X coord'].to_numpy(), df['Y coord'].to_numpy())
+        return df
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the indexed SQLite store for a processed combat log CSV")
+    parser.add_argument("csv", nargs="?", default="filtered_combat_log.csv")
+    parser.add_argument("--output", default=None, help="Database path (default: next to the CSV)")
+    args = parser.parse_args()
+
+    csv_path = find_existing(Path(args.csv))
+    if not csv_path.exists():
+        print(f"Error: CSV file not found at {csv_path}")
+        sys.exit(1)
+    db_path = build_store(csv_path, args.output)
+    print(f"Indexed store created: {db_path}")
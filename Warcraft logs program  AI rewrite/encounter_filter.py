@@ -0,0 +1,112 @@
+'''
+Ingest-time encounter predicates (kill/wipe, difficulty, group size).
+
+ENCOUNTER_START carries the difficulty and group size, so unwanted pulls are
+skipped as soon as they start. ENCOUNTER_END adds the success flag, so
+kill/wipe filtering drops the encounter's buffered rows when it ends.
+'''
+
+# Difficulty ids from the ENCOUNTER_START/ENCOUNTER_END fields
+DIFFICULTY_NAMES = {
+    "lfr": {7, 17},
+    "normal": {1, 3, 4, 14},
+    "heroic": {2, 5, 6, 15},
+    "mythic": {16, 23},
+    "mythic+": {8},
+}
+
+def parse_difficulties(text):
+    '''Turn "mythic,heroic" or "16,15" into a set of difficulty ids'''
+    difficulties = set()
+    for part in text.split(','):
+        part = part.strip().lower()
+        if not part:
+            continue
+        if part in DIFFICULTY_NAMES:
+            difficulties |= DIFFICULTY_NAMES[part]
+        else:
+            difficulties.add(int(part))
+    return difficulties
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+class EncounterFilter:
+    def __init__(self, kills_only=False, wipes_only=False, difficulties=None,
+                 skip_difficulties=None, min_group_size=None, max_group_size=None):
+        self.kills_only = kills_only
+        self.wipes_only = wipes_only
+        self.difficulties = difficulties or set()
+        self.skip_difficulties = skip_difficulties or set()
+        self.min_group_size = min_group_size
+        self.max_group_size = max_group_size
+
+    def __bool__(self):
+        return bool(self.kills_only or self.wipes_only or self.difficulties or self.skip_difficulties
+                    or self.min_group_size is not None or self.max_group_size is not None)
+
+    def allows_start(self, difficulty, group_size):
+        '''Check the fields known at ENCOUNTER_START'''
+        difficulty = _to_int(difficulty)
+        group_size = _to_int(group_size)
+        if self.difficulties and difficulty not in self.difficulties:
+            return False
+        if difficulty in self.skip_difficulties:
+            return False
+        if self.min_group_size is not None and (group_size is None or group_size < self.min_group_size):
+            return False
+        if self.max_group_size is not None and (group_size is None or group_size > self.max_group_size):
+            return False
+        return True
+
+    def allows_end(self, difficulty, group_size, success):
+        '''Check the fields known at ENCOUNTER_END, including kill/wipe'''
+        if not self.allows_start(difficulty, group_size):
+            return False
+        killed = _to_int(success) == 1
+        if self.kills_only and not killed:
+            return False
+        if self.wipes_only and killed:
+            return False
+        return True
+
+    def describe(self):
+        parts = []
+        if self.kills_only:
+            parts.append("kills only")
+        if self.wipes_only:
+            parts.append("wipes only")
+        if self.difficulties:
+            parts.append(f"difficulty in {sorted(self.difficulties)}")
+        if self.skip_difficulties:
+            parts.append(f"skip difficulty {sorted(self.skip_difficulties)}")
+        if self.min_group_size is not None:
+            parts.append(f"group size >= {self.min_group_size}")
+        if self.max_group_size is not None:
+            parts.append(f"group size <= {self.max_group_size}")
+        return ", ".join(parts) if parts else "all encounters"
+
+    @staticmethod
+    def add_arguments(parser):
+        parser.add_argument("--kills-only", action="store_true", help="Keep only killed encounters")
+        parser.add_argument("--wipes-only", action="store_true", help="Keep only wiped encounters")
+        parser.add_argument("--difficulty", default="",
+                            help="Difficulties to keep, e.g. mythic,heroic or 16,15")
+        parser.add_argument("--skip-difficulty", default="",
+                            help="Difficulties to drop, e.g. lfr")
+        parser.add_argument("--min-group-size", type=int, default=None)
+        parser.add_argument("--max-group-size", type=int, default=None)
+
+    @classmethod
+    def from_args(cls, args):
+        return cls(
+            kills_only=args.kills_only,
+            wipes_only=args.wipes_only,
+            difficulties=parse_difficulties(args.difficulty),
+            skip_difficulties=parse_difficulties(args.skip_difficulty),
+            min_group_size=args.min_group_size,
+            max_group_size=args.max_group_size,
+        )
@@ -1,9 +1,18 @@
+import argparse
 import csv
 import re
 import sys
 import os
+import time
 from pathlib import Path
 
+from encounter_filter import EncounterFilter
+from pipeline_io import (COMPRESSION_CHOICES, BlockParsePipeline, QueuedRowWriter, StageTimer,
+                         check_cancelled, checkpoint_path, compressed_path, file_fingerprint,
+                         load_checkpoint, open_writer, resolve_compression, save_checkpoint,
+                         utilization_report)
+from position_sampler import PositionSampler
+
 # Get the directory where the script/executable is located
 if getattr(sys, 'frozen', False):
     # Running as executable
@@ -12,16 +21,6 @@ else:
     # Running as script
     current_dir = Path(__file__).resolve().parent
 
-# Accept input log file from command-line argument
-if len(sys.argv) < 2:
-    print("Error: No log file provided. Usage: python script.py <log_file_path>")
-    sys.exit(1)
-
-log_file_path = Path(sys.argv[1])
-
-# Define the output filtered log CSV file path relative to current directory
-floats_csv_path = current_dir / "combat_log_with_floats.csv"
-
 # List of metadata event types to exclude
 excluded_events = {"COMBAT_LOG_VERSION", "MAP_CHANGE", "COMBATANT_INFO"}
 
@@ -29,6 +28,10 @@ excluded_events = {"COMBAT_LOG_VERSION", "MAP_CHANGE", "COMBATANT_INFO"}
 included_events = {"ENCOUNTER_START", "ENCOUNTER_END", "UNIT_DIED", "SPELL_AURA_APPLIED", 
                   "SPELL_AURA_REMOVED", "SPELL_AURA_REFRESH"}
 
+# Aura events, including stack changes used for the aura interval table
+dose_events = {"SPELL_AURA_APPLIED_DOSE", "SPELL_AURA_REMOVED_DOSE"}
+aura_events = {"SPELL_AURA_APPLIED", "SPELL_AURA_REMOVED", "SPELL_AURA_REFRESH"} | dose_events
+
 # Function to process aura events into structured format
 def process_aura_event(timestamp, event_fields):
     try:
@@ -41,6 +44,11 @@ def process_aura_event(timestamp, event_fields):
         spell_id = event_fields[9]
         spell_name = event_fields[10].strip('"')  # Remove quotes
         aura_type = event_fields[-1]              # BUFF or DEBUFF
+        stacks = ""
+        if event_type in dose_events:
+            # Dose events end with the new stack count after the aura type
+            aura_type = event_fields[12]
+            stacks = event_fields[13]
         
         # Return structured format
         return [
@@ -49,69 +57,247 @@ def process_aura_event(timestamp, event_fields):
             dest_name,      # Destination player name
             spell_id,
             spell_name,
-            aura_type
+            aura_type,
+            dest_guid,      # Destination GUID, used to resolve pet owners
+            stacks          # Stack count, dose events only
         ]
     except (IndexError, Exception) as e:
         print(f"Error processing aura event: {e}")
         print(f"Event fields: {event_fields}")
         return None
 
-# Read the combat log and filter lines
-filtered_data = []
-
 # Regex pattern to match only floating-point numbers (must have a decimal)
 float_pattern = re.compile(r"[-+]?[0-9]*\.[0-9]+")
 
-# Read and process the combat log file
-if log_file_path.exists():  # Check if the file exists
-    with log_file_path.open("r", encoding="utf-8") as infile:
-        for line in infile:
-            # Ensure the line has content
-            line = line.strip()
-            if len(line) < 25:  # Skip malformed lines
-                continue
-            
-            # Split on the first space after the timestamp
-            parts = line.split("  ", 1)
-            if len(parts) != 2:
-                continue
-                
-            timestamp_part = parts[0].strip()
-            event_part = parts[1].strip()
+# Define headers for the CSV file
+headers = ["Timestamp", "Event Type", "Destination Player", "Spell ID", "Spell Name", "Aura Type", "Destination GUID",
+           "Stacks"]
+
+def parse_block(data, offset):
+    '''
+    Parser stage: turn a block of complete log lines starting at byte offset
+    into (line start offset, event type, output row) records for the lines
+    that are kept. Encounter filtering depends on log order, so it is left
+    to filter_log.
+    '''
+    records = []
+    line_start = offset
+    for raw_line in data.split(b"\n")[:-1]:
+        start = line_start
+        line_start += len(raw_line) + 1
+
+        # Ensure the line has content
+        line = raw_line.decode("utf-8").strip()
+        if len(line) < 25:  # Skip malformed lines
+            continue
+        
+        # Split on the first space after the timestamp
+        parts = line.split("  ", 1)
+        if len(parts) != 2:
+            continue
             
-            # Parse the event part as CSV
-            event_fields = next(csv.reader([event_part], delimiter=','))
-            event_type = event_fields[0].strip()
+        timestamp_part = parts[0].strip()
+        event_part = parts[1].strip()
+        
+        # Parse the event part as CSV
+        event_fields = next(csv.reader([event_part], delimiter=','))
+        event_type = event_fields[0].strip()
+        
+        # Skip explicitly excluded events
+        if event_type in excluded_events:
+            continue
+        
+        # Handle aura events specially
+        if event_type in aura_events:
+            processed_event = process_aura_event(timestamp_part, event_fields)
+            if processed_event:
+                records.append((start, event_type, processed_event))
+            continue
             
-            # Skip explicitly excluded events
-            if event_type in excluded_events:
-                continue
+        # Handle other included events (encounter boundaries included)
+        if event_type in included_events:
+            records.append((start, event_type, [timestamp_part] + event_fields))
+            continue
             
-            # Handle aura events specially
-            if event_type in {"SPELL_AURA_APPLIED", "SPELL_AURA_REMOVED", "SPELL_AURA_REFRESH"}:
-                processed_event = process_aura_event(timestamp_part, event_fields)
-                if processed_event:
-                    filtered_data.append(processed_event)
-                continue
-                
-            # Handle other included events
-            if event_type in included_events:
-                filtered_data.append([timestamp_part] + event_fields)
-                continue
-                
-            # Use regex to check if the event part contains floating-point numbers
-            if float_pattern.search(event_part):
-                filtered_data.append([timestamp_part] + event_fields)
-
-    # Define headers for the CSV file
-    headers = ["Timestamp", "Event Type", "Destination Player", "Spell ID", "Spell Name", "Aura Type"]
-
-    # Save filtered lines to a CSV file
-    with floats_csv_path.open("w", encoding="utf-8", newline='') as outfile:
-        writer = csv.writer(outfile, quoting=csv.QUOTE_MINIMAL)
-        writer.writerow(headers)  # Write headers
-        writer.writerows(filtered_data)
+        # Use regex to check if the event part contains floating-point numbers
+        if float_pattern.search(event_part):
+            records.append((start, event_type, [timestamp_part] + event_fields))
+    return records
+
+def filter_log(log_file_path, output_name="combat_log_with_floats.csv", encounter_filter=None,
+               compression=None, progress=None, cancel=None, resume=False, parse_workers=1, sampler=None):
+    '''
+    Filter a combat log down to positional, death and aura events and write
+    them to output_name (relative to the program folder unless absolute).
+    Returns the output path, or None if the log file does not exist.
+
+    progress(bytes_done, bytes_total) is called as the log is read, and
+    setting the cancel event (threading.Event) raises PipelineCancelled.
+
+    Uncompressed runs save a checkpoint (byte offset and encounter state).
+    With resume, only the bytes appended to the log since then are read and
+    their rows are appended to the existing output. A pull still in progress
+    at the end of the log is re-read from its ENCOUNTER_START next time.
+
+    Reading, parsing (parse_workers threads) and writing overlap on separate
+    threads connected by bounded queues; rows of a pull are held until its
+    ENCOUNTER_END decides whether it is kept. Per-stage utilization is
+    printed at the end.
 
+    sampler (a PositionSampler) makes a preview: encounter, death and aura
+    events are all kept but position events are sampled.
+    '''
+    log_file_path = Path(log_file_path)
+    if encounter_filter is None:
+        encounter_filter = EncounterFilter()
+    if sampler is None:
+        sampler = PositionSampler()
+
+    # Define the output filtered log CSV file path relative to current directory
+    compression = resolve_compression(compression)
+    floats_csv_path = compressed_path(current_dir / output_name, compression)
+
+    if not log_file_path.exists():  # Check if the file exists
+        print(f"Error: Log file not found at {log_file_path}")
+        return None
+
+    # Encounter filtering state: rows of a rejected pull are skipped until the next ENCOUNTER_START
+    skip_encounter = False
+    skipped_encounters = 0
+    total_bytes = log_file_path.stat().st_size
+
+    # Checkpoints need byte positions in the output, so only plain CSV output supports them
+    checkpoint_file = checkpoint_path(floats_csv_path)
+    settings = {"filter": encounter_filter.describe(), "sampling": sampler.describe()}
+    checkpoint = None
+    if resume:
+        if compression is not None:
+            print("Resume needs uncompressed output, processing the whole log")
+        else:
+            checkpoint = load_checkpoint(checkpoint_file, log_file_path, floats_csv_path, settings)
+            if checkpoint is None:
+                print("No usable checkpoint, processing the whole log")
+    start_offset = 0
+    if checkpoint is not None:
+        start_offset = checkpoint["input_offset"]
+        skip_encounter = checkpoint["skip_encounter"]
+        # Drop rows written after the checkpoint (an unfinished pull), they are read again
+        with open(floats_csv_path, "r+b") as f:
+            f.truncate(checkpoint["output_size"])
+        print(f"Resuming {log_file_path.name} at byte {start_offset} of {total_bytes}")
+
+    # An accepted pull without its ENCOUNTER_END yet, where its ENCOUNTER_START line begins,
+    # and its rows, held back until the pull ends
+    in_encounter = False
+    encounter_start_offset = start_offset
+    pending = []
+    input_offset = start_offset
+
+    # Read, parse and write on separate threads, filtering encounters here in log order
+    appending = checkpoint is not None
+    wall_start = time.perf_counter()
+    filter_timer = StageTimer("filter")
+    with open_writer(floats_csv_path, compression, append=appending) as outfile, \
+            BlockParsePipeline(log_file_path, parse_block, start_offset, parse_workers) as blocks:
+        writer = QueuedRowWriter(outfile)
+        try:
+            if not appending:
+                writer.writerows([headers])  # Write headers
+            for end_offset, records in blocks:
+                busy_start = time.perf_counter()
+                check_cancelled(cancel)
+                if progress is not None:
+                    progress(end_offset, total_bytes)
+
+                ready = []
+                for line_start, event_type, row in records:
+                    # Apply encounter filters at the pull boundaries
+                    if event_type == "ENCOUNTER_START":
+                        # A previous pull that never ended is kept as it is
+                        ready += pending
+                        pending = []
+                        skip_encounter = not encounter_filter.allows_start(row[4], row[5])
+                        in_encounter = not skip_encounter
+                        if skip_encounter:
+                            skipped_encounters += 1
+                            continue
+                        encounter_start_offset = line_start
+                    elif skip_encounter:
+                        # Only the rejected pull's own rows are dropped
+                        if event_type == "ENCOUNTER_END":
+                            skip_encounter = False
+                        continue
+                    elif event_type == "ENCOUNTER_END":
+                        in_encounter = False
+                        if not encounter_filter.allows_end(row[4], row[5], row[6]):
+                            # Kill/wipe is only known now, drop the pull's held rows
+                            pending = []
+                            skipped_encounters += 1
+                            continue
+                        ready += pending
+                        pending = []
+                        ready.append(row)
+                        continue
+                    elif (sampler and event_type not in included_events and event_type not in aura_events
+                          and not sampler.keep(event_type, row)):
+                        continue
+
+                    if in_encounter:
+                        pending.append(row)
+                    else:
+                        ready.append(row)
+
+                writer.writerows(ready)
+                input_offset = end_offset
+                filter_timer.add(time.perf_counter() - busy_start)
+
+            # The next run resumes before an unfinished pull, so note the output size before its rows
+            writer.wait()
+            output_size = outfile.tell() if compression is None else None
+            writer.writerows(pending)
+        finally:
+            writer.close()
+    wall_time = time.perf_counter() - wall_start
+
+    if compression is None:
+        resume_offset = encounter_start_offset if in_encounter else input_offset
+        save_checkpoint(checkpoint_file, {
+            "input_offset": resume_offset,
+            "input_fingerprint": file_fingerprint(log_file_path, resume_offset),
+            "output_size": output_size,
+            "skip_encounter": skip_encounter,
+            "settings": settings,
+        })
+
+    if skipped_encounters:
+        print(f"Skipped {skipped_encounters} encounters ({encounter_filter.describe()})")
+    if sampler:
+        print(f"Preview: kept {sampler.describe()}")
+    print(f"Pipeline utilization over {wall_time:.1f}s: " + utilization_report(
+        [blocks.reader_timer, blocks.parser_timer, filter_timer, writer.timer], wall_time))
     print(f"Combat log lines containing floats, death events, and spell auras saved to: {floats_csv_path}")
-else:
-    print(f"Error: Log file not found at {log_file_path}")
+    if progress is not None:
+        progress(total_bytes, total_bytes)
+    return floats_csv_path
+
+if __name__ == "__main__":
+    # Accept input log file and optional encounter filters from the command line
+    parser = argparse.ArgumentParser(description="Filter a WoW combat log down to positional, death and aura events")
+    parser.add_argument("log_file")
+    EncounterFilter.add_arguments(parser)
+    PositionSampler.add_arguments(parser)
+    parser.add_argument("--compress", choices=COMPRESSION_CHOICES, default="none",
+                        help="Block-compress the output CSV on a background thread pool")
+    parser.add_argument("--output", default="combat_log_with_floats.csv",
+                        help="Output CSV path, relative to the program folder unless absolute")
+    parser.add_argument("--resume", action="store_true",
+                        help="Only read what was appended to the log since the last run's checkpoint")
+    parser.add_argument("--parse-workers", type=int, default=1,
+                        help="Threads parsing blocks of the log while the next block is read")
+    args = parser.parse_args()
+
+    if filter_log(args.log_file, args.output, EncounterFilter.from_args(args), args.compress,
+                  resume=args.resume, parse_workers=args.parse_workers,
+                  sampler=PositionSampler.from_args(args)) is None:
+        sys.exit(1)
+
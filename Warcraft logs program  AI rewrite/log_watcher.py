@@ -0,0 +1,243 @@
+'''
+Watch the WoW Logs folder and process new or rotated combat logs automatically.
+
+A log is queued once its size and modification time have stopped changing
+for the settle time, then run through the log filter and CSV processing into
+its own output folder. The folder is locked while it is written, so a
+launcher job for the same log writes elsewhere, and a log the launcher is
+writing waits. Progress is kept in a JSON state file so logs that were
+already processed are skipped after a restart, and a log that grew is
+resumed from the stages' checkpoints (uncompressed output only). Logs
+whose processing failed are retried with exponential backoff, and given up
+on after a few failures until the file changes again.
+
+Both stages run in-process through pipeline.run_job, so the watcher also
+works inside the frozen launcher, which runs it on a thread.
+
+Usage: python log_watcher.py "C:/Program Files (x86)/World of Warcraft/_retail_/Logs"
+Encounter filter arguments (e.g. --kills-only, --difficulty mythic) apply to both stages.
+'''
+import argparse
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from pathlib import Path
+
+from encounter_filter import EncounterFilter
+from pipeline import STAGE_NAMES, PipelineJob, run_job
+from pipeline_io import FolderLock
+
+# Get the directory where the script/executable is located
+if getattr(sys, 'frozen', False):
+    current_dir = Path(os.path.dirname(sys.executable))
+else:
+    current_dir = Path(__file__).resolve().parent
+
+DEFAULT_LOG_FOLDER = "C:/Program Files (x86)/World of Warcraft/_retail_/Logs"
+RETRY_DELAY = 60.0  # seconds before the first retry of a failed log, doubled after every failure
+MAX_ATTEMPTS = 5    # failures of an unchanged log before it is left alone
+
+class LogWatcher:
+    def __init__(self, folder, output_dir, state_path, pattern="WoWCombatLog*.txt",
+                 poll_interval=10.0, settle_time=60.0, encounter_filter=None, compress="none",
+                 retry_delay=RETRY_DELAY, max_attempts=MAX_ATTEMPTS):
+        self.folder = Path(folder).resolve()
+        self.output_dir = Path(output_dir).resolve()
+        self.state_path = Path(state_path)
+        self.pattern = pattern
+        self.poll_interval = poll_interval
+        self.settle_time = settle_time
+        self.encounter_filter = encounter_filter
+        self.compress = compress
+        self.retry_delay = retry_delay
+        self.max_attempts = max_attempts
+
+        self.stop_event = threading.Event()
+        self.current_job = None  # PipelineJob being processed, cancelled on stop
+
+        self.state = self.load_state()
+        self.observed = {}  # path -> (size, mtime, first time seen with that size/mtime)
+        self.queued = set()
+        self.jobs = queue.Queue()
+        self.state_lock = threading.Lock()
+
+    def load_state(self):
+        if self.state_path.exists():
+            try:
+                with self.state_path.open("r", encoding="utf-8") as f:
+                    return json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Could not read state file, starting fresh: {e}")
+        return {}
+
+    def save_state(self):
+        # Write to a temporary file first so a crash never leaves a truncated state file
+        tmp_path = self.state_path.with_name(self.state_path.name + ".tmp")
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    def needs_processing(self, key, size, mtime, now):
+        entry = self.state.get(key)
+        if entry is None:
+            return True
+        # New pulls appended, or the log rotated/replaced under the same name
+        if entry.get("size") != size or entry.get("mtime") != mtime:
+            return True
+        if entry.get("status") == "done":
+            return False
+        # An unchanged log that failed waits out its backoff, and is dropped after max_attempts
+        return entry.get("attempts", 0) < self.max_attempts and now >= entry.get("retry_at", 0)
+
+    def scan(self):
+        now = time.time()
+        for log_path in sorted(self.folder.glob(self.pattern)):
+            try:
+                stat = log_path.stat()
+            except OSError:
+                continue
+            key = str(log_path)
+            size, mtime = stat.st_size, stat.st_mtime
+
+            previous = self.observed.get(key)
+            if previous is None or previous[:2] != (size, mtime):
+                # Still growing (or first sighting): restart the settle timer
+                self.observed[key] = (size, mtime, now)
+                continue
+
+            if key in self.queued or size == 0:
+                continue
+            with self.state_lock:
+                pending = self.needs_processing(key, size, mtime, now)
+            if pending and now - previous[2] >= self.settle_time:
+                print(f"Queued {log_path.name} ({size / 1024 / 1024:.1f} MB)")
+                self.queued.add(key)
+                self.jobs.put((key, size, mtime))
+
+    def output_folder(self, log_path):
+        return self.output_dir / log_path.stem
+
+    def process(self, key, size, mtime):
+        log_path = Path(key)
+        out_dir = self.output_folder(log_path)
+        lock = FolderLock(out_dir)
+        if not lock.acquire():
+            # The launcher is writing this folder; the log stays pending and is queued again next scan
+            print(f"{log_path.name}: {out_dir} is in use by another job, trying again later")
+            return
+        try:
+            self.run_log(log_path, key, size, mtime, out_dir)
+        finally:
+            lock.release()
+
+    def run_log(self, log_path, key, size, mtime, out_dir):
+        floats_csv = out_dir / "combat_log_with_floats.csv"
+        filtered_csv = out_dir / "filtered_combat_log.csv"
+
+        start = time.time()
+        print(f"Processing {log_path.name} -> {out_dir}")
+        # Both stages pick up from their checkpoints, so a log that grew only has its new pulls processed
+        job = PipelineJob(log_path, encounter_filter=self.encounter_filter,
+                          compression=None if self.compress == "none" else self.compress,
+                          floats_csv=str(floats_csv), output_csv=str(filtered_csv), resume=True)
+        job.cancel_event = threading.Event()
+        self.current_job = job
+        events = queue.Queue()
+        try:
+            output_path = run_job(job, events)
+        finally:
+            self.current_job = None
+
+        status = "done" if output_path is not None else "failed"
+        while not events.empty():
+            event = events.get()
+            if event[0] == "failed":
+                print(f"{log_path.name}: {STAGE_NAMES[event[2]]} failed: {event[3]}")
+            elif event[0] == "cancelled":
+                status = "cancelled"
+
+        entry = {
+            "status": status,
+            "size": size,
+            "mtime": mtime,
+            "output_dir": str(out_dir),
+            "processed_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "seconds": round(time.time() - start, 1),
+        }
+        with self.state_lock:
+            previous = self.state.get(key, {})
+            same_file = previous.get("size") == size and previous.get("mtime") == mtime
+            attempts = previous.get("attempts", 0) if same_file else 0
+            if status == "failed":
+                # Failures of the same file back off exponentially until max_attempts
+                attempts += 1
+                entry["retry_at"] = time.time() + self.retry_delay * 2 ** (attempts - 1)
+                if attempts >= self.max_attempts:
+                    print(f"{log_path.name}: giving up after {attempts} failures until the log changes")
+            elif status == "cancelled":
+                entry["retry_at"] = 0
+            if status != "done":
+                entry["attempts"] = attempts
+            self.state[key] = entry
+            self.save_state()
+        print(f"{log_path.name}: {status} in {time.time() - start:.1f}s")
+
+    def worker(self):
+        while True:
+            key, size, mtime = self.jobs.get()
+            try:
+                if not self.stop_event.is_set():
+                    self.process(key, size, mtime)
+            except Exception as e:
+                print(f"Error processing {key}: {e}")
+            finally:
+                self.queued.discard(key)
+                self.jobs.task_done()
+
+    def watch(self):
+        '''Scan the folder until stop() is called; returns False if the folder does not exist'''
+        if not self.folder.is_dir():
+            print(f"Error: Log folder not found at {self.folder}")
+            return False
+        print(f"Watching {self.folder} for {self.pattern} (settle time {self.settle_time:.0f}s)")
+        threading.Thread(target=self.worker, daemon=True).start()
+        while not self.stop_event.is_set():
+            self.scan()
+            self.stop_event.wait(self.poll_interval)
+        return True
+
+    def stop(self):
+        '''Stop scanning and cancel the log being processed at its next check'''
+        self.stop_event.set()
+        job = self.current_job
+        if job is not None:
+            job.cancel()
+
+    def run(self):
+        try:
+            if not self.watch():
+                sys.exit(1)
+        except KeyboardInterrupt:
+            self.stop()
+            print("Stopping log watcher")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Watch the WoW Logs folder and process new combat logs")
+    parser.add_argument("folder", nargs="?", default=DEFAULT_LOG_FOLDER)
+    parser.add_argument("--output-dir", default=str(current_dir / "processed_logs"),
+                        help="Folder that receives one sub-folder of CSVs per log")
+    parser.add_argument("--state", default=str(current_dir / "log_watcher_state.json"))
+    parser.add_argument("--pattern", default="WoWCombatLog*.txt")
+    parser.add_argument("--interval", type=float, default=10.0, help="Seconds between folder scans")
+    parser.add_argument("--settle", type=float, default=60.0,
+                        help="Seconds a log must stop growing before it is processed")
+    parser.add_argument("--compress", choices=["none", "gzip", "zstd"], default="none")
+    EncounterFilter.add_arguments(parser)
+    args = parser.parse_args()
+
+    watcher = LogWatcher(args.folder, args.output_dir, args.state, args.pattern,
+                         args.interval, args.settle, EncounterFilter.from_args(args), args.compress)
+    watcher.run()
@@ -11,13 +11,127 @@ import os
 from PIL import Image, ImageTk
 from matplotlib.collections import LineCollection
 import sys
+import bisect
+import heapq
+import queue
+import threading
+from collections import OrderedDict
 from pathlib import Path
+from pipeline_io import PipelineCancelled, ProgressFile, check_cancelled, open_reader, sidecar_path
+from combat_store import CombatStore
+from columnar import VALID_COLUMN, columns_path, is_fresh, read_columns, valid_positions
+from movement_tracks import RESOLUTIONS, movement_path
+
+# Longest path (in points) drawn from a precomputed movement level before a coarser one is used
+MAX_PATH_POINTS = 2000
+
+# Compact dtypes for the loaded data: repeated strings as categoricals, coordinates as float32
+CATEGORY_COLUMNS = ['event type', 'Damage source', 'Spell destination', 'spell name', 'encounter name']
+FLOAT32_COLUMNS = ['X coord', 'Y coord', 'Facing direction', 'ui map id', 'difficulty id', 'group size', 'success']
+INT32_COLUMNS = ['encounter id', 'unit died sequence', 'spell id', 'source unit id', 'destination unit id']
+# Columns no view reads, left out of the load
+UNUSED_COLUMNS = {'Aura type', 'map id'}
+# Columns plot_data takes out of the filtered rows (plotting, tooltips, boss-relative positions)
+PLOT_COLUMNS = ['event type', 'encounter id', 'relative fight time (s)', 'Damage source', 'Spell destination',
+                'Source owner', 'Destination owner', 'spell name', 'unit died sequence',
+                'X coord', 'Y coord', VALID_COLUMN]
+# Autocomplete: delay after the last key before searching, and the most suggestions shown
+SEARCH_DELAY_MS = 150
+SUGGESTION_LIMIT = 50
+# Bounds of the plot_data filter result cache
+FILTER_CACHE_ENTRIES = 16
+FILTER_CACHE_BYTES = 256 * 1024 * 1024
+# Rows parsed per chunk when a CSV is loaded in the background
+LOAD_CHUNK_ROWS = 200000
+# Rows held in memory when filtering goes through the indexed store: the encounter
+# markers and deaths that the summaries, fight spans and death thresholds read
+STORE_FRAME_EVENTS = ['ENCOUNTER_START', 'ENCOUNTER_END', 'UNIT_DIED']
+
+class FilterCache:
+    """Least recently used filter results, bounded by entry count and total bytes"""
+    def __init__(self, max_entries=FILTER_CACHE_ENTRIES, max_bytes=FILTER_CACHE_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key -> (value, size in bytes), oldest first
+        self.bytes = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        self.entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key, value, size):
+        if key in self.entries:
+            self.bytes -= self.entries.pop(key)[1]
+        if size > self.max_bytes:
+            return
+        self.entries[key] = (value, size)
+        self.bytes += size
+        while len(self.entries) > self.max_entries or self.bytes > self.max_bytes:
+            _, (_, evicted_size) = self.entries.popitem(last=False)
+            self.bytes -= evicted_size
+
+    def clear(self):
+        self.entries.clear()
+        self.bytes = 0
+
+class SearchIndex:
+    """Case-insensitive prefix (sorted array) and substring (trigram) search over a fixed list of strings"""
+    def __init__(self, values):
+        self.values = [str(value) for value in values]
+        self.lowered = [value.lower() for value in self.values]
+        self.sorted_ids = sorted(range(len(self.values)), key=lambda i: self.lowered[i])
+        self.sorted_keys = [self.lowered[i] for i in self.sorted_ids]
+        self.trigrams = {}  # three-character substring -> indices of the values containing it
+        for i, text in enumerate(self.lowered):
+            for gram in {text[j:j + 3] for j in range(len(text) - 2)}:
+                self.trigrams.setdefault(gram, []).append(i)
+
+    def search(self, term, limit=SUGGESTION_LIMIT):
+        """
+        Indices of up to limit values containing term: prefix matches in alphabetical order
+        (an exact match first), then other matches by where the term occurs and length
+        """
+        term = term.lower()
+        if not term:
+            return self.sorted_ids[:limit]
+
+        matches = []
+        pos = bisect.bisect_left(self.sorted_keys, term)
+        while pos < len(self.sorted_keys) and len(matches) < limit and self.sorted_keys[pos].startswith(term):
+            matches.append(self.sorted_ids[pos])
+            pos += 1
+        if len(matches) >= limit:
+            return matches
+
+        if len(term) >= 3:
+            # Only values holding every trigram of the term can contain it
+            postings = sorted((self.trigrams.get(term[j:j + 3], []) for j in range(len(term) - 2)), key=len)
+            candidates = set(postings[0])
+            for posting in postings[1:]:
+                candidates.intersection_update(posting)
+        else:
+            candidates = range(len(self.values))
+        inner = []
+        for i in candidates:
+            at = self.lowered[i].find(term)
+            if at > 0:
+                inner.append((at, len(self.lowered[i]), self.lowered[i], i))
+        return matches + [i for *_, i in heapq.nsmallest(limit - len(matches), inner)]
 
 class AutocompletePanel:
     def __init__(self, parent, label_text, is_spell_panel=False):
         self.frame = ttk.Frame(parent)
         self.values = {'names': [], 'ids': []}  # Split values into names and IDs for spell panel
         self.is_spell_panel = is_spell_panel
+        self.index = SearchIndex([])      # unit names, or spell names for the spell panel
+        self.id_index = SearchIndex([])   # spell ids as text
+        self.id_names = {}                # spell id -> name
+        self.name_ids = {}                # spell name -> its spell ids
+        self.shown = []                   # entry value of each listbox row
+        self.pending_search = None        # after() id of the debounced search
         ttk.Label(self.frame, text=label_text).pack(side=tk.TOP, anchor=tk.W)
         entry_frame = ttk.Frame(self.frame)
         entry_frame.pack(fill=tk.X)
@@ -33,42 +147,39 @@ class AutocompletePanel:
     def clear(self):
         self.entry.delete(0, tk.END)
         self.listbox.delete(0, tk.END)
+        self.shown = []
 
     def update_suggestions(self, event=None):
-        search_term = self.entry.get().lower()
-        self.listbox.delete(0, tk.END)
-        
+        """Search once typing pauses instead of on every key"""
+        if self.pending_search is not None:
+            self.frame.after_cancel(self.pending_search)
+        self.pending_search = self.frame.after(SEARCH_DELAY_MS, self.show_suggestions)
+
+    def show_suggestions(self):
+        self.pending_search = None
+        search_term = self.entry.get().strip()
+
         if not self.is_spell_panel:
-            # Regular panel behavior for non-spell panels
-            for value in self.values:
-                if search_term in str(value).lower():
-                    self.listbox.insert(tk.END, value)
+            self.shown = [self.index.values[i] for i in self.index.search(search_term)]
+            rows = self.shown
+        elif search_term.isdigit():
+            # Search in spell IDs, showing each ID with its name
+            self.shown = [self.id_index.values[i] for i in self.id_index.search(search_term)]
+            rows = [f"{value} - {self.id_names[int(value)]}" if int(value) in self.id_names else value
+                    for value in self.shown]
         else:
-            # Special handling for spell panel
-            is_numeric = search_term.isdigit()
-            if is_numeric:
-                # Search in spell IDs
-                search_int = int(search_term)
-                for value in self.values['ids']:
-                    if search_term in str(value):
-                        # Show both ID and name in the suggestion
-                        name_index = list(self.values['ids']).index(value)
-                        spell_name = self.values['names'][name_index] if name_index < len(self.values['names']) else ""
-                        display_text = f"{value} - {spell_name}"
-                        self.listbox.insert(tk.END, str(value))
-            else:
-                # Search in spell names
-                for value in self.values['names']:
-                    if search_term in str(value).lower():
-                        # Show both name and ID in the suggestion
-                        id_index = list(self.values['names']).index(value)
-                        spell_id = self.values['ids'][id_index] if id_index < len(self.values['ids']) else ""
-                        display_text = f"{value} - {spell_id}"
-                        self.listbox.insert(tk.END, value)
+            # Search in spell names, showing each name with its IDs
+            self.shown = [self.index.values[i] for i in self.index.search(search_term)]
+            rows = [f"{value} - {', '.join(map(str, self.name_ids[value]))}" if value in self.name_ids else value
+                    for value in self.shown]
+
+        self.listbox.delete(0, tk.END)
+        if rows:
+            self.listbox.insert(tk.END, *rows)
 
     def on_select(self, event):
         if self.listbox.curselection():
-            selected = self.listbox.get(self.listbox.curselection())
+            selected = self.shown[self.listbox.curselection()[0]]
             self.entry.delete(0, tk.END)
             self.entry.insert(0, selected)
 
@@ -79,12 +190,23 @@ class AutocompletePanel:
             else:
                 # If given a single list, assume they're all names
                 self.values = {'names': values, 'ids': []}
+            self.index = SearchIndex(self.values['names'])
+            self.id_index = SearchIndex(self.values['ids'])
+            # (id, name) pairs seen in the data link the two searches
+            self.id_names = {}
+            self.name_ids = {}
+            for spell_id, name in self.values.get('pairs', []):
+                self.id_names[spell_id] = name
+                self.name_ids.setdefault(name, []).append(spell_id)
+            for ids in self.name_ids.values():
+                ids.sort()
         else:
             # For non-spell panels, maintain backwards compatibility
             if isinstance(values, list):
                 self.values = values
             else:
                 self.values = []
+            self.index = SearchIndex(self.values)
 
 class CSVVisualizer:
     def __init__(self, root):
@@ -105,6 +227,24 @@ class CSVVisualizer:
         self.current_event_type = None
         self.map_image = None  # Store the map image
         self.last_plot_params = None  # Store last plot parameters
+        self.boss_tracks = {}  # Boss position tracks by encounter id
+        self.boss_track_arrays = None  # Concatenated boss tracks for vectorized lookups
+        self.floor_order = None  # Row indices sorted by uiMapID
+        self.floor_ranges = {}  # uiMapID -> (start, end) into floor_order
+        self.encounter_keys = None  # sorted encounter ids of the loaded rows
+        self.encounter_offsets = None  # rows of encounter_keys[i] are offsets[i]:offsets[i + 1]
+        self.store = None  # Indexed SQLite store used for filtering when enabled
+        self.owner_names = None  # unit id -> name of its top-level owner
+        self.unit_choices = {}  # merge pets -> unit names for the unit panel, built at load
+        self.encounter_choices = []  # every encounter id of the loaded data, for auto-fill
+        self.floor_rows = {}  # uiMapID -> rows on that floor, for the floor selector
+        self.position_tracks = None  # Run-length collapsed per-unit positions from CSVtoCSV
+        self.movement_levels = {}  # resolution (s) -> precomputed movement track DataFrame
+        self.death_table = None  # each encounter's deaths in order, for death thresholds
+        self.filter_cache = FilterCache()  # recent plot_data filter results, cleared on load
+        self.load_events = queue.Queue()  # progress and results from the loader thread
+        self.load_id = 0  # id of the current load, events of replaced loads are ignored
+        self.load_cancel = None  # cancel event of the load in progress
 
         # Helper functions for path visualization
         def decimate_points(x, y, times=None, threshold=1.0):
@@ -218,6 +358,11 @@ class CSVVisualizer:
         ttk.Button(image_btn_frame, text="Load CSV",
                 command=self.load_csv).pack(pady=2)
 
+        # Filter through an indexed on-disk database instead of scanning the DataFrame
+        self.use_store_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(image_btn_frame, text="Indexed store (SQLite)",
+                        variable=self.use_store_var).pack(pady=2)
+
         # Add boss position frame
         boss_frame = ttk.Frame(image_frame)
         boss_frame.pack(side=tk.LEFT, padx=5)
@@ -234,6 +379,11 @@ class CSVVisualizer:
         self.boss_y = ttk.Entry(boss_coord_frame, width=10)
         self.boss_y.pack(side=tk.LEFT, padx=2)
 
+        # Plot positions relative to the logged boss track
+        self.boss_relative_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(boss_frame, text="Boss-relative",
+                        variable=self.boss_relative_var).pack()
+
         # Add map control frame
         map_control_frame = ttk.LabelFrame(image_frame, text="Map Controls")
         map_control_frame.pack(side=tk.LEFT, padx=5, fill=tk.Y)
@@ -287,6 +437,18 @@ class CSVVisualizer:
         self.data_rotation_var = tk.StringVar(value="0")
         ttk.Entry(data_control_frame, textvariable=self.data_rotation_var, width=10).pack()
 
+        # Background load progress
+        load_frame = ttk.Frame(main_frame)
+        load_frame.pack(fill=tk.X, pady=2)
+        self.load_status = ttk.Label(load_frame, text="No data loaded", width=40)
+        self.load_status.pack(side=tk.LEFT, padx=5)
+        self.load_progress = ttk.Progressbar(load_frame, mode='determinate', maximum=100)
+        self.load_progress.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        self.cancel_load_btn = ttk.Button(load_frame, text="Cancel Load", command=self.cancel_load,
+                                          state=tk.DISABLED)
+        self.cancel_load_btn.pack(side=tk.LEFT, padx=5)
+        self.root.after(100, self.poll_load_events)
+
         # Add debug log frame
         log_frame = ttk.LabelFrame(main_frame, text="Filter Log")
         log_frame.pack(fill=tk.BOTH, expand=True, pady=5)
@@ -343,6 +505,12 @@ class CSVVisualizer:
         self.unit_panel = AutocompletePanel(filter_frame, "Unit Filter")
         self.unit_panel.frame.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
 
+        # Roll pet and guardian events up to their owners
+        self.merge_pets_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(self.unit_panel.frame, text="Merge pets into owners",
+                        variable=self.merge_pets_var,
+                        command=self.refresh_unit_values).pack(anchor=tk.W)
+
         self.spell_panel = AutocompletePanel(filter_frame, "Spell Filter: Name or ID", is_spell_panel=True)
         self.spell_panel.frame.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
 
@@ -355,12 +523,21 @@ class CSVVisualizer:
         # Add auto-fill button for encounter IDs
         def autofill_encounters():
             if self.df is not None:
-                encounter_ids = sorted(self.df['encounter id'].unique())
+                encounter_ids = self.encounter_choices
                 self.encounter_entry.delete(0, tk.END)
                 self.encounter_entry.insert(0, ','.join(map(str, encounter_ids)))
         
         ttk.Button(encounter_frame, text="Auto-fill IDs", command=autofill_encounters).pack()
 
+        # Floor (uiMapID) selection for multi-floor encounters
+        floor_frame = ttk.Frame(filter_frame)
+        floor_frame.pack(side=tk.LEFT, padx=5)
+        ttk.Label(floor_frame, text="Floor (uiMapID):").pack()
+        self.floor_var = tk.StringVar(value="All floors")
+        self.floor_combo = ttk.Combobox(floor_frame, textvariable=self.floor_var,
+                                        values=["All floors"], width=16, state="readonly")
+        self.floor_combo.pack()
+
         threshold_frame = ttk.Frame(filter_frame)
         threshold_frame.pack(side=tk.LEFT, padx=5)
         ttk.Label(threshold_frame, text="Death Threshold:").pack()
@@ -416,13 +593,13 @@ class CSVVisualizer:
             self.log_message(f"Type: {label}")
 
     def load_csv(self):
-        path = filedialog.askopenfilename(filetypes=[("CSV Files", "*.csv")])
+        path = filedialog.askopenfilename(filetypes=[("CSV Files", "*.csv *.csv.gz *.csv.zst")])
         if path:
             self.process_file(path)
 
     def handle_file_drop(self, event):
         path = event.data.strip('{}"')
-        if path.lower().endswith('.csv'):
+        if path.lower().endswith(('.csv', '.csv.gz', '.csv.zst')):
             self.process_file(path)
         else:
             messagebox.showwarning("Invalid File", "Please drop a CSV file")
@@ -442,37 +619,830 @@ class CSVVisualizer:
         self.log_text.configure(state='disabled')
 
     def process_file(self, path):
+        """Start loading a processed CSV on a worker thread; the panels fill in once it is ready"""
+        # Convert relative paths to absolute using current_dir if needed
+        if not os.path.isabs(path):
+            path = self.current_dir / path
+
+        # A newly dropped file replaces a load in progress
+        if self.load_cancel is not None:
+            self.load_cancel.set()
+        self.load_id += 1
+        self.load_cancel = threading.Event()
+        self.load_progress['value'] = 0
+        self.load_status.config(text=f"Loading {Path(path).name}...")
+        self.cancel_load_btn.config(state=tk.NORMAL)
+        threading.Thread(target=self.load_worker,
+                         args=(self.load_id, path, self.use_store_var.get(), self.load_cancel),
+                         daemon=True).start()
+
+    def load_worker(self, load_id, path, use_store, cancel):
+        """Loader thread: prepare the data and post progress, log lines and the result to load_events"""
+        def progress(done, total):
+            self.load_events.put(("progress", load_id, done, total))
+
+        def log(message):
+            self.load_events.put(("log", load_id, message))
+
         try:
-            # Convert relative paths to absolute using current_dir if needed
-            if not os.path.isabs(path):
-                path = self.current_dir / path
-                
-            self.df = pd.read_csv(path)
-            self.df['timestamp'] = pd.to_datetime(
-                self.df['timestamp'], format="%m/%d/%Y %H:%M:%S.%f", errors='coerce'
-            )
-            # Convert spell_id to integer, handling NaN values
-            self.df['spell id'] = pd.to_numeric(self.df['spell id'], errors='coerce').fillna(-1).astype('Int64')
-            
-            units = sorted(set(self.df['Damage source'].dropna()) | set(self.df['Spell destination'].dropna()))
-            
-            # Process spell names and IDs
-            spell_names = sorted(self.df['spell name'].dropna().unique())
-            spell_ids = sorted(self.df['spell id'].dropna().astype('Int64').unique())
-            spell_values = {
-                'names': spell_names,
-                'ids': spell_ids
+            loaded = self.prepare_load(path, use_store, progress, cancel, log)
+        except PipelineCancelled:
+            self.load_events.put(("cancelled", load_id))
+        except Exception as e:
+            self.load_events.put(("failed", load_id, str(e)))
+        else:
+            self.load_events.put(("done", load_id, loaded))
+
+    def prepare_load(self, path, use_store, progress, cancel, log):
+        """
+        Read the data and build everything derived from it (loader thread): owner columns,
+        sidecar tables, encounter and floor lookups, the death table and the panel values.
+        With use_store the indexed store is opened (built if needed) and filtering goes
+        through it, so only the STORE_FRAME_EVENTS rows are loaded into memory.
+        Nothing here touches Tk; finish_load installs the result.
+        """
+        store = self.open_store(path, progress, cancel, log) if use_store else None
+        try:
+            if store is not None:
+                df = self.compact_types(store.query(event_types=STORE_FRAME_EVENTS))
+                df = self.sort_by_encounter(df)
+                log(f"Read the encounter and death rows of {store.db_path.name}")
+                distinct = lambda column: store.distinct(column)[column]
+                spells = store.distinct('spell id', 'spell name')
+                floor_rows = {int(map_id): rows for map_id, rows in store.counts('ui map id').items()
+                              if map_id >= 0}
+            else:
+                df, source_name = self.read_frame(path, progress, cancel)
+                df = self.sort_by_encounter(df)
+                log(f"Read {source_name}")
+                distinct = lambda column: df[column].dropna().unique()
+                spells = df
+                floor_rows = None
+            owner_names = self.read_owner_names(path, log)
+            if store is None:
+                # The store resolves owners when it is built
+                self.add_owner_columns(df, owner_names)
+            check_cancelled(cancel)
+
+            encounter_index = self.encounter_index(df)
+            floor_order, floor_ranges = self.floor_partitions(df)
+            if floor_rows is None:
+                floor_rows = {map_id: end - start for map_id, (start, end) in floor_ranges.items()}
+            if len(floor_rows) > 1:
+                log(f"Found {len(floor_rows)} floors: {', '.join(map(str, floor_rows))}")
+            loaded = {
+                'path': path,
+                'store': store,
+                'df': df,
+                'owner_names': owner_names,
+                'encounter_index': encounter_index,
+                'encounter_choices': sorted(distinct('encounter id')),
+                'position_tracks': self.read_position_tracks(path, owner_names, log),
+                'movement_levels': self.read_movement_levels(path, owner_names, log),
+                'boss_tracks': self.read_boss_tracks(path, log),
+                'floors': (floor_order, floor_ranges, floor_rows),
+                'death_table': self.build_death_table(df),
+                'unit_choices': {merge: self.unit_values(distinct, merge) for merge in (False, True)},
+                'spell_values': self.spell_values(spells),
             }
-            
-            self.unit_panel.set_values(units)
-            self.spell_panel.set_values(spell_values)
-            self.log_message(f"Loaded {len(self.df)} records")
-            self.log_message(f"Unique spell names: {len(spell_names)}")
-            self.log_message(f"Unique spell IDs: {len(spell_ids)}")
+            check_cancelled(cancel)
+            self.log_encounter_summary(df, log)
+            memory_mb = df.memory_usage(deep=True).sum() / (1024 * 1024)
+            log(f"Loaded {len(df)} records ({memory_mb:.1f} MB in memory)")
+            log(f"Unique spell names: {len(loaded['spell_values']['names'])}")
+            log(f"Unique spell IDs: {len(loaded['spell_values']['ids'])}")
+            return loaded
+        except BaseException:
+            if store is not None:
+                store.close()
+            raise
+
+    def poll_load_events(self):
+        """Apply the loader thread's events on the Tk thread"""
+        while True:
+            try:
+                event = self.load_events.get_nowait()
+            except queue.Empty:
+                break
+            kind, load_id = event[:2]
+            if load_id != self.load_id:
+                if kind == "done" and event[2]['store'] is not None:
+                    event[2]['store'].close()
+                continue
+            if kind == "progress":
+                done, total = event[2:]
+                self.load_progress['value'] = 100 * done / total if total else 0
+            elif kind == "log":
+                self.log_message(event[2])
+            elif kind == "done":
+                self.end_load("Loaded " + Path(event[2]['path']).name)
+                self.finish_load(event[2])
+            elif kind == "cancelled":
+                self.end_load("Load cancelled")
+                self.log_message("Load cancelled, keeping the previous data")
+            else:
+                self.end_load("Load failed")
+                messagebox.showerror("Error", f"Failed to load file:\n{event[2]}")
+        self.root.after(100, self.poll_load_events)
+
+    def end_load(self, status):
+        self.load_cancel = None
+        self.load_progress['value'] = 100 if status.startswith("Loaded") else 0
+        self.load_status.config(text=status)
+        self.cancel_load_btn.config(state=tk.DISABLED)
+
+    def cancel_load(self):
+        if self.load_cancel is not None:
+            self.load_cancel.set()
+            self.load_status.config(text="Cancelling...")
+
+    def finish_load(self, loaded):
+        """Install the data prepared by the loader thread and fill the filter panels (Tk thread)"""
+        try:
+            self.df = loaded['df']
+            self.filter_cache.clear()
+            self.owner_names = loaded['owner_names']
+            self.encounter_keys, self.encounter_offsets = loaded['encounter_index']
+            self.position_tracks = loaded['position_tracks']
+            self.movement_levels = loaded['movement_levels']
+            self.boss_tracks, self.boss_track_arrays = loaded['boss_tracks']
+            self.floor_order, self.floor_ranges, self.floor_rows = loaded['floors']
+            self.death_table = loaded['death_table']
+            self.unit_choices = loaded['unit_choices']
+            self.encounter_choices = loaded['encounter_choices']
+            self.set_floor_choices()
+            if self.store is not None:
+                self.store.close()
+            self.store = loaded['store']
+
+            self.refresh_unit_values()
+            self.spell_panel.set_values(loaded['spell_values'])
             messagebox.showinfo("Loaded", f"Successfully loaded {len(self.df)} records")
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load file:\n{str(e)}")
 
+    def read_frame(self, path, progress=None, cancel=None):
+        """
+        Load the processed data with compact dtypes, leaving out the columns no view reads.
+        Runs on the loader thread: progress(done, total) is called as it reads and setting
+        cancel raises PipelineCancelled. Returns the DataFrame and the name of the file read.
+        """
+        cols_path = columns_path(path)
+        if is_fresh(cols_path, path):
+            # Typed columns written by CSVtoCSV, read as arrays instead of parsing the CSV;
+            # text columns become categoricals straight from the string table codes
+            columns = read_columns(cols_path, exclude=UNUSED_COLUMNS, text_codes=True)
+            for i, (name, values) in enumerate(columns.items()):
+                check_cancelled(cancel)
+                if isinstance(values, tuple):
+                    codes, categories = values
+                    columns[name] = pd.Categorical.from_codes(codes, categories)
+                if progress is not None:
+                    progress(i + 1, len(columns))
+            return self.compact_types(pd.DataFrame(columns, copy=False)), cols_path.name
+
+        # Compressed pipeline output (.csv.gz / .csv.zst) is decompressed while streaming,
+        # in chunks so progress can be reported and the load cancelled between them
+        dtypes = {name: 'category' for name in CATEGORY_COLUMNS}
+        dtypes.update({name: 'float32' for name in FLOAT32_COLUMNS})
+        chunks = []
+        with ProgressFile(path) as source, open_reader(path, source) as f:
+            with pd.read_csv(f, dtype=dtypes, usecols=lambda name: name not in UNUSED_COLUMNS,
+                             chunksize=LOAD_CHUNK_ROWS) as reader:
+                for chunk in reader:
+                    check_cancelled(cancel)
+                    chunk['timestamp'] = pd.to_datetime(
+                        chunk['timestamp'], format="%m/%d/%Y %H:%M:%S.%f", errors='coerce'
+                    )
+                    chunks.append(self.compact_types(chunk))
+                    if progress is not None:
+                        progress(source.bytes_read, source.total)
+        if not chunks:
+            raise ValueError(f"{Path(path).name} has no rows")
+
+        # Each chunk has its own categories; give them all the union so concat keeps categoricals
+        columns = {}
+        for name in chunks[0].columns:
+            parts = [chunk[name] for chunk in chunks]
+            if isinstance(parts[0].dtype, pd.CategoricalDtype):
+                categories = sorted(set().union(*(part.cat.categories for part in parts)))
+                dtype = pd.CategoricalDtype(categories)
+                parts = [part.astype(dtype) for part in parts]
+            columns[name] = pd.concat(parts, ignore_index=True)
+        return pd.DataFrame(columns), Path(path).name
+
+    def sort_by_encounter(self, df):
+        """Order rows by (encounter id, fight time), keeping log order for ties"""
+        order = np.lexsort((df['relative fight time (s)'].to_numpy(), df['encounter id'].to_numpy()))
+        # Pipeline output is nearly always in this order already, and then needs no copy
+        if np.array_equal(order, np.arange(len(order))):
+            return df
+        return df.take(order).reset_index(drop=True)
+
+    def encounter_index(self, df):
+        """Sorted encounter ids and their row offsets in the sorted data, so an encounter is a slice"""
+        encounters = df['encounter id'].to_numpy()
+        keys, starts = np.unique(encounters, return_index=True)
+        return keys, np.append(starts, len(encounters))
+
+    def encounter_slices(self, encounter_ids=None, start_time=None, end_time=None):
+        """
+        (lo, hi) row bounds of the given (or all) encounters within a fight-time window: each
+        encounter is a slice of the sorted data and the window is binary searched inside it
+        """
+        keys, offsets = self.encounter_keys, self.encounter_offsets
+        if encounter_ids is None:
+            positions = np.arange(len(keys))
+        else:
+            ids = np.unique(np.asarray(encounter_ids, dtype=np.int64))
+            positions = np.searchsorted(keys, ids)
+            found = positions < len(keys)
+            positions, ids = positions[found], ids[found]
+            positions = positions[keys[positions] == ids]
+
+        times = self.df['relative fight time (s)'].to_numpy()
+        slices = []
+        for pos in positions:
+            lo, hi = offsets[pos], offsets[pos + 1]
+            segment = times[lo:hi]
+            first = np.searchsorted(segment, start_time, side='left') if start_time is not None else 0
+            last = np.searchsorted(segment, end_time, side='right') if end_time is not None else hi - lo
+            if last > first:
+                slices.append((lo + first, lo + last))
+        return slices
+
+    def slice_rows(self, slices):
+        """Positions of the selected floor's rows inside (lo, hi) slices of the data, in data order"""
+        floor = self.selected_floor()
+        if floor is None:
+            parts = [np.arange(lo, hi) for lo, hi in slices]
+        else:
+            # A floor's rows are in data order, so each slice is binary searched in them
+            start, end = self.floor_ranges[floor]
+            floor_rows = self.floor_order[start:end]
+            parts = [floor_rows[np.searchsorted(floor_rows, lo):np.searchsorted(floor_rows, hi)]
+                     for lo, hi in slices]
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.intp)
+
+    def floor_row_count(self):
+        """Rows on the selected floor, or in the whole dataset if no floor is selected"""
+        floor = self.selected_floor()
+        return len(self.df) if floor is None else self.floor_rows[floor]
+
+    def compact_types(self, df):
+        """Narrow the numeric columns of a loaded frame"""
+        # Columnar files from older runs hold wider types; missing ids and spell ids become -1
+        for name in FLOAT32_COLUMNS:
+            if name in df.columns:
+                df[name] = df[name].astype('float32', copy=False)
+        for name in INT32_COLUMNS:
+            if name in df.columns and df[name].dtype != np.int32:
+                df[name] = pd.to_numeric(df[name], errors='coerce').fillna(-1).astype('int32')
+        # Validate positions once so plots read the coordinate arrays as they are
+        df[VALID_COLUMN] = valid_positions(df['X coord'].to_numpy(), df['Y coord'].to_numpy())
+        return df
+
+    def coordinates(self, data):
+        """X/Y coordinate columns and the position mask computed at load"""
+        return data['X coord'], data['Y coord'], data[VALID_COLUMN]
+
+    def read_owner_names(self, path, log):
+        """Unit id -> name of its top-level owner from the unit table written by CSVtoCSV, or None"""
+        units_path = sidecar_path(path, "units")
+        if not units_path.exists():
+            return None
+
+        units = pd.read_csv(units_path).sort_values('unit id')
+        unit_ids = units['unit id'].to_numpy()
+        owner_ids = units['owner id'].to_numpy()
+        # Each unit resolves to its top-level owner, or to itself if it has none
+        root_ids = np.where(owner_ids >= 0, owner_ids, unit_ids)
+        pets = int((owner_ids >= 0).sum())
+        if pets:
+            log(f"Resolved owners for {pets} pets/guardians")
+        return units['name'].to_numpy(dtype=object)[root_ids]
+
+    def add_owner_columns(self, df, owner_names):
+        """Add owner-resolved unit columns to a loaded frame"""
+        df['Source owner'] = df['Damage source']
+        df['Destination owner'] = df['Spell destination']
+        if 'source unit id' not in df.columns or owner_names is None:
+            return
+
+        for id_col, name_col, owner_col in (
+            ('source unit id', 'Damage source', 'Source owner'),
+            ('destination unit id', 'Spell destination', 'Destination owner')
+        ):
+            df[owner_col] = pd.Categorical(self.resolve_owner_names(df[id_col], df[name_col], owner_names))
+
+    def read_position_tracks(self, path, owner_names, log):
+        """The per-unit position runs (start, end, count) written by CSVtoCSV, or None"""
+        tracks_path = sidecar_path(path, "positions")
+        if not tracks_path.exists():
+            return None
+
+        tracks = pd.read_csv(tracks_path)
+        for name in ('X coord', 'Y coord'):
+            tracks[name] = pd.to_numeric(tracks[name], errors='coerce').astype('float32')
+        tracks['owner name'] = self.resolve_owner_names(tracks['unit id'], tracks['unit name'], owner_names)
+        log(f"Loaded {len(tracks)} position runs covering {int(tracks['count'].sum())} samples")
+        return tracks
+
+    def resolve_owner_names(self, unit_ids, names, owner_names):
+        """Top-level owner name for each unit id, falling back to the unit's own name"""
+        owners = names.to_numpy(dtype=object).copy()
+        if owner_names is not None:
+            ids = unit_ids.fillna(-1).to_numpy(np.int64)
+            known = (ids >= 0) & (ids < len(owner_names))
+            owners[known] = owner_names[ids[known]]
+        return owners
+
+    def read_movement_levels(self, path, owner_names, log):
+        """Read the precomputed multi-resolution movement tracks written by CSVtoCSV"""
+        levels = {}
+        for resolution in RESOLUTIONS:
+            level_path = movement_path(path, resolution)
+            if not is_fresh(level_path, path):
+                continue
+            level = pd.DataFrame(read_columns(level_path), copy=False)
+            level['owner name'] = self.resolve_owner_names(level['unit id'], level['unit name'], owner_names)
+            levels[resolution] = level
+        if levels:
+            log("Loaded movement tracks at " + ", ".join(f"{resolution:g}s" for resolution in levels))
+        return levels
+
+    def pick_movement_level(self, span):
+        """
+        Finest precomputed resolution that draws a span of this many seconds in at most MAX_PATH_POINTS.
+        None if that level was not written because the position runs are sparser than its grid:
+        the runs themselves are the finer path then.
+        """
+        for resolution in RESOLUTIONS:
+            if span / resolution <= MAX_PATH_POINTS:
+                return resolution if resolution in self.movement_levels else None
+        return max(self.movement_levels)
+
+    def fight_span(self, encounter_ids=None):
+        """Longest fight duration among the given (or all) encounters"""
+        ends = self.df[self.df['event type'] == 'ENCOUNTER_END']
+        if encounter_ids:
+            ends = ends[ends['encounter id'].isin(encounter_ids)]
+        durations = pd.to_numeric(ends['relative fight time (s)'], errors='coerce').dropna()
+        return float(durations.max()) if len(durations) else 600.0
+
+    def level_movement(self, resolution, unit, encounter_ids=None, death_threshold=None,
+                       min_time=None, max_time=None):
+        """A unit's path from one precomputed movement level, filtered like the row-based path"""
+        level = self.movement_levels[resolution]
+        name_col = 'owner name' if self.merge_pets_var.get() else 'unit name'
+        mask = np.array(level[name_col] == unit, dtype=bool)
+        if encounter_ids:
+            mask = mask & level['encounter id'].isin(encounter_ids).to_numpy()
+        floor = self.selected_floor()
+        if floor is not None:
+            mask = mask & (level['ui map id'] == floor).to_numpy()
+        rows = level[mask]
+        movement = pd.DataFrame({
+            'encounter id': rows['encounter id'].to_numpy(np.int64),
+            'relative fight time (s)': rows['relative fight time (s)'].to_numpy(np.float64),
+            'x': rows['X coord'].to_numpy(np.float64),
+            'y': rows['Y coord'].to_numpy(np.float64),
+        })
+        return self.cut_movement(movement, death_threshold, min_time, max_time)
+
+    def cut_movement(self, movement, death_threshold=None, min_time=None, max_time=None):
+        """Apply the time window and death threshold to a movement frame and sort it by fight time"""
+        times = movement['relative fight time (s)'].to_numpy()
+        keep = np.ones(len(movement), dtype=bool)
+        if min_time is not None:
+            keep &= times >= min_time
+        if max_time is not None:
+            keep &= times <= max_time
+        if death_threshold:
+            keep &= times <= self.death_cutoffs(
+                death_threshold, movement['encounter id'].to_numpy(), 'relative fight time (s)')
+        return movement[keep].sort_values(['encounter id', 'relative fight time (s)'], kind='stable')
+
+    def build_death_table(self, df):
+        """Number each encounter's deaths (on any floor) in order, so nth-death cutoffs are a lookup"""
+        deaths = df.loc[
+            (df['event type'] == 'UNIT_DIED').to_numpy(),
+            ['encounter id', 'timestamp', 'relative fight time (s)', 'unit died sequence']
+        ].reset_index(drop=True)
+        deaths['death number'] = deaths.groupby('encounter id').cumcount() + 1
+        return deaths
+
+    def death_cutoffs(self, threshold, encounter_ids, column='timestamp'):
+        """
+        Per-row limit for a death threshold: the column value (timestamp or fight time) at the
+        nth death of each row's encounter, and no limit where the encounter has fewer deaths
+        """
+        encounter_ids = np.asarray(encounter_ids, dtype=np.int64)
+        nth = self.death_table[self.death_table['death number'] == threshold]
+        nth_ids = nth['encounter id'].to_numpy(np.int64)
+        if column == 'timestamp':
+            values = nth[column].to_numpy('datetime64[ns]')
+            no_limit = np.datetime64(np.iinfo(np.int64).max, 'ns')
+        else:
+            values = nth[column].to_numpy(np.float64)
+            no_limit = np.inf
+        # Encounter ids are small consecutive numbers, so the lookup is a plain array
+        lookup = np.full(int(max(encounter_ids.max(initial=0), nth_ids.max(initial=0))) + 1, no_limit,
+                         dtype=values.dtype)
+        lookup[nth_ids] = values
+        return lookup[encounter_ids.clip(0)]
+
+    def track_movement(self, unit, encounter_ids=None, death_threshold=None, min_time=None, max_time=None):
+        """
+        A unit's positions from the position tracks, one point at the start and
+        one at the end of each stationary run, filtered like the row-based path
+        """
+        tracks = self.position_tracks
+        name_col = 'owner name' if self.merge_pets_var.get() else 'unit name'
+        mask = np.array(tracks[name_col] == unit, dtype=bool)
+        if encounter_ids:
+            mask = mask & tracks['encounter id'].isin(encounter_ids).to_numpy()
+        floor = self.selected_floor()
+        if floor is not None:
+            mask = mask & (tracks['ui map id'] == floor).to_numpy()
+        runs = tracks[mask]
+
+        # Clamp the runs to the time window and death cutoff before expanding them,
+        # so a run that straddles a cutoff keeps a point at the edge instead of losing its end
+        starts = runs['start (s)'].to_numpy(np.float64)
+        ends = runs['end (s)'].to_numpy(np.float64)
+        if min_time is not None:
+            starts = np.maximum(starts, min_time)
+        if max_time is not None:
+            ends = np.minimum(ends, max_time)
+        if death_threshold:
+            ends = np.minimum(ends, self.death_cutoffs(
+                death_threshold, runs['encounter id'].to_numpy(), 'relative fight time (s)'))
+        inside = starts <= ends
+        runs, starts, ends = runs[inside], starts[inside], ends[inside]
+
+        # Expand each run back to its first and (if it repeats) last sample
+        repeats = np.where((runs['count'].to_numpy() > 1) & (ends > starts), 2, 1)
+        times = np.repeat(starts, repeats)
+        is_end = np.zeros(len(times), dtype=bool)
+        is_end[np.cumsum(repeats)[repeats == 2] - 1] = True
+        times[is_end] = ends[repeats == 2]
+        movement = pd.DataFrame({
+            'encounter id': np.repeat(runs['encounter id'].to_numpy(np.int64), repeats),
+            'relative fight time (s)': times,
+            'x': np.repeat(runs['X coord'].to_numpy(), repeats),
+            'y': np.repeat(runs['Y coord'].to_numpy(), repeats),
+        })
+        return self.cut_movement(movement)
+
+    def read_boss_tracks(self, path, log):
+        """
+        The per-encounter boss position tracks written by CSVtoCSV, as a dict by encounter id
+        and the concatenated arrays boss_position_at searches
+        """
+        boss_tracks = {}
+        tracks_path = sidecar_path(path, "boss_tracks")
+        if not tracks_path.exists():
+            return boss_tracks, None
+
+        tracks = pd.read_csv(tracks_path).sort_values(
+            ['encounter id', 'relative fight time (s)'], kind='stable'
+        )
+        enc = tracks['encounter id'].to_numpy(np.int64)
+        t = tracks['relative fight time (s)'].to_numpy(np.float64)
+        x = tracks['X coord'].to_numpy(np.float32)
+        y = tracks['Y coord'].to_numpy(np.float32)
+        facing = tracks['Facing direction'].to_numpy(np.float32)
+        # Sorted (encounter, time) key so lookups for many rows are one searchsorted
+        arrays = (enc, t, enc * 1e6 + t, x, y, facing)
+
+        for enc_id, group in tracks.groupby('encounter id'):
+            boss_tracks[int(enc_id)] = {
+                'name': group['boss name'].iloc[0],
+                't': group['relative fight time (s)'].to_numpy(np.float32),
+                'x': group['X coord'].to_numpy(np.float32),
+                'y': group['Y coord'].to_numpy(np.float32),
+                'facing': group['Facing direction'].to_numpy(np.float32)
+            }
+        log(f"Loaded boss tracks for {len(boss_tracks)} encounters")
+        return boss_tracks, arrays
+
+    def boss_position_at(self, encounter_ids, times):
+        """Interpolated boss (x, y, facing) for each (encounter, fight time) pair; NaN without a track"""
+        encounter_ids = np.asarray(encounter_ids, dtype=np.int64)
+        times = np.asarray(times, dtype=np.float64)
+        bx = np.full(times.shape, np.nan)
+        by = np.full(times.shape, np.nan)
+        bf = np.full(times.shape, np.nan)
+        if self.boss_track_arrays is None or times.size == 0:
+            return bx, by, bf
+
+        enc, t, keys, x, y, facing = self.boss_track_arrays
+        starts = np.searchsorted(enc, encounter_ids, side='left')
+        ends = np.searchsorted(enc, encounter_ids, side='right')
+        has = ends > starts
+
+        # Last sample at or before each time, clamped into its encounter's track
+        idx = np.searchsorted(keys, encounter_ids * 1e6 + times, side='right') - 1
+        idx = np.minimum(np.maximum(idx, starts), ends - 1)[has]
+        nxt = np.minimum(idx + 1, ends[has] - 1)
+        t0, t1 = t[idx], t[nxt]
+        span = np.where(t1 > t0, t1 - t0, 1.0)
+        frac = np.clip((times[has] - t0) / span, 0.0, 1.0)
+
+        bx[has] = x[idx] + frac * (x[nxt] - x[idx])
+        by[has] = y[idx] + frac * (y[nxt] - y[idx])
+        bf[has] = facing[idx]
+        return bx, by, bf
+
+    def to_boss_frame(self, data, x_col='X coord', y_col='Y coord'):
+        """Return a copy of data with positions relative to the boss (boss at origin, facing rotated out)"""
+        x = data[x_col].to_numpy(np.float64)
+        y = data[y_col].to_numpy(np.float64)
+        bx, by, bf = self.boss_position_at(
+            data['encounter id'].to_numpy(), data['relative fight time (s)'].to_numpy()
+        )
+        dx, dy = x - bx, y - by
+        cos_f, sin_f = np.cos(-bf), np.sin(-bf)
+        new_x, new_y = dx * cos_f - dy * sin_f, dx * sin_f + dy * cos_f
+        columns = {x_col: new_x, y_col: new_y}
+        if VALID_COLUMN in data.columns and x_col == 'X coord':
+            # Rows without a boss position at their time have no relative position
+            columns[VALID_COLUMN] = valid_positions(new_x, new_y)
+        return data.assign(**columns)
+
+    def draw_boss_position(self, ax, encounter_ids=None, start_time=None, end_time=None):
+        """Draw the boss from the manual X/Y entries, or from the logged boss tracks"""
+        if self.boss_x.get() and self.boss_y.get():
+            try:
+                bx = float(self.boss_x.get())
+                by = float(self.boss_y.get())
+                ax.scatter(bx, by, s=200, marker='*',
+                        color='gold', edgecolor='black',
+                        zorder=10, label='Boss Position')
+                return
+            except ValueError:
+                pass
+
+        if self.boss_relative_var.get():
+            ax.scatter(0, 0, s=200, marker='*', color='gold', edgecolor='black',
+                    zorder=10, label='Boss Position')
+            return
+
+        if encounter_ids is None or len(encounter_ids) == 0:
+            encounter_ids = sorted(self.boss_tracks)
+        labelled = False
+        for enc_id in encounter_ids:
+            track = self.boss_tracks.get(int(enc_id))
+            if track is None:
+                continue
+            t = track['t']
+            window = np.ones(len(t), dtype=bool)
+            if start_time is not None:
+                window &= t >= start_time
+            if end_time is not None:
+                window &= t <= end_time
+            if not window.any():
+                continue
+
+            ax.plot(track['x'][window], track['y'][window], color='gold',
+                    linewidth=1, alpha=0.7, zorder=9)
+            # Star marks the boss at the start of the time window
+            bx, by, _ = self.boss_position_at([enc_id], [t[window][0]])
+            ax.scatter(bx, by, s=200, marker='*', color='gold', edgecolor='black',
+                    zorder=10, label=None if labelled else f"Boss Position ({track['name']})")
+            labelled = True
+
+    def floor_partitions(self, df):
+        """Row indices grouped by uiMapID and each floor's (start, end) in them, so a floor is a single slice"""
+        if 'ui map id' not in df.columns:
+            return None, {}
+
+        map_ids = pd.to_numeric(df['ui map id'], errors='coerce').fillna(-1).astype(np.int64).to_numpy()
+        # Stable sort keeps each floor's rows in their original time order
+        order = np.argsort(map_ids, kind='stable')
+        sorted_ids = map_ids[order]
+        floors, starts, counts = np.unique(sorted_ids, return_index=True, return_counts=True)
+        ranges = {
+            int(map_id): (int(start), int(start + count))
+            for map_id, start, count in zip(floors, starts, counts) if map_id >= 0
+        }
+        return order, ranges
+
+    def set_floor_choices(self):
+        """Fill the floor selector from the loaded floor partitions"""
+        self.floor_var.set("All floors")
+        self.floor_combo['values'] = ["All floors"] + [
+            f"{map_id} ({rows} rows)" for map_id, rows in self.floor_rows.items()
+        ]
+
+    def selected_floor(self):
+        """uiMapID of the selected floor, or None for all floors"""
+        floor = self.floor_var.get()
+        if not self.floor_rows or not floor or floor == "All floors":
+            return None
+        return int(floor.split()[0])
+
+    def open_store(self, path, progress, cancel, log):
+        """Open (building if needed) the indexed SQLite store for a CSV on the loader thread; None if unavailable"""
+        try:
+            log("Opening indexed store...")
+            store = CombatStore.open(path, progress, cancel)
+        except PipelineCancelled:
+            raise
+        except Exception as e:
+            log(f"Indexed store unavailable, filtering in memory: {e}")
+            return None
+        log(f"Indexed store ready: {store.db_path.name} ({len(store)} rows)")
+        return store
+
+    def event_rows(self, event_types, start_time=None, end_time=None):
+        """Rows of these event types on the selected floor within a fight-time window, from the store if open"""
+        if self.store is not None:
+            return self.store.query(event_types=event_types, start_time=start_time, end_time=end_time,
+                                    ui_map_id=self.selected_floor())
+        rows = self.slice_rows(self.encounter_slices(None, start_time, end_time))
+        rows = rows[self.df['event type'].iloc[rows].isin(event_types).to_numpy()]
+        return self.df.iloc[rows]
+
+    def query_store(self, event_types, unit=None, time_and_spell=True):
+        """Run the filter panel as one indexed query; returns (rows, encounter ids) or (None, [])"""
+        encounter_ids = []
+        if self.encounter_entry.get():
+            try:
+                encounter_ids = [int(x.strip()) for x in self.encounter_entry.get().split(',')]
+            except ValueError:
+                messagebox.showwarning("Invalid Input", "Please enter comma-separated numeric encounter IDs")
+                return None, []
+
+        threshold = None
+        if self.death_threshold.get():
+            try:
+                threshold = int(self.death_threshold.get())
+            except ValueError as e:
+                messagebox.showwarning("Threshold Error", str(e))
+                return None, []
+
+        start_time = end_time = spell = None
+        if time_and_spell:
+            try:
+                if self.start_time_entry.get():
+                    start_time = float(self.start_time_entry.get())
+                if self.end_time_entry.get():
+                    end_time = float(self.end_time_entry.get())
+            except ValueError:
+                messagebox.showwarning("Invalid Input", "Please enter valid numeric values for start and end times")
+                return None, []
+            spell = self.spell_panel.entry.get() or None
+            if spell and spell.isdigit():
+                spell = int(spell)
+
+        filtered = self.store.query(
+            encounter_ids=encounter_ids, event_types=event_types, unit=unit,
+            unit_columns=self.unit_columns(), spell=spell, start_time=start_time,
+            end_time=end_time, death_threshold=threshold, ui_map_id=self.selected_floor()
+        )
+        self.log_message(f"Indexed query returned {len(filtered)} records")
+        return filtered, encounter_ids
+
+    def log_encounter_summary(self, df, log):
+        """Log difficulty, group size and kill/wipe for each encounter"""
+        if 'success' not in df.columns:
+            return
+        ends = df[df['event type'] == 'ENCOUNTER_END']
+        for _, end in ends.iterrows():
+            result = "Kill" if end['success'] == 1 else "Wipe"
+            log(
+                f"Encounter {end['encounter id']}: {end['encounter name']} "
+                f"(difficulty {end['difficulty id']}, {end['group size']} players) - {result}"
+            )
+
+    def unit_columns(self):
+        """Return the (source, destination) columns to use for unit filtering"""
+        if self.merge_pets_var.get():
+            return 'Source owner', 'Destination owner'
+        return 'Damage source', 'Spell destination'
+
+    def unit_values(self, distinct, merge_pets):
+        """
+        Sorted unit names in the source and destination columns, with or without pets merged;
+        distinct(column) returns a column's values without missing ones
+        """
+        source_col, dest_col = ('Source owner', 'Destination owner') if merge_pets else (
+            'Damage source', 'Spell destination')
+        return sorted(set(distinct(source_col)) | set(distinct(dest_col)))
+
+    def spell_values(self, df):
+        """Spell names, ids and (id, name) pairs for the spell panel, from rows with spell columns"""
+        spell_names = sorted(df['spell name'].dropna().unique())
+        spell_ids = sorted(df['spell id'].dropna().astype('Int64').unique())
+        # Each (spell id, name) pair once, so the spell panel can show one with the other
+        spells = df.loc[pd.to_numeric(df['spell id']).to_numpy() >= 0, ['spell id', 'spell name']]
+        spells = spells.drop_duplicates().dropna()
+        return {
+            'names': spell_names,
+            'ids': spell_ids,
+            'pairs': list(zip(spells['spell id'].astype(int), spells['spell name'].astype(str)))
+        }
+
+    def refresh_unit_values(self):
+        """Fill the unit panel from the current unit columns"""
+        if self.df is None:
+            return
+        self.unit_panel.set_values(self.unit_choices[self.merge_pets_var.get()])
+
+    def filter_key(self):
+        """
+        Normalized filter panel state for plot_data: (floor, event types, merge pets, encounters,
+        death threshold, start time, end time, unit, spell). Warns and returns None on invalid input.
+        """
+        encounter_ids = ()
+        if self.encounter_entry.get():
+            try:
+                encounter_ids = tuple(sorted({int(x.strip()) for x in self.encounter_entry.get().split(',')}))
+            except ValueError:
+                messagebox.showwarning("Invalid Input", "Please enter comma-separated numeric encounter IDs")
+                return None
+
+        threshold = None
+        if self.death_threshold.get():
+            try:
+                threshold = int(self.death_threshold.get())
+            except ValueError as e:
+                messagebox.showwarning("Threshold Error", str(e))
+                return None
+
+        try:
+            start_time = float(self.start_time_entry.get()) if self.start_time_entry.get() else None
+            end_time = float(self.end_time_entry.get()) if self.end_time_entry.get() else None
+        except ValueError:
+            messagebox.showwarning("Invalid Input", "Please enter valid numeric values for start and end times")
+            return None
+
+        return (self.selected_floor(), tuple(sorted(self.current_event_type)), self.merge_pets_var.get(),
+                encounter_ids, threshold, start_time, end_time,
+                self.unit_panel.entry.get() or None, self.spell_panel.entry.get() or None)
+
+    def filter_frame(self, key):
+        """
+        Run the plot_data filter chain for a filter_key. The encounters and the time window
+        are slices of the sorted data, so only their rows are taken; the other filters narrow
+        those row positions, and only the rows and columns the plot needs are taken out at the end.
+        Returns the filtered rows and the encounter ids to plot.
+        """
+        _, event_types, _, encounter_ids, threshold, start_time, end_time, unit, spell_filter = key
+        data = self.df
+        self.log_message("\nFiltering Data:")
+        self.log_message(f"Initial records: {self.floor_row_count()}")
+
+        encounter_ids = list(encounter_ids)
+        rows = None
+        if encounter_ids:
+            rows = self.slice_rows(self.encounter_slices(encounter_ids))
+            self.log_message(f"After encounter filter: {len(rows)} records")
+            if not len(rows):
+                raise ValueError(f"No data for encounters {encounter_ids}")
+
+        # Apply timeframe filter
+        if start_time is not None or end_time is not None:
+            rows = self.slice_rows(self.encounter_slices(encounter_ids or None, start_time, end_time))
+            self.log_message(f"After timeframe filter: {len(rows)} records")
+        elif rows is None:
+            rows = self.slice_rows(self.encounter_slices())
+
+        # Apply death threshold filtering for all encounters
+        if threshold is not None:
+            encounter_col = data['encounter id'].to_numpy()[rows]
+            # Get all unique encounter IDs if none specified
+            if not encounter_ids:
+                encounter_ids = list(pd.unique(encounter_col))
+            # Keep events up to the nth death of their encounter (deaths on every floor count)
+            rows = rows[data['timestamp'].to_numpy()[rows] <= self.death_cutoffs(threshold, encounter_col)]
+            self.log_message(f"After death threshold: {len(rows)} records")
+
+        rows = rows[data['event type'].iloc[rows].isin(event_types).to_numpy()]
+        self.log_message(f"After event type filter: {len(rows)} records")
+
+        source_col, dest_col = self.unit_columns()
+        if unit:
+            rows = rows[((data[source_col].iloc[rows] == unit) | (data[dest_col].iloc[rows] == unit)).to_numpy()]
+            self.log_message(f"After unit filter: {len(rows)} records")
+
+        if spell_filter:
+            if spell_filter.isdigit():
+                # Filter by spell ID (convert to integer for comparison)
+                spell_id = int(spell_filter)
+                rows = rows[data['spell id'].to_numpy()[rows] == spell_id]
+                self.log_message(f"After spell ID filter ({spell_id}): {len(rows)} records")
+            else:
+                # Filter by spell name
+                rows = rows[(data['spell name'].iloc[rows] == spell_filter).to_numpy()]
+                self.log_message(f"After spell name filter ({spell_filter}): {len(rows)} records")
+
+        columns = [name for name in PLOT_COLUMNS if name in data.columns]
+        filtered = data.iloc[rows, data.columns.get_indexer(columns)]
+        return filtered, encounter_ids
+
     def plot_data(self, plot_type):
         if self.df is None or not self.current_event_type:
             messagebox.showwarning("Error", "Please load data and select event type first")
@@ -483,100 +1453,44 @@ class CSVVisualizer:
                 self.plot_movement()
                 return
 
-            filtered = self.df.copy()
-            self.log_message("\nFiltering Data:")
-            self.log_message(f"Initial records: {len(filtered)}")
-            
-            encounter_ids = []
-            if self.encounter_entry.get():
-                try:
-                    encounter_ids = [int(x.strip()) for x in self.encounter_entry.get().split(',')]
-                    filtered = filtered[filtered['encounter id'].isin(encounter_ids)]
-                    self.log_message(f"After encounter filter: {len(filtered)} records")
-                    if filtered.empty:
-                        raise ValueError(f"No data for encounters {encounter_ids}")
-                except ValueError:
-                    messagebox.showwarning("Invalid Input", "Please enter comma-separated numeric encounter IDs")
-                    return
-
-            # Apply death threshold filtering for all encounters
-            if self.death_threshold.get():
-                try:
-                    threshold = int(self.death_threshold.get())
-                    # Get all unique encounter IDs if none specified
-                    if not encounter_ids:
-                        encounter_ids = filtered['encounter id'].unique()
-                    
-                    # Create a mask for valid events (before death threshold)
-                    valid_events_mask = pd.Series(False, index=filtered.index)
-                    
-                    for enc_id in encounter_ids:
-                        enc_data = filtered[filtered['encounter id'] == enc_id]
-                        deaths = enc_data[enc_data['event type'] == 'UNIT_DIED']
-                        
-                        if not deaths.empty and len(deaths) >= threshold:
-                            # Get the timestamp of the nth death
-                            cutoff = deaths.iloc[threshold-1]['timestamp']
-                            # Include all events in this encounter up to the cutoff
-                            valid_events_mask |= (
-                                (filtered['encounter id'] == enc_id) & 
-                                (filtered['timestamp'] <= cutoff)
-                            )
-                        else:
-                            # If encounter has fewer deaths than threshold, include all its events
-                            valid_events_mask |= (filtered['encounter id'] == enc_id)
-                    
-                    filtered = filtered[valid_events_mask]
-                    self.log_message(f"After death threshold: {len(filtered)} records")
-                except ValueError as e:
-                    messagebox.showwarning("Threshold Error", str(e))
+            if self.store is not None:
+                self.log_message("\nFiltering Data (indexed store):")
+                filtered, encounter_ids = self.query_store(
+                    self.current_event_type, unit=self.unit_panel.entry.get() or None)
+                if filtered is None:
                     return
-
-            # Apply timeframe filter
-            start_time = self.start_time_entry.get()
-            end_time = self.end_time_entry.get()
-            if start_time or end_time:
-                try:
-                    if start_time:
-                        start_time = float(start_time)
-                        filtered = filtered[filtered['relative fight time (s)'] >= start_time]
-                    if end_time:
-                        end_time = float(end_time)
-                        filtered = filtered[filtered['relative fight time (s)'] <= end_time]
-                    self.log_message(f"After timeframe filter: {len(filtered)} records")
-                except ValueError:
-                    messagebox.showwarning("Invalid Input", "Please enter valid numeric values for start and end times")
+                source_col, dest_col = self.unit_columns()
+                start_time = float(self.start_time_entry.get()) if self.start_time_entry.get() else None
+                end_time = float(self.end_time_entry.get()) if self.end_time_entry.get() else None
+            else:
+                key = self.filter_key()
+                if key is None:
                     return
-
-            filtered = filtered[filtered['event type'].isin(self.current_event_type)]
-            self.log_message(f"After event type filter: {len(filtered)} records")
-            
-            unit = self.unit_panel.entry.get()
-            if unit:
-                filtered = filtered[
-                    (filtered['Damage source'] == unit) | (filtered['Spell destination'] == unit)
-                ]
-                self.log_message(f"After unit filter: {len(filtered)} records")
-            
-            spell_filter = self.spell_panel.entry.get()
-            if spell_filter:
-                if spell_filter.isdigit():
-                    # Filter by spell ID (convert to integer for comparison)
-                    spell_id = int(spell_filter)
-                    filtered = filtered[filtered['spell id'] == spell_id]
-                    self.log_message(f"After spell ID filter ({spell_id}): {len(filtered)} records")
+                source_col, dest_col = self.unit_columns()
+                start_time, end_time = key[5], key[6]
+                cached = self.filter_cache.get(key)
+                if cached is not None:
+                    # Same filters as a recent plot (e.g. switching between plot types)
+                    filtered, encounter_ids = cached
+                    self.log_message(f"\nFiltering Data: reusing {len(filtered)} cached records")
                 else:
-                    # Filter by spell name
-                    filtered = filtered[filtered['spell name'] == spell_filter]
-                    self.log_message(f"After spell name filter ({spell_filter}): {len(filtered)} records")
+                    filtered, encounter_ids = self.filter_frame(key)
+                    self.filter_cache.put(key, (filtered, encounter_ids),
+                                          int(filtered.memory_usage(index=True).sum()))
                     
             if filtered.empty:
                 raise ValueError("No data matches filters")
 
+            if self.boss_relative_var.get():
+                if not self.boss_tracks:
+                    raise ValueError("No boss tracks loaded for boss-relative plotting")
+                filtered = self.to_boss_frame(filtered)
+                self.log_message("Converted positions to boss-relative coordinates")
+
             # Store the current plot parameters
             self.last_plot_params = {
                 'plot_type': plot_type,
-                'filtered_data': filtered.copy(),
+                'filtered_data': filtered,
                 'encounter_ids': encounter_ids,
                 'data_scale': float(self.data_scale_var.get()),
                 'data_rotation': float(self.data_rotation_var.get())
@@ -620,32 +1534,22 @@ class CSVVisualizer:
             data_scale = float(self.data_scale_var.get())
             data_rotation = float(self.data_rotation_var.get())
 
-            # Plot boss position if coordinates are provided
-            if self.boss_x.get() and self.boss_y.get():
-                try:
-                    bx = float(self.boss_x.get())
-                    by = float(self.boss_y.get())
-                    ax.scatter(bx, by, s=200, marker='*',
-                            color='gold', edgecolor='black',
-                            zorder=10, label='Boss Position')
-                except ValueError:
-                    pass
+            # Plot boss position from the manual entries or the logged boss track
+            self.draw_boss_position(ax, encounter_ids, start_time or None, end_time or None)
 
             # Initialize scatter_artists list
             scatter_artists = []
 
             # Plot the data points
             if plot_type in ('hexbin', 'spaital'):
-                x_coords = pd.to_numeric(filtered['X coord'], errors='coerce')
-                y_coords = pd.to_numeric(filtered['Y coord'], errors='coerce')
-                valid = x_coords.notna() & y_coords.notna()
+                x_coords, y_coords, valid = self.coordinates(filtered)
                 if valid.sum() == 0:
                     raise ValueError('No valid coordinates found for heatmap')
                 if plot_type == 'hexbin':
-                    hb = ax.hexbin(x_coords[valid].astype(float), y_coords[valid].astype(float), gridsize=30, cmap='hot', mincnt=1, alpha=0.3, zorder=5)
+                    hb = ax.hexbin(x_coords[valid], y_coords[valid], gridsize=30, cmap='hot', mincnt=1, alpha=0.3, zorder=5)
                     fig.colorbar(hb, ax=ax)
                 elif plot_type == 'spaital':
-                    sns.kdeplot(x=x_coords[valid].astype(float), y=y_coords[valid].astype(float), fill=True, cmap='hot', alpha=0.3, ax=ax, thresh=0.05)
+                    sns.kdeplot(x=x_coords[valid], y=y_coords[valid], fill=True, cmap='hot', alpha=0.3, ax=ax, thresh=0.05)
                 scatter = ax.scatter([], [], alpha=0)
                 scatter.unit_data = filtered[valid].reset_index(drop=True)
                 scatter.x_coords = x_coords[valid].values
@@ -653,28 +1557,26 @@ class CSVVisualizer:
                 scatter_artists = [scatter]
             elif plot_type == 'scatter' and not self.unit_panel.entry.get():
                 # Get unique destination units for color mapping
-                dest_units = filtered['Spell destination'].unique()
+                dest_units = filtered[dest_col].unique()
                 # Count occurrences of each unit
-                unit_counts = filtered['Spell destination'].value_counts()
+                unit_counts = filtered[dest_col].value_counts()
                 # Sort units by count in descending order
                 dest_units = sorted(dest_units, key=lambda x: unit_counts[x], reverse=True)
                 colors = self.get_color_palette(len(dest_units))
                 color_map = {unit: colors[i] for i, unit in enumerate(dest_units)}
 
-                x_coords = pd.to_numeric(filtered['X coord'], errors='coerce')
-                y_coords = pd.to_numeric(filtered['Y coord'], errors='coerce')
-                valid = x_coords.notna() & y_coords.notna()
+                x_coords, y_coords, valid = self.coordinates(filtered)
 
                 # Create scatter plots by source
                 scatter_artists = []
                 for unit in dest_units:
-                    unit_mask = filtered['Spell destination'] == unit
-                    unit_data = filtered[unit_mask & valid].copy()
+                    unit_mask = filtered[dest_col] == unit
+                    unit_data = filtered[unit_mask & valid]
                     if not unit_data.empty:
                         count = len(unit_data)  # Get count of points for this unit
                         scatter = ax.scatter(
-                            unit_data['X coord'].astype(float),
-                            unit_data['Y coord'].astype(float),
+                            unit_data['X coord'],
+                            unit_data['Y coord'],
                             color=color_map[unit],
                             alpha=0.8,
                             label=f"{unit} ({count})",
@@ -685,8 +1587,8 @@ class CSVVisualizer:
 
                         # Store data for tooltips
                         scatter.unit_data = unit_data.reset_index(drop=True)
-                        scatter.x_coords = unit_data['X coord'].astype(float).values
-                        scatter.y_coords = unit_data['Y coord'].astype(float).values
+                        scatter.x_coords = unit_data['X coord'].values
+                        scatter.y_coords = unit_data['Y coord'].values
             else:
                 # Plot by encounter for unit-specific data
                 if encounter_ids:
@@ -694,9 +1596,7 @@ class CSVVisualizer:
                     scatter_artists = []
                     for idx, enc_id in enumerate(encounter_ids):
                         enc_data = filtered[filtered['encounter id'] == enc_id]
-                        x_coords = pd.to_numeric(enc_data['X coord'], errors='coerce')
-                        y_coords = pd.to_numeric(enc_data['Y coord'], errors='coerce')
-                        valid = x_coords.notna() & y_coords.notna()
+                        x_coords, y_coords, valid = self.coordinates(enc_data)
 
                         scatter = ax.scatter(
                             x_coords[valid],
@@ -714,9 +1614,7 @@ class CSVVisualizer:
                         scatter.x_coords = x_coords[valid].values
                         scatter.y_coords = y_coords[valid].values
                 else:
-                    x_coords = pd.to_numeric(filtered['X coord'], errors='coerce')
-                    y_coords = pd.to_numeric(filtered['Y coord'], errors='coerce')
-                    valid = x_coords.notna() & y_coords.notna()
+                    x_coords, y_coords, valid = self.coordinates(filtered)
                     scatter = ax.scatter(
                         x_coords[valid],
                         y_coords[valid],
@@ -850,21 +1748,11 @@ class CSVVisualizer:
                 data_scale = self.last_plot_params['data_scale']
                 data_rotation = self.last_plot_params['data_rotation']
                 
-                # Plot boss position if coordinates are provided
-                if self.boss_x.get() and self.boss_y.get():
-                    try:
-                        bx = float(self.boss_x.get())
-                        by = float(self.boss_y.get())
-                        ax.scatter(bx, by, s=200, marker='*',
-                                color='gold', edgecolor='black',
-                                zorder=10, label='Boss Position')
-                    except ValueError:
-                        pass
+                # Plot boss position from the manual entries or the logged boss track
+                self.draw_boss_position(ax, self.last_plot_params['encounter_ids'])
 
                 if self.last_plot_params['plot_type'] == 'scatter':
-                    x_coords = pd.to_numeric(filtered['X coord'], errors='coerce')
-                    y_coords = pd.to_numeric(filtered['Y coord'], errors='coerce')
-                    valid = x_coords.notna() & y_coords.notna()
+                    x_coords, y_coords, valid = self.coordinates(filtered)
                     
                     ax.scatter(x_coords[valid], y_coords[valid], alpha=0.5, zorder=5)
             
@@ -884,68 +1772,90 @@ class CSVVisualizer:
             if not unit:
                 raise ValueError("Please enter a unit name for movement tracking")
 
-            filtered = self.df.copy()
-            encounter_ids = []
-            if self.encounter_entry.get():
+            source_events = ['SPELL_CAST_SUCCESS','SWING_DAMAGE']
+            dest_events = [
+                'RANGE_DAMAGE','SPELL_HEAL','SPELL_PERIODIC_HEAL',
+                'SPELL_PERIODIC_DAMAGE','SPELL_DAMAGE','SWING_DAMAGE_LANDED'
+            ]
+            movement = None
+            presampled = False  # path taken from a precomputed movement level, drawn without decimation
+            if self.store is not None:
+                filtered, encounter_ids = self.query_store(
+                    source_events + dest_events, unit=unit, time_and_spell=False)
+                if filtered is None:
+                    return
+            elif self.position_tracks is not None:
+                # Collapsed position runs instead of scanning every event row
+                encounter_ids = []
+                threshold = None
                 try:
-                    encounter_ids = [int(x.strip()) for x in self.encounter_entry.get().split(',')]
-                    filtered = filtered[filtered['encounter id'].isin(encounter_ids)]
-                    if filtered.empty:
-                        raise ValueError(f"No data for encounters {encounter_ids}")
+                    if self.encounter_entry.get():
+                        encounter_ids = [int(x.strip()) for x in self.encounter_entry.get().split(',')]
                 except ValueError:
                     messagebox.showwarning("Invalid Input", "Please enter comma-separated numeric encounter IDs")
                     return
-
-            # Apply death threshold filtering if specified
-            if self.death_threshold.get():
                 try:
-                    threshold = int(self.death_threshold.get())
-                    # Get all unique encounter IDs if none specified
-                    if not encounter_ids:
-                        encounter_ids = filtered['encounter id'].unique()
-                    
-                    # Create a mask for valid events (before death threshold)
-                    valid_events_mask = pd.Series(False, index=filtered.index)
-                    
-                    for enc_id in encounter_ids:
-                        enc_data = filtered[filtered['encounter id'] == enc_id]
-                        deaths = enc_data[enc_data['event type'] == 'UNIT_DIED']
-                        
-                        if not deaths.empty and len(deaths) >= threshold:
-                            # Get the timestamp of the nth death
-                            cutoff = deaths.iloc[threshold-1]['timestamp']
-                            # Include all events in this encounter up to the cutoff
-                            valid_events_mask |= (
-                                (filtered['encounter id'] == enc_id) & 
-                                (filtered['timestamp'] <= cutoff)
-                            )
-                        else:
-                            # If encounter has fewer deaths than threshold, include all its events
-                            valid_events_mask |= (filtered['encounter id'] == enc_id)
-                    
-                    filtered = filtered[valid_events_mask]
-                    self.log_message(f"After death threshold: {len(filtered)} records")
+                    if self.death_threshold.get():
+                        threshold = int(self.death_threshold.get())
                 except ValueError as e:
                     messagebox.showwarning("Threshold Error", str(e))
                     return
+                resolution = None
+                if self.movement_levels:
+                    resolution = self.pick_movement_level(self.fight_span(encounter_ids))
+                if resolution is not None:
+                    movement = self.level_movement(resolution, unit, encounter_ids, threshold)
+                    presampled = True
+                    self.log_message(f"Movement for {unit} at {resolution:g}s resolution")
+                else:
+                    movement = self.track_movement(unit, encounter_ids, threshold)
+            else:
+                encounter_ids = []
+                if self.encounter_entry.get():
+                    try:
+                        encounter_ids = [int(x.strip()) for x in self.encounter_entry.get().split(',')]
+                        rows = self.slice_rows(self.encounter_slices(encounter_ids))
+                        if not len(rows):
+                            raise ValueError(f"No data for encounters {encounter_ids}")
+                    except ValueError:
+                        messagebox.showwarning("Invalid Input", "Please enter comma-separated numeric encounter IDs")
+                        return
+                else:
+                    rows = self.slice_rows(self.encounter_slices())
+                filtered = self.df.iloc[rows]
 
-            source_events = ['SPELL_CAST_SUCCESS','SWING_DAMAGE']
-            dest_events = [
-                'RANGE_DAMAGE','SPELL_HEAL','SPELL_PERIODIC_HEAL',
-                'SPELL_PERIODIC_DAMAGE','SPELL_DAMAGE','SWING_DAMAGE_LANDED'
-            ]
-            source_mask = filtered['event type'].isin(source_events) & (filtered['Damage source'] == unit)
-            source_df = filtered[source_mask].copy()
-            source_df['x'] = pd.to_numeric(source_df['X coord'], errors='coerce')
-            source_df['y'] = pd.to_numeric(source_df['Y coord'], errors='coerce')
-
-            dest_mask = filtered['event type'].isin(dest_events) & (filtered['Spell destination'] == unit)
-            dest_df = filtered[dest_mask].copy()
-            dest_df['x'] = pd.to_numeric(dest_df['X coord'], errors='coerce')
-            dest_df['y'] = pd.to_numeric(dest_df['Y coord'], errors='coerce')
-
-            movement = pd.concat([source_df, dest_df]).sort_values('timestamp')
+                # Apply death threshold filtering if specified
+                if self.death_threshold.get():
+                    try:
+                        threshold = int(self.death_threshold.get())
+                        # Get all unique encounter IDs if none specified
+                        if not encounter_ids:
+                            encounter_ids = filtered['encounter id'].unique()
+                    
+                        # Keep events up to the nth death of their encounter (deaths on every floor count)
+                        limit = self.death_cutoffs(threshold, filtered['encounter id'].to_numpy())
+                        filtered = filtered[filtered['timestamp'].to_numpy() <= limit]
+                        self.log_message(f"After death threshold: {len(filtered)} records")
+                    except ValueError as e:
+                        messagebox.showwarning("Threshold Error", str(e))
+                        return
+
+            if movement is None:
+                source_col, dest_col = self.unit_columns()
+                source_mask = filtered['event type'].isin(source_events) & (filtered[source_col] == unit)
+                source_df = filtered[source_mask].copy()
+                source_df['x'] = source_df['X coord']
+                source_df['y'] = source_df['Y coord']
+
+                dest_mask = filtered['event type'].isin(dest_events) & (filtered[dest_col] == unit)
+                dest_df = filtered[dest_mask].copy()
+                dest_df['x'] = dest_df['X coord']
+                dest_df['y'] = dest_df['Y coord']
+
+                movement = pd.concat([source_df, dest_df]).sort_values('timestamp')
             movement = movement.dropna(subset=['x','y'])
+            if self.boss_relative_var.get() and self.boss_tracks:
+                movement = self.to_boss_frame(movement, 'x', 'y').dropna(subset=['x','y'])
             if movement.empty:
                 raise ValueError(f"No movement data found for {unit}")
 
@@ -982,16 +1892,8 @@ class CSVVisualizer:
                 except Exception as e:
                     print(f"Error displaying map: {e}")
 
-            # Plot boss position if coordinates are provided
-            if self.boss_x.get() and self.boss_y.get():
-                try:
-                    bx = float(self.boss_x.get())
-                    by = float(self.boss_y.get())
-                    ax.scatter(bx, by, s=200, marker='*',
-                            color='gold', edgecolor='black',
-                            zorder=10, label='Boss Position')
-                except ValueError:
-                    pass
+            # Plot boss position from the manual entries or the logged boss track
+            self.draw_boss_position(ax, encounter_ids)
 
             cmap = plt.get_cmap('tab10')
             line_artists = []
@@ -1003,12 +1905,15 @@ class CSVVisualizer:
                     if len(enc_data) < 2:
                         continue
                         
-                    # Decimate points to remove insignificant movements
-                    x_dec, y_dec = self.decimate_points(
-                        enc_data['x'].values, 
-                        enc_data['y'].values,
-                        threshold=0.2  # Adjust this threshold based on your needs
-                    )
+                    if presampled:
+                        x_dec, y_dec = enc_data['x'].values, enc_data['y'].values
+                    else:
+                        # Decimate points to remove insignificant movements
+                        x_dec, y_dec = self.decimate_points(
+                            enc_data['x'].values, 
+                            enc_data['y'].values,
+                            threshold=0.2  # Adjust this threshold based on your needs
+                        )
                     
                     if len(x_dec) < 2:
                         continue
@@ -1032,11 +1937,14 @@ class CSVVisualizer:
                             marker='x', label=f'End Enc {enc_id}')
             else:
                 # Single path for all data
-                x_dec, y_dec = self.decimate_points(
-                    movement['x'].values,
-                    movement['y'].values,
-                    threshold=0.5
-                )
+                if presampled:
+                    x_dec, y_dec = movement['x'].values, movement['y'].values
+                else:
+                    x_dec, y_dec = self.decimate_points(
+                        movement['x'].values,
+                        movement['y'].values,
+                        threshold=0.5
+                    )
                 
                 if len(x_dec) >= 2:
                     lc, arrows = self.plot_path_with_gradient(
@@ -1091,11 +1999,14 @@ class CSVVisualizer:
             max_time = float(params['max_time']) if params['max_time'] else float('inf')
             death_threshold = int(params['death_threshold']) if params['death_threshold'] else None
 
+            source_col, dest_col = self.unit_columns()
             if params['unit']:
                 units = [params['unit']]
             else:
                 # Filter for player names ending in -EU or -US
-                units = [u for u in self.df['Damage source'].dropna().unique() 
+                names = (self.store.distinct(source_col)[source_col] if self.store is not None
+                         else self.df[source_col].dropna().unique())
+                units = [u for u in names
                         if isinstance(u, str) and (u.endswith('-EU') or u.endswith('-US'))]
 
             # Define event types for movement tracking (same as regular movement)
@@ -1105,52 +2016,57 @@ class CSVVisualizer:
                 'SPELL_PERIODIC_DAMAGE', 'SPELL_DAMAGE', 'SWING_DAMAGE_LANDED'
             ]
 
+            # Pick the precomputed movement level that suits the time window, if there are any
+            resolution = None
+            if self.movement_levels:
+                window_end = max_time if max_time != float('inf') else self.fight_span()
+                resolution = self.pick_movement_level(max(window_end - min_time, 0.0))
+            if resolution is not None:
+                self.log_message(f"Average movement at {resolution:g}s resolution")
+            presampled = resolution is not None
+
+            # Death sequence of each encounter's first death, for the path tooltips
+            first_deaths = self.death_table[self.death_table['death number'] == 1]
+            first_death_sequences = dict(zip(first_deaths['encounter id'], first_deaths['unit died sequence']))
+
+            data = None  # rows on the selected floor within the time window, taken when first needed
             results = []
             for unit in units:
-                # Get source events
-                source_mask = (
-                    self.df['event type'].isin(source_events) & 
-                    (self.df['Damage source'] == unit) &
-                    (self.df['relative fight time (s)'] >= min_time) &
-                    (self.df['relative fight time (s)'] <= max_time)
-                )
-                source_data = self.df[source_mask].copy()
-                source_data['x'] = pd.to_numeric(source_data['X coord'], errors='coerce')
-                source_data['y'] = pd.to_numeric(source_data['Y coord'], errors='coerce')
-
-                # Get destination events
-                dest_mask = (
-                    self.df['event type'].isin(dest_events) & 
-                    (self.df['Spell destination'] == unit) &
-                    (self.df['relative fight time (s)'] >= min_time) &
-                    (self.df['relative fight time (s)'] <= max_time)
-                )
-                dest_data = self.df[dest_mask].copy()
-                dest_data['x'] = pd.to_numeric(dest_data['X coord'], errors='coerce')
-                dest_data['y'] = pd.to_numeric(dest_data['Y coord'], errors='coerce')
-
-                # Combine and sort by timestamp
-                unit_data = pd.concat([source_data, dest_data]).sort_values('timestamp')
+                if presampled:
+                    # Already on a fixed time grid shared by every unit and encounter
+                    unit_data = self.level_movement(resolution, unit, None, death_threshold, min_time, max_time)
+                elif self.position_tracks is not None:
+                    # Collapsed position runs, already cut at the death threshold
+                    unit_data = self.track_movement(unit, None, death_threshold, min_time, max_time)
+                else:
+                    if data is None:
+                        data = self.event_rows(source_events + dest_events, min_time, max_time)
+
+                    # Get source events
+                    source_mask = (
+                        data['event type'].isin(source_events) & 
+                        (data[source_col] == unit)
+                    )
+                    source_data = data[source_mask].copy()
+                    source_data['x'] = source_data['X coord']
+                    source_data['y'] = source_data['Y coord']
+
+                    # Get destination events
+                    dest_mask = (
+                        data['event type'].isin(dest_events) & 
+                        (data[dest_col] == unit)
+                    )
+                    dest_data = data[dest_mask].copy()
+                    dest_data['x'] = dest_data['X coord']
+                    dest_data['y'] = dest_data['Y coord']
+
+                    # Combine and sort by timestamp
+                    unit_data = pd.concat([source_data, dest_data]).sort_values('timestamp')
                 
-                # Apply death threshold filtering if specified
-                if death_threshold is not None:
-                    valid_events_mask = pd.Series(False, index=unit_data.index)
-                    for enc_id in unit_data['encounter id'].unique():
-                        enc_data = unit_data[unit_data['encounter id'] == enc_id]
-                        deaths = self.df[
-                            (self.df['encounter id'] == enc_id) & 
-                            (self.df['event type'] == 'UNIT_DIED')
-                        ]
-                        
-                        if not deaths.empty and len(deaths) >= death_threshold:
-                            cutoff = deaths.iloc[death_threshold-1]['timestamp']
-                            valid_events_mask |= (
-                                (unit_data['encounter id'] == enc_id) & 
-                                (unit_data['timestamp'] <= cutoff))
-                        else:
-                            valid_events_mask |= (unit_data['encounter id'] == enc_id)
-                    
-                    unit_data = unit_data[valid_events_mask]
+                    # Apply death threshold filtering if specified
+                    if death_threshold is not None:
+                        limit = self.death_cutoffs(death_threshold, unit_data['encounter id'].to_numpy())
+                        unit_data = unit_data[unit_data['timestamp'].to_numpy() <= limit]
                 
                 grouped = unit_data.groupby('encounter id')
                 paths = []
@@ -1168,10 +2084,11 @@ class CSVVisualizer:
                 if not paths:
                     continue
 
-                # Calculate time grid with fixed interval of 0.8 seconds
-                time_interval = 0.8  # One point every 0.8 seconds
-                num_points = int((max_time - min_time) / time_interval) + 1
-                time_grid = np.linspace(min_time, max_time, num_points)
+                if not presampled:
+                    # Calculate time grid with fixed interval of 0.8 seconds
+                    time_interval = 0.8  # One point every 0.8 seconds
+                    num_points = int((max_time - min_time) / time_interval) + 1
+                    time_grid = np.linspace(min_time, max_time, num_points)
                 
                 interpolated = []
                 path_data = []  # Store path data for this unit
@@ -1182,23 +2099,21 @@ class CSVVisualizer:
                         y_vals = path['y'].values
                         t_vals = path['relative fight time (s)'].values
                         
-                        # Decimate points before interpolation
-                        x_dec, y_dec, t_dec = self.decimate_points(x_vals, y_vals, t_vals, threshold=0.2)
+                        if presampled:
+                            # Already resampled, so the interpolation below returns the points as they are
+                            x_dec, y_dec, t_dec = x_vals, y_vals, t_vals
+                        else:
+                            # Decimate points before interpolation
+                            x_dec, y_dec, t_dec = self.decimate_points(x_vals, y_vals, t_vals, threshold=0.2)
                         if len(x_dec) >= 2:
                             # Only interpolate up to the actual end time of this path
-                            path_time_grid = time_grid[time_grid <= t_dec[-1]]
+                            path_time_grid = t_dec if presampled else time_grid[time_grid <= t_dec[-1]]
                             if len(path_time_grid) > 0:
                                 x_interp = np.interp(path_time_grid, t_dec, x_dec)
                                 y_interp = np.interp(path_time_grid, t_dec, y_dec)
                                 
                                 # Get death sequence for this encounter
-                                death_data = self.df[
-                                    (self.df['encounter id'] == enc_id) & 
-                                    (self.df['event type'] == 'UNIT_DIED')
-                                ]
-                                death_sequence = None
-                                if not death_data.empty:
-                                    death_sequence = death_data['unit died sequence'].iloc[0]
+                                death_sequence = first_death_sequences.get(enc_id)
                                 
                                 # Store interpolated values along with their valid time points
                                 interpolated.append({
@@ -1286,16 +2201,8 @@ class CSVVisualizer:
             ax.set_title(f"Average Movement Paths ({min_time}-{max_time}s)")
             ax.grid(True)
 
-            # Plot boss position if coordinates are provided
-            if self.boss_x.get() and self.boss_y.get():
-                try:
-                    bx = float(self.boss_x.get())
-                    by = float(self.boss_y.get())
-                    ax.scatter(bx, by, s=200, marker='*',
-                            color='gold', edgecolor='black',
-                            zorder=10, label='Boss Position')
-                except ValueError:
-                    pass
+            # Plot boss position from the manual entries or the logged boss track
+            self.draw_boss_position(ax, [], min_time, max_time)
 
             cmap = plt.get_cmap('tab10')
             info_lines = []
@@ -1887,7 +2794,7 @@ class CSVVisualizer:
 
         try:
             # Use casting events for reference
-            filtered = self.df[self.df['event type'].isin(['SPELL_CAST_SUCCESS', 'SWING_DAMAGE'])]
+            filtered = self.event_rows(['SPELL_CAST_SUCCESS', 'SWING_DAMAGE'])
             
             if self.plot_window:
                 self.plot_window.destroy()
@@ -1924,9 +2831,7 @@ class CSVVisualizer:
                     print(f"Error displaying map: {e}")
 
             # Plot the data points
-            x_coords = pd.to_numeric(filtered['X coord'], errors='coerce')
-            y_coords = pd.to_numeric(filtered['Y coord'], errors='coerce')
-            valid = x_coords.notna() & y_coords.notna()
+            x_coords, y_coords, valid = self.coordinates(filtered)
             
             ax.scatter(x_coords[valid], y_coords[valid], alpha=0.3, color='blue', s=1)
 
@@ -1999,4 +2904,7 @@ class AverageMovementDialog(tk.Toplevel):
 if __name__ == "__main__":
     root = TkinterDnD.Tk()
     app = CSVVisualizer(root)
+    # A processed CSV passed on the command line (e.g. a preview from the launcher) is loaded at startup
+    if len(sys.argv) > 1:
+        root.after(100, app.process_file, sys.argv[1])
     root.mainloop()
\ No newline at end of file
@@ -0,0 +1,165 @@
+'''
+Precomputed multi-resolution movement tracks.
+
+Built from the position runs sidecar (filtered_combat_log_positions.csv):
+every unit's path in every encounter is resampled onto fixed time grids
+(multiples of 0.1 s, 0.5 s and 2 s of fight time) by linear interpolation,
+and each resolution is written as its own columnar file
+(filtered_combat_log_movement_0.5s.cols) in the format of columnar.py.
+The visualizer reads the level that suits the time window it plots
+instead of decimating and resampling paths when a plot opens.
+
+Paths are not interpolated across gaps longer than MAX_GAP or across a
+ui map id change. A level with more points than the position runs it was
+built from adds nothing over the runs, so it is not written (the coarsest
+level always is), and the visualizer draws short windows from the runs.
+
+Rows are ordered by encounter, unit and time. Grid times are k * resolution
+for whole k, so paths of different units and encounters line up exactly.
+
+Usage: python movement_tracks.py filtered_combat_log.csv
+'''
+import argparse
+import csv
+import math
+import sys
+from pathlib import Path
+
+from columnar import ColumnarWriter
+from pipeline_io import find_existing, sidecar_path, strip_compression_suffix
+
+RESOLUTIONS = (0.1, 0.5, 2.0)
+MAX_GAP = 3.0  # seconds between samples beyond which a path is not interpolated
+HEADER = ["encounter id", "unit id", "unit name", "relative fight time (s)", "X coord", "Y coord", "ui map id"]
+
+def movement_path(csv_path, resolution):
+    '''Columnar movement file of one resolution, e.g. filtered_combat_log_movement_0.5s.cols'''
+    csv_path = strip_compression_suffix(csv_path)
+    return csv_path.with_name(f"{csv_path.stem}_movement_{resolution:g}s.cols")
+
+def run_samples(runs):
+    '''(time, x, y, ui map id) at the start and, if it repeats, the end of each run'''
+    samples = []
+    for run in runs:
+        try:
+            x, y = float(run["X coord"]), float(run["Y coord"])
+            start, end = float(run["start (s)"]), float(run["end (s)"])
+        except ValueError:
+            continue
+        samples.append((start, x, y, run["ui map id"]))
+        if int(run["count"]) > 1 and end > start:
+            samples.append((end, x, y, run["ui map id"]))
+    samples.sort(key=lambda sample: sample[0])
+    return samples
+
+def split_samples(samples, max_gap=MAX_GAP):
+    '''Break time-ordered samples into pieces at gaps longer than max_gap and at ui map id changes'''
+    pieces = []
+    for sample in samples:
+        if pieces and sample[0] - pieces[-1][-1][0] <= max_gap and sample[3] == pieces[-1][-1][3]:
+            pieces[-1].append(sample)
+        else:
+            pieces.append([sample])
+    return pieces
+
+def resample(samples, resolution, max_gap=MAX_GAP):
+    '''
+    Linearly interpolate samples onto the grid k * resolution. Each piece between
+    long gaps and floor changes is resampled on its own; a piece too short to
+    span a grid time keeps one point at the next one.
+    '''
+    points = []
+    for piece in split_samples(samples, max_gap):
+        piece_points = resample_piece(piece, resolution)
+        if not piece_points:
+            _, x, y, ui_map_id = piece[0]
+            piece_points = [(math.ceil(piece[0][0] / resolution - 1e-9) * resolution, x, y, ui_map_id)]
+        points.extend(piece_points)
+    return points
+
+def resample_piece(samples, resolution):
+    '''Linearly interpolate samples onto the grid k * resolution between the first and last sample'''
+    first, last = samples[0][0], samples[-1][0]
+    k = math.ceil(first / resolution - 1e-9)
+    points = []
+    i = 0
+    while True:
+        t = k * resolution
+        if t > last + 1e-9:
+            break
+        # Advance to the segment [samples[i], samples[i + 1]] that contains t
+        while i + 1 < len(samples) and samples[i + 1][0] <= t:
+            i += 1
+        t0, x0, y0, map0 = samples[i]
+        if i + 1 < len(samples) and samples[i + 1][0] > t0:
+            t1, x1, y1, _ = samples[i + 1]
+            frac = min(max((t - t0) / (t1 - t0), 0.0), 1.0)
+            points.append((t, x0 + frac * (x1 - x0), y0 + frac * (y1 - y0), map0))
+        else:
+            points.append((t, x0, y0, map0))
+        k += 1
+    return points
+
+def build_movement_tracks(csv_path, resolutions=RESOLUTIONS):
+    '''
+    Write one movement file per resolution for a processed CSV from its
+    positions sidecar. Returns the written paths (none without the sidecar).
+    '''
+    positions_path = sidecar_path(csv_path, "positions")
+    if not positions_path.exists():
+        return []
+    writers = {resolution: ColumnarWriter(movement_path(csv_path, resolution), HEADER)
+               for resolution in resolutions}
+    source_samples = 0
+    try:
+        def flush(encounter_runs):
+            nonlocal source_samples
+            for runs in encounter_runs.values():
+                samples = run_samples(runs)
+                source_samples += len(samples)
+                enc_id, unit_id, unit_name = runs[0]["encounter id"], runs[0]["unit id"], runs[0]["unit name"]
+                for resolution, writer in writers.items():
+                    for t, x, y, ui_map_id in resample(samples, resolution):
+                        writer.append([enc_id, unit_id, unit_name, t, x, y, ui_map_id])
+
+        # The sidecar holds each encounter's runs together, so one encounter is in memory at a time
+        with open(positions_path, "r", encoding="utf-8", newline="") as f:
+            encounter_runs = {}
+            current_id = None
+            for run in csv.DictReader(f):
+                enc_id = run["encounter id"]
+                if enc_id != current_id:
+                    flush(encounter_runs)
+                    encounter_runs = {}
+                    current_id = enc_id
+                key = run["unit id"] if run["unit id"] != "-1" else run["unit name"]
+                encounter_runs.setdefault((enc_id, key), []).append(run)
+            flush(encounter_runs)
+    except BaseException:
+        for writer in writers.values():
+            writer.discard()
+        raise
+    written = []
+    coarsest = max(writers)
+    for resolution, writer in sorted(writers.items()):
+        if resolution != coarsest and writer.rows > source_samples:
+            # Denser than the runs it interpolates; a stale file from an earlier run must go too
+            writer.discard()
+            movement_path(csv_path, resolution).unlink(missing_ok=True)
+        else:
+            writer.close()
+            written.append(writer.path)
+    return written
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build multi-resolution movement tracks for a processed combat log CSV")
+    parser.add_argument("csv", nargs="?", default="filtered_combat_log.csv")
+    args = parser.parse_args()
+
+    csv_path = find_existing(Path(args.csv))
+    paths = build_movement_tracks(csv_path)
+    if not paths:
+        print(f"Error: no position tracks found for {csv_path}")
+        sys.exit(1)
+    for path in paths:
+        print(f"Movement tracks created: {path}")
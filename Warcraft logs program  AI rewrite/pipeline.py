@@ -0,0 +1,127 @@
+'''
+In-process pipeline API for the launcher.
+
+The log filter and CSV processing stages run as plain function calls on a
+worker pool instead of python subprocesses started per stage. Each job
+reports progress and results as events on a queue, which the UI drains from
+the Tk main loop with after(), and stops at its next check once its cancel
+event is set.
+
+With processes=True the pool is a process pool sized for parallel jobs; the
+event queue and cancel events then live in a multiprocessing manager so the
+workers can reach them.
+
+Events are tuples:
+    ("started", job_id, stage)
+    ("progress", job_id, stage, bytes_done, bytes_total)
+    ("done", job_id, stage, output_path)
+    ("failed", job_id, stage, message)
+    ("cancelled", job_id, stage)
+'''
+import importlib.util
+import itertools
+import multiprocessing
+import os
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+import CSVtoCSV
+from pipeline_io import PipelineCancelled
+
+STAGES = ("filter", "process")
+STAGE_NAMES = {"filter": "Log Filter", "process": "CSV Processing"}
+
+_log_filter = None
+
+def load_log_filter():
+    '''Import "log_filter one.py", whose file name is not a valid module name'''
+    global _log_filter
+    if _log_filter is None:
+        script_path = Path(__file__).resolve().parent / "log_filter one.py"
+        spec = importlib.util.spec_from_file_location("log_filter_one", script_path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _log_filter = module
+    return _log_filter
+
+def default_workers():
+    '''One job per core, leaving a core for the UI'''
+    return max(1, (os.cpu_count() or 2) - 1)
+
+class PipelineJob:
+    _ids = itertools.count(1)
+
+    def __init__(self, log_path=None, stages=STAGES, encounter_filter=None, compression=None,
+                 floats_csv="combat_log_with_floats.csv", output_csv="filtered_combat_log.csv",
+                 sampler=None, resume=False):
+        self.id = next(self._ids)
+        self.log_path = Path(log_path) if log_path else None
+        self.stages = tuple(stages)
+        self.encounter_filter = encounter_filter
+        self.compression = compression
+        self.floats_csv = floats_csv
+        self.output_csv = output_csv
+        self.sampler = sampler  # PositionSampler for a preview run
+        self.resume = resume  # pick up both stages from their checkpoints (uncompressed output)
+        self.cancel_event = None  # set by the runner on submit
+
+    def cancel(self):
+        if self.cancel_event is not None:
+            self.cancel_event.set()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event is not None and self.cancel_event.is_set()
+
+def run_stage(job, stage, events):
+    def progress(done, total):
+        events.put(("progress", job.id, stage, done, total))
+
+    if stage == "filter":
+        return load_log_filter().filter_log(
+            job.log_path, job.floats_csv, job.encounter_filter, job.compression,
+            progress=progress, cancel=job.cancel_event, resume=job.resume, sampler=job.sampler)
+    return CSVtoCSV.load_csv(
+        job.floats_csv, job.output_csv, job.encounter_filter, job.compression,
+        progress=progress, cancel=job.cancel_event, resume=job.resume)
+
+def run_job(job, events):
+    '''Run a job's stages in order; module level so process pools can pickle it'''
+    output_path = None
+    for stage in job.stages:
+        events.put(("started", job.id, stage))
+        try:
+            output_path = run_stage(job, stage, events)
+        except PipelineCancelled:
+            events.put(("cancelled", job.id, stage))
+            return None
+        except Exception as e:
+            events.put(("failed", job.id, stage, str(e)))
+            return None
+        if output_path is None:
+            events.put(("failed", job.id, stage, f"{STAGE_NAMES[stage]} failed, see the console output"))
+            return None
+        events.put(("done", job.id, stage, output_path))
+    return output_path
+
+class PipelineRunner:
+    def __init__(self, workers=1, processes=False):
+        self.workers = workers
+        self.processes = processes
+        if processes:
+            self.manager = multiprocessing.Manager()
+            self.events = self.manager.Queue()
+            self.executor = ProcessPoolExecutor(max_workers=workers)
+        else:
+            self.manager = None
+            self.events = queue.Queue()
+            self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pipeline")
+
+    def submit(self, job):
+        job.cancel_event = self.manager.Event() if self.manager else threading.Event()
+        return self.executor.submit(run_job, job, self.events)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,583 @@
+'''
+Compressed reading and writing for the pipeline CSV files.
+
+Writers buffer text into large blocks and compress each block on a thread
+pool (zlib and zstd release the GIL), writing the compressed blocks in order.
+Every block is a complete gzip member / zstd frame, so the result is a normal
+.gz / .zst file that gzip, zstd and pandas read as one stream.
+
+SpillingRowBuffer keeps rows under a memory budget for the CSV processing
+step, spilling to temporary files and merging them back on output.
+EncounterSpill does the same for the sidecar tables, one finished encounter
+at a time.
+
+BlockParsePipeline and QueuedRowWriter overlap reading, parsing and writing
+on separate threads connected by bounded queues, timing each stage so the
+log filter can report where its time goes.
+'''
+import csv
+import gzip
+import hashlib
+import heapq
+import io
+import json
+import os
+import queue
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSION_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+COMPRESSION_CHOICES = ["none", "gzip", "zstd"]
+MAX_OPEN_RUNS = 64  # spilled runs merged together once this many exist
+PROGRESS_INTERVAL = 10000  # lines between progress reports and cancel checks
+READ_BLOCK_SIZE = 4 * 1024 * 1024  # bytes per block read by the pipelined reader
+QUEUE_BLOCKS = 8  # blocks (or row batches) a pipeline stage may run ahead of the next
+LOCK_FILE_NAME = ".writer.lock"  # held by whichever job is writing an output folder
+
+class PipelineCancelled(Exception):
+    '''Raised inside a pipeline stage when its cancel event is set'''
+
+def check_cancelled(cancel):
+    if cancel is not None and cancel.is_set():
+        raise PipelineCancelled()
+
+def resolve_compression(compression):
+    '''Normalize a compression name, falling back to gzip if zstandard is not installed'''
+    if not compression or compression == "none":
+        return None
+    if compression == "zstd" and zstandard is None:
+        print("zstandard is not installed, using gzip compression instead")
+        return "gzip"
+    return compression
+
+def strip_compression_suffix(path):
+    path = Path(path)
+    if path.suffix in COMPRESSION_SUFFIXES.values():
+        return path.with_suffix("")
+    return path
+
+def compressed_path(path, compression):
+    '''Output path for the given compression, e.g. filtered_combat_log.csv.gz'''
+    path = strip_compression_suffix(path)
+    compression = resolve_compression(compression)
+    if compression is None:
+        return path
+    return path.with_name(path.name + COMPRESSION_SUFFIXES[compression])
+
+def find_existing(path):
+    '''Return the newest of path, path.gz and path.zst that exists, or path itself'''
+    path = strip_compression_suffix(path)
+    candidates = [path] + [path.with_name(path.name + suffix) for suffix in COMPRESSION_SUFFIXES.values()]
+    existing = [candidate for candidate in candidates if candidate.exists()]
+    if not existing:
+        return path
+    return max(existing, key=lambda candidate: candidate.stat().st_mtime)
+
+def sidecar_path(output_path, suffix):
+    '''Path of a table written alongside the main output, e.g. filtered_combat_log_units.csv'''
+    output_path = strip_compression_suffix(output_path)
+    return output_path.with_name(f"{output_path.stem}_{suffix}.csv")
+
+def checkpoint_path(output_path):
+    '''Resume checkpoint written alongside an output, e.g. filtered_combat_log_checkpoint.json'''
+    output_path = strip_compression_suffix(output_path)
+    return output_path.with_name(f"{output_path.stem}_checkpoint.json")
+
+def file_fingerprint(path, offset):
+    '''Hashes of the file's start and of the bytes just before offset, to spot a replaced file'''
+    with open(path, "rb") as f:
+        prefix = f.read(min(offset, 4096))
+        f.seek(max(0, offset - 256))
+        tail = f.read(offset - max(0, offset - 256))
+    return [hashlib.sha1(prefix).hexdigest(), hashlib.sha1(tail).hexdigest()]
+
+def save_checkpoint(path, checkpoint):
+    # Write to a temporary file first so a crash never leaves a truncated checkpoint
+    tmp_path = path.with_name(path.name + ".tmp")
+    with tmp_path.open("w", encoding="utf-8") as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(tmp_path, path)
+
+def load_checkpoint(path, input_path, output_path, settings):
+    '''
+    Return the checkpoint saved for output_path if it can be resumed: same
+    settings, the input still starts with the bytes processed last time, and
+    the output still holds everything written up to the checkpoint.
+    '''
+    path = Path(path)
+    if not path.exists():
+        return None
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        return None
+    input_path, output_path = Path(input_path), Path(output_path)
+    offset = checkpoint.get("input_offset", 0)
+    if (checkpoint.get("settings") != settings or not input_path.exists() or not output_path.exists()
+            or input_path.stat().st_size < offset
+            or output_path.stat().st_size < checkpoint.get("output_size", 0)
+            or file_fingerprint(input_path, offset) != checkpoint.get("input_fingerprint")):
+        return None
+    return checkpoint
+
+class FolderLock:
+    '''
+    Exclusive claim on an output folder, taken by every writer (a launcher job
+    or the log watcher) before it writes the folder's CSVs and checkpoints.
+    It is an OS lock on the folder's lock file, so it goes away with a holder
+    that crashed and holds between threads of one process as well.
+    '''
+
+    def __init__(self, folder):
+        self.path = Path(folder) / LOCK_FILE_NAME
+        self.file = None
+
+    def acquire(self):
+        '''Take the lock without waiting; False if another writer holds it'''
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        file = open(self.path, "a+b")
+        try:
+            if os.name == "nt":
+                import msvcrt
+                file.seek(0)
+                msvcrt.locking(file.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            file.close()
+            return False
+        self.file = file
+        return True
+
+    def release(self):
+        # Closing the handle drops the lock
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+def _compress_block(data, compression):
+    if compression == "zstd":
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    return gzip.compress(data, compresslevel=6)
+
+class BlockCompressedWriter:
+    '''
+    Text file object for csv.writer that compresses fixed-size blocks on a
+    background thread pool and writes them to disk in order.
+    '''
+
+    def __init__(self, path, compression, append=False, block_size=4 * 1024 * 1024, workers=None):
+        # Concatenated gzip members / zstd frames are still one valid stream
+        self.file = open(path, "ab" if append else "wb")
+        self.compression = compression
+        self.block_size = block_size
+        self.workers = workers or os.cpu_count() or 2
+        self.executor = ThreadPoolExecutor(max_workers=self.workers)
+        self.pending = deque()
+        self.buffer = []
+        self.buffered = 0
+
+    def write(self, text):
+        self.buffer.append(text)
+        self.buffered += len(text)
+        if self.buffered >= self.block_size:
+            self._submit_block()
+        return len(text)
+
+    def _submit_block(self):
+        data = "".join(self.buffer).encode("utf-8")
+        self.buffer = []
+        self.buffered = 0
+        self.pending.append(self.executor.submit(_compress_block, data, self.compression))
+        # Bound memory: keep at most two blocks in flight per worker
+        while len(self.pending) > self.workers * 2:
+            self.file.write(self.pending.popleft().result())
+
+    def flush(self):
+        pass
+
+    def close(self):
+        if self.file.closed:
+            return
+        try:
+            if self.buffer:
+                self._submit_block()
+            while self.pending:
+                self.file.write(self.pending.popleft().result())
+        finally:
+            self.executor.shutdown()
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+def open_writer(path, compression=None, append=False):
+    '''Open a text writer for path, block-compressed if compression is gzip or zstd'''
+    compression = resolve_compression(compression)
+    if compression is None:
+        return open(path, "a" if append else "w", encoding="utf-8", newline="")
+    return BlockCompressedWriter(path, compression, append=append)
+
+class SpillingRowBuffer:
+    '''
+    Append-only row store with a memory budget. Rows stay in memory until the
+    estimated size passes the budget, then the buffered rows are written to a
+    temporary file as a run sorted by arrival sequence. Iterating merges the
+    runs and the in-memory tail back together in sequence order.
+    '''
+
+    def __init__(self, memory_budget=None, temp_dir=None):
+        self.memory_budget = memory_budget  # bytes, None keeps everything in memory
+        self.temp_root = temp_dir
+        self.temp_dir = None
+        self.rows = []
+        self.runs = []       # temporary run files, oldest first
+        self.spilled = 0     # number of rows already on disk
+        self.bytes_per_row = 0.0
+
+    def __len__(self):
+        return self.spilled + len(self.rows)
+
+    def append(self, row):
+        self.rows.append(row)
+        if self.memory_budget is None:
+            return
+        # Measuring every row is slow, so sample the row size
+        if len(self.rows) % 256 == 1:
+            size = sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row)
+            self.bytes_per_row = size if not self.bytes_per_row else 0.9 * self.bytes_per_row + 0.1 * size
+        if len(self.rows) * self.bytes_per_row > self.memory_budget:
+            self.spill()
+
+    def truncate(self, index):
+        '''
+        Drop rows from index onwards. Returns False if some of them were
+        already spilled to disk, in which case the caller has to filter them
+        out when reading back.
+        '''
+        if index < self.spilled:
+            self.rows = []
+            return False
+        del self.rows[index - self.spilled:]
+        return True
+
+    def spill(self):
+        if not self.rows:
+            return
+        if self.temp_dir is None:
+            self.temp_dir = tempfile.mkdtemp(prefix="wow_rows_", dir=self.temp_root)
+        run_path = os.path.join(self.temp_dir, f"run_{len(self.runs):05d}.csv")
+        with open(run_path, "w", encoding="utf-8", newline="") as run_file:
+            writer = csv.writer(run_file)
+            # Prefix the arrival sequence so runs can be merged back in order
+            writer.writerows([self.spilled + i] + row for i, row in enumerate(self.rows))
+        self.runs.append(run_path)
+        self.spilled += len(self.rows)
+        self.rows = []
+        if len(self.runs) >= MAX_OPEN_RUNS:
+            self._compact_runs()
+
+    def _compact_runs(self):
+        # Merge the runs into one so reading back never opens too many files
+        run_path = os.path.join(self.temp_dir, f"merged_{self.spilled:012d}.csv")
+        with open(run_path, "w", encoding="utf-8", newline="") as run_file:
+            writer = csv.writer(run_file)
+            sources = [self._read_run(old_path) for old_path in self.runs]
+            writer.writerows([seq] + row for seq, row in heapq.merge(*sources, key=lambda item: item[0]))
+        for old_path in self.runs:
+            os.remove(old_path)
+        self.runs = [run_path]
+
+    def _read_run(self, run_path):
+        with open(run_path, "r", encoding="utf-8", newline="") as run_file:
+            for row in csv.reader(run_file):
+                yield int(row[0]), row[1:]
+
+    def __iter__(self):
+        sources = [self._read_run(run_path) for run_path in self.runs]
+        sources.append(((self.spilled + i, row) for i, row in enumerate(self.rows)))
+        for _, row in heapq.merge(*sources, key=lambda item: item[0]):
+            yield row
+
+    def close(self):
+        self.rows = []
+        if self.temp_dir is not None:
+            shutil.rmtree(self.temp_dir, ignore_errors=True)
+            self.temp_dir = None
+
+class EncounterSpill:
+    '''
+    Sidecar rows of finished encounters, written to a temporary file under
+    the raw encounter id as each encounter closes. The final encounter
+    numbering is only known once the whole input is read, so the rows are
+    renumbered when they are read back.
+    '''
+
+    def __init__(self, temp_dir=None):
+        self.file = tempfile.TemporaryFile("w+", encoding="utf-8", newline="", dir=temp_dir)
+        self.writer = csv.writer(self.file)
+
+    def add(self, encounter_id, rows):
+        self.writer.writerows([encounter_id] + list(row) for row in rows)
+
+    def __iter__(self):
+        '''(encounter id, row of strings) in the order they were added'''
+        self.file.flush()
+        self.file.seek(0)
+        for row in csv.reader(self.file):
+            yield int(row[0]), row[1:]
+
+    def close(self):
+        self.file.close()
+
+class ProgressFile(io.RawIOBase):
+    '''Binary file that counts the bytes read from disk, for progress reporting'''
+
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.total = os.path.getsize(path)
+        self.bytes_read = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        count = self.file.readinto(buffer)
+        self.bytes_read += count or 0
+        return count
+
+    def seekable(self):
+        return True
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        position = self.file.seek(offset, whence)
+        self.bytes_read = position
+        return position
+
+    def tell(self):
+        return self.file.tell()
+
+    def close(self):
+        self.file.close()
+        super().close()
+
+class OffsetLineReader:
+    '''
+    Iterate the decoded lines of a binary file from a byte offset, tracking
+    where the current line starts and ends. A final line without a newline
+    is still being written, so it is left for the next run.
+    '''
+
+    def __init__(self, file, offset=0):
+        self.file = file
+        self.file.seek(offset)
+        self.line_start = offset
+        self.offset = offset
+
+    def __iter__(self):
+        for raw_line in self.file:
+            if not raw_line.endswith(b"\n"):
+                break
+            self.line_start = self.offset
+            self.offset += len(raw_line)
+            yield raw_line.decode("utf-8")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.file.close()
+
+class StageTimer:
+    '''Busy time of one pipeline stage (summed over its worker threads)'''
+
+    def __init__(self, name, workers=1):
+        self.name = name
+        self.workers = workers
+        self.busy = 0.0
+        self.lock = threading.Lock()
+
+    def add(self, seconds):
+        with self.lock:
+            self.busy += seconds
+
+    def utilization(self, wall_time):
+        return self.busy / (wall_time * self.workers) if wall_time > 0 else 0.0
+
+def utilization_report(timers, wall_time):
+    '''e.g. "reader 4%, parser 91%, filter 12%, writer 7%"'''
+    return ", ".join(f"{timer.name} {timer.utilization(wall_time):.0%}" for timer in timers)
+
+class BlockParsePipeline:
+    '''
+    Overlapped reader -> parser stages for a line-oriented file. A reader
+    thread reads large blocks from a byte offset, cut after the last complete
+    line, and hands each to a pool of parse workers; iterating yields
+    (block end offset, parse_block(data, offset)) in file order. The queue
+    of blocks in flight is bounded, so the reader waits when the consumer
+    falls behind. A final line without a newline is left for the next run.
+    '''
+
+    def __init__(self, path, parse_block, offset=0, parse_workers=1,
+                 block_size=READ_BLOCK_SIZE, queue_blocks=QUEUE_BLOCKS):
+        self.path = Path(path)
+        self.parse_block = parse_block
+        self.offset = offset
+        self.block_size = block_size
+        self.blocks = queue.Queue(maxsize=queue_blocks)
+        self.stop = threading.Event()
+        self.reader_timer = StageTimer("reader")
+        self.parser_timer = StageTimer("parser", parse_workers)
+        self.executor = ThreadPoolExecutor(max_workers=parse_workers, thread_name_prefix="parser")
+        self.thread = None
+
+    def _parse(self, data, offset):
+        start = time.perf_counter()
+        try:
+            return self.parse_block(data, offset)
+        finally:
+            self.parser_timer.add(time.perf_counter() - start)
+
+    def _put(self, item):
+        # Block while the queue is full, but give up once the consumer has stopped
+        while not self.stop.is_set():
+            try:
+                self.blocks.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _read(self):
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(self.offset)
+                offset = self.offset
+                remainder = b""
+                while not self.stop.is_set():
+                    start = time.perf_counter()
+                    data = f.read(self.block_size)
+                    self.reader_timer.add(time.perf_counter() - start)
+                    if not data:
+                        break
+                    data = remainder + data
+                    cut = data.rfind(b"\n") + 1
+                    if cut == 0:
+                        remainder = data
+                        continue
+                    block, remainder = data[:cut], data[cut:]
+                    future = self.executor.submit(self._parse, block, offset)
+                    offset += len(block)
+                    if not self._put((offset, future)):
+                        return
+            self._put(None)
+        except BaseException as e:
+            self._put(e)
+
+    def __iter__(self):
+        self.thread = threading.Thread(target=self._read, name="reader", daemon=True)
+        self.thread.start()
+        while True:
+            item = self.blocks.get()
+            if item is None:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            end_offset, future = item
+            yield end_offset, future.result()
+
+    def close(self):
+        self.stop.set()
+        if self.thread is not None:
+            self.thread.join()
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+class QueuedRowWriter:
+    '''
+    csv.writer on a background thread: writerows() queues a batch and returns
+    at once unless the bounded queue is full. wait() blocks until everything
+    queued is written; errors from the writer thread are raised on the next call.
+    '''
+
+    def __init__(self, file, queue_batches=QUEUE_BLOCKS):
+        self.file = file
+        self.writer = csv.writer(file, quoting=csv.QUOTE_MINIMAL)
+        self.batches = queue.Queue(maxsize=queue_batches)
+        self.timer = StageTimer("writer")
+        self.error = None
+        self.thread = threading.Thread(target=self._write, name="writer", daemon=True)
+        self.thread.start()
+
+    def _write(self):
+        while True:
+            rows = self.batches.get()
+            try:
+                if rows is None:
+                    return
+                if self.error is None:
+                    start = time.perf_counter()
+                    try:
+                        self.writer.writerows(rows)
+                    except Exception as e:
+                        self.error = e
+                    self.timer.add(time.perf_counter() - start)
+            finally:
+                self.batches.task_done()
+
+    def _raise_error(self):
+        if self.error is not None:
+            raise self.error
+
+    def writerows(self, rows):
+        self._raise_error()
+        if rows:
+            self.batches.put(rows)
+
+    def wait(self):
+        self.batches.join()
+        self._raise_error()
+
+    def close(self):
+        self.batches.put(None)
+        self.thread.join()
+        self._raise_error()
+
+def open_reader(path, source=None):
+    '''
+    Open a pipeline CSV for streaming text reads, decompressing by file suffix.
+    source is an already opened binary file for path (e.g. a ProgressFile).
+    '''
+    path = Path(path)
+    if path.suffix == ".gz":
+        return gzip.open(source or path, "rt", encoding="utf-8", newline="")
+    if path.suffix == ".zst":
+        if zstandard is None:
+            raise RuntimeError(f"zstandard is required to read {path.name}")
+        raw = source or open(path, "rb")
+        stream = zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True, closefd=True)
+        return io.TextIOWrapper(stream, encoding="utf-8", newline="")
+    if source is not None:
+        return io.TextIOWrapper(io.BufferedReader(source), encoding="utf-8", newline="")
+    return open(path, "r", encoding="utf-8", newline="")
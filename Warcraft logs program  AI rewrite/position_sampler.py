@@ -0,0 +1,77 @@
+'''
+Position event sampling for fast preview runs.
+
+A preview keeps every encounter, death and aura event but only a sample of
+the position-bearing damage/heal/cast events, which make up most of a log:
+either one in every N of them, or at most one per unit per time bucket.
+The result is small enough to process and load in seconds, which is enough
+to align a map image or pick out the pulls worth a full run.
+'''
+
+# Position-bearing events whose advanced-log unit GUID follows the swing prefix
+SWING_EVENTS = {"SWING_DAMAGE", "SWING_DAMAGE_LANDED"}
+
+def time_of_day(timestamp):
+    '''Seconds since midnight of a "11/24/2024 20:00:01.000" log timestamp, or None'''
+    try:
+        hours, minutes, seconds = timestamp.rsplit(" ", 1)[-1].split(":")
+        # Newer logs append a timezone offset to the seconds, e.g. 01.0000-5
+        seconds = seconds.split("-")[0].split("+")[0]
+        return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+    except ValueError:
+        return None
+
+class PositionSampler:
+    def __init__(self, rate=None, bucket_seconds=None):
+        self.rate = rate                      # keep one in every rate position events
+        self.bucket_seconds = bucket_seconds  # keep one per unit per bucket of this many seconds
+        self.reset()
+
+    def __bool__(self):
+        return bool(self.rate and self.rate > 1) or bool(self.bucket_seconds)
+
+    def reset(self):
+        self.seen = 0
+        self.unit_buckets = {}  # unit GUID -> last bucket kept
+
+    @staticmethod
+    def unit_guid(event_type, row):
+        '''GUID of the unit a position row belongs to (row is [timestamp] + event fields)'''
+        index = 10 if event_type in SWING_EVENTS else 13
+        return row[index] if len(row) > index else row[2]
+
+    def keep(self, event_type, row):
+        '''Decide for a position row, in log order'''
+        if self.rate and self.rate > 1:
+            self.seen += 1
+            if (self.seen - 1) % self.rate:
+                return False
+        if self.bucket_seconds:
+            seconds = time_of_day(row[0])
+            if seconds is None:
+                return True
+            bucket = int(seconds // self.bucket_seconds)
+            guid = self.unit_guid(event_type, row)
+            if self.unit_buckets.get(guid) == bucket:
+                return False
+            self.unit_buckets[guid] = bucket
+        return True
+
+    def describe(self):
+        parts = []
+        if self.rate and self.rate > 1:
+            parts.append(f"1 in {self.rate} position events")
+        if self.bucket_seconds:
+            parts.append(f"1 position per unit per {self.bucket_seconds:g}s")
+        return ", ".join(parts) if parts else "all position events"
+
+    @staticmethod
+    def add_arguments(parser):
+        parser.add_argument("--preview-rate", type=int, default=None,
+                            help="Preview: keep one in every N position events")
+        parser.add_argument("--preview-bucket", type=float, default=None,
+                            help="Preview: keep at most one position event per unit per this many seconds")
+
+    @classmethod
+    def from_args(cls, args):
+        return cls(rate=args.preview_rate, bucket_seconds=args.preview_bucket)
@@ -0,0 +1,94 @@
+'''
+A small synthetic combat log for the pipeline tests: kills and wipes on two
+difficulties, a pull too short to keep, deaths, auras, a boss that moves, a
+pet and a floor change halfway through every pull.
+'''
+import random
+from datetime import datetime, timedelta
+
+PLAYERS = [(f"Player-1-{i:04d}", f"Hero{i}-Realm-EU") for i in range(4)]
+PET = ("Pet-0-1-2-3-999-0001", "Wolfie")
+BOSS = ("Creature-0-1-2-3-100-0001", "Big Boss")
+NO_UNIT = ["0000000000000000", "nil", "0x80000000", "0x80000000"]
+# (difficulty, group size, success, duration in seconds) of each pull; CSVtoCSV drops
+# pulls of 35 s or less, like the fourth
+PULLS = [(16, 20, 1, 45), (16, 20, 0, 40), (15, 20, 1, 42), (16, 20, 0, 20), (16, 20, 1, 44)]
+
+def timestamp(t):
+    return t.strftime("%m/%d/%Y %H:%M:%S.") + f"{t.microsecond // 1000:03d}"
+
+def advanced(guid, owner, x, y, ui_map_id, facing):
+    return [guid, owner] + ["100"] * 12 + [f"{x:.2f}", f"{y:.2f}", str(ui_map_id), f"{facing:.4f}", "70"]
+
+def unit(guid, name, flags="0x511"):
+    return [guid, f'"{name}"', flags, "0x0"]
+
+def log_lines(seed=1):
+    '''The log's lines (without newlines) and the index of each ENCOUNTER_START line'''
+    rng = random.Random(seed)
+    t = datetime(2024, 11, 24, 20, 0, 0)
+    lines = []
+    starts = []
+
+    def add(fields):
+        lines.append(f"{timestamp(t)}  " + ",".join(fields))
+
+    add(["COMBAT_LOG_VERSION", "21", "ADVANCED_LOG_ENABLED", "1"])
+    positions = {guid: [rng.uniform(0, 50), rng.uniform(0, 50)] for guid, _ in PLAYERS}
+    for difficulty, size, success, duration in PULLS:
+        t += timedelta(seconds=20)
+        starts.append(len(lines))
+        add(["ENCOUNTER_START", "2902", f'"{BOSS[1]}"', str(difficulty), str(size), "2657"])
+        start = t
+        shield = ["1234", '"Shield"', "0x1", "BUFF"]
+        add(["SPELL_AURA_APPLIED"] + unit(*PLAYERS[0]) + unit(*PLAYERS[1]) + shield)
+        deaths = 0
+        while (t - start).total_seconds() < duration:
+            t += timedelta(milliseconds=rng.choice([200, 300, 400]))
+            elapsed = (t - start).total_seconds()
+            guid, name = rng.choice(PLAYERS)
+            if rng.random() < 0.5:
+                positions[guid][0] += rng.choice([0, 0, 0.5])
+            x, y = positions[guid]
+            ui_map_id = 2290 if elapsed < duration / 2 else 2291
+            r = rng.random()
+            if r < 0.3:
+                add(["SPELL_CAST_SUCCESS"] + unit(guid, name) + NO_UNIT + ["5000", '"Frostbolt"', "0x10"]
+                    + advanced(guid, "0000000000000000", x, y, ui_map_id, 1.0))
+            elif r < 0.6:
+                add(["SPELL_DAMAGE"] + unit(*BOSS, "0x10a48") + unit(guid, name) + ["6000", '"Slam"', "0x1"]
+                    + advanced(guid, "0000000000000000", x, y, ui_map_id, 2.0)
+                    + ["1000", "0", "-1", "1", "0", "0", "0", "nil", "nil", "nil"])
+            elif r < 0.7:
+                add(["SPELL_DAMAGE"] + unit(guid, name) + unit(*BOSS, "0x10a48") + ["5000", '"Frostbolt"', "0x10"]
+                    + advanced(BOSS[0], "0000000000000000", 25 + elapsed / 10, 25, ui_map_id, 3.0)
+                    + ["1000", "0", "-1", "1", "0", "0", "0", "nil", "nil", "nil"])
+            elif r < 0.8:
+                add(["SWING_DAMAGE"] + unit(*PET, "0x1111") + unit(*BOSS, "0x10a48")
+                    + advanced(PET[0], PLAYERS[2][0], x + 1, y, ui_map_id, 0.5)
+                    + ["100", "0", "-1", "1", "0", "0", "0", "nil", "nil", "nil"])
+            elif r < 0.85:
+                add(["SPELL_AURA_APPLIED_DOSE"] + unit(*BOSS, "0x10a48") + unit(guid, name)
+                    + ["7000", '"Stacks"', "0x1", "DEBUFF", str(rng.randint(2, 5))])
+            elif r < 0.88 and deaths < 2:
+                deaths += 1
+                add(["UNIT_DIED"] + NO_UNIT + unit(guid, name) + ["0"])
+            else:
+                add(["SPELL_AURA_REFRESH"] + unit(*PLAYERS[0]) + unit(*PLAYERS[1]) + shield)
+        add(["SPELL_AURA_REMOVED"] + unit(*PLAYERS[0]) + unit(*PLAYERS[1]) + shield)
+        add(["ENCOUNTER_END", "2902", f'"{BOSS[1]}"', str(difficulty), str(size), str(success),
+             str(duration * 1000)])
+        # Trash between pulls, which belongs to no encounter
+        for _ in range(5):
+            t += timedelta(milliseconds=300)
+            guid, name = PLAYERS[0]
+            add(["SPELL_CAST_SUCCESS"] + unit(guid, name) + NO_UNIT + ["5000", '"Frostbolt"', "0x10"]
+                + advanced(guid, "0000000000000000", 1, 1, 2290, 1.0))
+    return lines, starts
+
+def write_prefix(path, text, cut):
+    '''Write the first cut lines of text plus part of the next, like a log (or CSV) still being written'''
+    lines = text.splitlines(keepends=True)
+    partial = lines[cut][:30] if cut < len(lines) else ""
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write("".join(lines[:cut]) + partial)
@@ -0,0 +1,51 @@
+'''
+The plot_data filter cache evicts the least recently used results once it
+holds more entries or more bytes than allowed.
+'''
+import sys
+from pathlib import Path
+
+import pytest
+
+for module in ("numpy", "pandas", "tkinterdnd2", "seaborn", "matplotlib", "PIL"):
+    pytest.importorskip(module)
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from main_UI import FilterCache
+
+def test_evicts_least_recently_used_by_entry_count():
+    cache = FilterCache(max_entries=3, max_bytes=1000)
+    for key in "abc":
+        cache.put(key, key.upper(), 10)
+    assert cache.get("a") == "A"  # "b" is now the least recently used
+    cache.put("d", "D", 10)
+    assert list(cache.entries) == ["c", "a", "d"]
+    assert cache.get("b") is None
+    assert cache.bytes == 30
+
+def test_evicts_least_recently_used_by_bytes():
+    cache = FilterCache(max_entries=10, max_bytes=100)
+    cache.put("a", "A", 40)
+    cache.put("b", "B", 40)
+    cache.get("a")
+    cache.put("c", "C", 30)
+    assert list(cache.entries) == ["a", "c"]
+    assert cache.bytes == 70
+
+def test_replacing_a_key_updates_its_size():
+    cache = FilterCache(max_entries=10, max_bytes=100)
+    cache.put("a", "A", 60)
+    cache.put("a", "A2", 20)
+    cache.put("b", "B", 70)
+    assert cache.get("a") == "A2" and cache.get("b") == "B"
+    assert cache.bytes == 90
+
+def test_value_larger_than_the_budget_is_not_cached():
+    cache = FilterCache(max_entries=10, max_bytes=100)
+    cache.put("a", "A", 50)
+    cache.put("big", "BIG", 101)
+    assert cache.get("big") is None
+    assert cache.get("a") == "A" and cache.bytes == 50
+    cache.clear()
+    assert cache.get("a") is None and cache.bytes == 0
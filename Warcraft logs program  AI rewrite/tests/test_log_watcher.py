@@ -0,0 +1,112 @@
+'''
+A log that keeps failing is retried with exponential backoff and left alone
+after max_attempts failures, until the file changes.
+'''
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import log_watcher
+
+def failing_run_job(job, events):
+    events.put(("failed", job.id, "filter", "broken log"))
+    return None
+
+def drain(watcher):
+    '''Process everything scan() queued, like the worker thread does'''
+    processed = 0
+    while not watcher.jobs.empty():
+        key, size, mtime = watcher.jobs.get()
+        watcher.process(key, size, mtime)
+        watcher.queued.discard(key)
+        processed += 1
+    return processed
+
+def test_failed_log_backs_off_and_gives_up(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(log_watcher, "run_job", lambda job, events: calls.append(job) or failing_run_job(job, events))
+    clock = [1000.0]
+    monkeypatch.setattr(log_watcher.time, "time", lambda: clock[0])
+
+    logs = tmp_path / "Logs"
+    logs.mkdir()
+    log = logs / "WoWCombatLog.txt"
+    log.write_text("11/24/2024 20:00:00.000  COMBAT_LOG_VERSION,21\n")
+    watcher = log_watcher.LogWatcher(logs, tmp_path / "out", tmp_path / "state.json",
+                                     settle_time=0, retry_delay=10, max_attempts=3)
+
+    watcher.scan()  # first sighting starts the settle timer
+    watcher.scan()
+    assert drain(watcher) == 1
+    entry = watcher.state[str(log)]
+    assert (entry["status"], entry["attempts"], entry["retry_at"]) == ("failed", 1, 1010.0)
+
+    # Nothing is queued again before the backoff runs out
+    clock[0] = 1009.0
+    watcher.scan()
+    assert drain(watcher) == 0
+    clock[0] = 1010.0
+    watcher.scan()
+    assert drain(watcher) == 1
+    assert watcher.state[str(log)]["retry_at"] == 1030.0
+
+    clock[0] = 1030.0
+    watcher.scan()
+    assert drain(watcher) == 1
+    assert watcher.state[str(log)]["attempts"] == 3
+
+    # Given up on until the log changes
+    clock[0] = 1e9
+    watcher.scan()
+    assert drain(watcher) == 0
+    assert len(calls) == 3
+
+    with log.open("a") as f:
+        f.write("11/24/2024 20:00:01.000  ENCOUNTER_START,2902,\"Big Boss\",16,20,2657\n")
+    os.utime(log, (1e9, 1e9))
+    watcher.scan()
+    watcher.scan()
+    assert drain(watcher) == 1
+    assert watcher.state[str(log)]["attempts"] == 1
+
+def test_state_survives_restart(tmp_path, monkeypatch):
+    monkeypatch.setattr(log_watcher, "run_job", failing_run_job)
+    logs = tmp_path / "Logs"
+    logs.mkdir()
+    (logs / "WoWCombatLog.txt").write_text("x\n")
+    watcher = log_watcher.LogWatcher(logs, tmp_path / "out", tmp_path / "state.json",
+                                     settle_time=0, retry_delay=3600)
+    watcher.scan()
+    watcher.scan()
+    assert drain(watcher) == 1
+
+    restarted = log_watcher.LogWatcher(logs, tmp_path / "out", tmp_path / "state.json", settle_time=0)
+    restarted.scan()
+    restarted.scan()
+    assert drain(restarted) == 0
+
+def test_locked_output_folder_is_left_pending(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(log_watcher, "run_job", lambda job, events: calls.append(job) or failing_run_job(job, events))
+    logs = tmp_path / "Logs"
+    logs.mkdir()
+    (logs / "WoWCombatLog.txt").write_text("x\n")
+    watcher = log_watcher.LogWatcher(logs, tmp_path / "out", tmp_path / "state.json", settle_time=0)
+
+    # A launcher job holds the folder the watcher would write
+    launcher_lock = log_watcher.FolderLock(tmp_path / "out" / "WoWCombatLog")
+    assert launcher_lock.acquire()
+    watcher.scan()
+    watcher.scan()
+    assert drain(watcher) == 1
+    assert calls == [] and watcher.state == {}
+
+    launcher_lock.release()
+    watcher.scan()
+    assert drain(watcher) == 1
+    assert len(calls) == 1
+    # Released once the watcher is done with it
+    assert launcher_lock.acquire()
+    launcher_lock.release()
@@ -0,0 +1,92 @@
+'''
+Resuming either stage from its checkpoint, as the log grows between runs,
+must give byte-identical output to one run over the whole input. The cuts
+land inside pulls, so a pull is left open at the checkpoint and its rows are
+truncated and written again; with --kills-only the wipes and the short pull
+are dropped, so the later pulls are renumbered across runs.
+'''
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import CSVtoCSV
+from encounter_filter import EncounterFilter
+from pipeline import load_log_filter
+from sample_log import log_lines, write_prefix
+
+LINES, STARTS = log_lines()
+LOG_TEXT = "\n".join(LINES) + "\n"
+
+# Line counts the input is cut at before each run: inside a pull, right at an
+# ENCOUNTER_START, and several runs each ending inside a different pull
+CUTS = [
+    [STARTS[1] + 40],
+    [STARTS[2]],
+    [STARTS[0] + 10, STARTS[1] + 40, STARTS[3] + 5, STARTS[4] - 3],
+]
+# Every file CSVtoCSV writes next to its output, checkpoint aside
+CSV_OUTPUTS = [".csv", "_units.csv", "_boss_tracks.csv", "_auras.csv", "_positions.csv", ".cols",
+               "_movement_0.1s.cols", "_movement_0.5s.cols", "_movement_2s.cols"]
+
+def filter_log(log_path, output_path, kills_only, resume=False):
+    return load_log_filter().filter_log(log_path, output_path, EncounterFilter(kills_only=kills_only),
+                                        resume=resume)
+
+def process_csv(input_path, output_path, kills_only, resume=False):
+    return CSVtoCSV.load_csv(input_path, output_path, EncounterFilter(kills_only=kills_only), resume=resume)
+
+def run_in_steps(stage, text, cuts, folder, kills_only):
+    '''Run a stage over growing prefixes of text, resuming after the first, then over all of it'''
+    input_path, output_path = folder / "input.txt", folder / "out.csv"
+    for i, cut in enumerate(cuts):
+        write_prefix(input_path, text, cut)
+        assert stage(input_path, output_path, kills_only, resume=i > 0) is not None
+    input_path.write_text(text, encoding="utf-8", newline="")
+    assert stage(input_path, output_path, kills_only, resume=True) is not None
+    return output_path
+
+def reference(tmp_path, name, stage, input_text, kills_only):
+    folder = tmp_path / name
+    folder.mkdir()
+    input_path = folder / "input.txt"
+    input_path.write_text(input_text, encoding="utf-8", newline="")
+    return stage(input_path, folder / "out.csv", kills_only)
+
+@pytest.mark.parametrize("kills_only", [False, True])
+@pytest.mark.parametrize("cuts", CUTS)
+def test_log_filter_resume_matches_full_run(tmp_path, cuts, kills_only):
+    expected = reference(tmp_path, "full", filter_log, LOG_TEXT, kills_only)
+    folder = tmp_path / "steps"
+    folder.mkdir()
+    output_path = run_in_steps(filter_log, LOG_TEXT, cuts, folder, kills_only)
+    assert output_path.read_bytes() == expected.read_bytes()
+
+@pytest.mark.parametrize("kills_only", [False, True])
+@pytest.mark.parametrize("cuts", CUTS)
+def test_csv_processing_resume_matches_full_run(tmp_path, cuts, kills_only):
+    # CSVtoCSV reads the log filter's output, whose rows line up with the log's lines
+    filtered = reference(tmp_path, "filtered", filter_log, LOG_TEXT, kills_only)
+    filtered_text = filtered.read_text(encoding="utf-8")
+    expected = reference(tmp_path, "full", process_csv, filtered_text, kills_only)
+    folder = tmp_path / "steps"
+    folder.mkdir()
+    output_path = run_in_steps(process_csv, filtered_text, cuts, folder, kills_only)
+
+    for suffix in CSV_OUTPUTS:
+        expected_file = expected.with_name(expected.stem + suffix)
+        output_file = output_path.with_name(output_path.stem + suffix)
+        assert output_file.exists() == expected_file.exists(), suffix
+        if expected_file.exists():
+            assert output_file.read_bytes() == expected_file.read_bytes(), suffix
+
+def test_kills_only_renumbers_encounters(tmp_path):
+    filtered = reference(tmp_path, "filtered", filter_log, LOG_TEXT, True)
+    output_path = run_in_steps(process_csv, filtered.read_text(encoding="utf-8"), CUTS[2], tmp_path, True)
+    with open(output_path, encoding="utf-8") as f:
+        header = f.readline().rstrip("\n").split(",")
+        encounter_ids = {line.split(",")[header.index("encounter id")] for line in f}
+    # Three kills, numbered from 1 with no gaps for the dropped wipes
+    assert encounter_ids == {"1", "2", "3"}
@@ -0,0 +1,54 @@
+'''
+Autocomplete ranking: prefix matches come first in alphabetical order, then
+values containing the term elsewhere by where it occurs and their length;
+the result is capped at the limit, and one or two character terms (shorter
+than a trigram) still find substring matches.
+'''
+import sys
+from pathlib import Path
+
+import pytest
+
+for module in ("numpy", "pandas", "tkinterdnd2", "seaborn", "matplotlib", "PIL"):
+    pytest.importorskip(module)
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from main_UI import SearchIndex
+
+NAMES = ["Frostbolt", "Fireball", "Ice Lance", "Frost Nova", "Blizzard", "Frostfire Bolt",
+         "Arcane Frost", "Glacial Spike", "frost"]
+
+def search(index, term, limit=50):
+    return [index.values[i] for i in index.search(term, limit)]
+
+def test_prefix_matches_before_substring_matches():
+    index = SearchIndex(NAMES)
+    # Exact match, then the other prefixes alphabetically, then "Arcane Frost" (term at 7)
+    assert search(index, "Frost") == ["frost", "Frost Nova", "Frostbolt", "Frostfire Bolt", "Arcane Frost"]
+
+def test_substring_matches_by_position_then_length():
+    index = SearchIndex(["xx bolt", "x bolt long", "x bolt", "bolt"])
+    assert search(index, "bolt") == ["bolt", "x bolt", "x bolt long", "xx bolt"]
+
+def test_search_is_case_insensitive():
+    index = SearchIndex(NAMES)
+    assert search(index, "ICE") == ["Ice Lance"]
+
+def test_results_are_capped_at_the_limit():
+    index = SearchIndex([f"Spell {i:03d}" for i in range(200)] + [f"Big Spell {i:03d}" for i in range(10)])
+    assert len(index.search("spell", 20)) == 20
+    # Prefix matches alone fill the limit
+    assert search(index, "spell", 3) == ["Spell 000", "Spell 001", "Spell 002"]
+    # The substring matches fill what the prefix matches leave
+    assert search(index, "spell 00", 12)[10:] == ["Big Spell 000", "Big Spell 001"]
+    assert index.search("", 5) == index.sorted_ids[:5]
+
+@pytest.mark.parametrize("term, expected", [
+    ("a", ["Arcane Frost", "Glacial Spike", "Blizzard", "Fireball", "Ice Lance", "Frost Nova"]),
+    ("bo", ["Frostbolt", "Frostfire Bolt"]),
+])
+def test_short_terms_fall_back_to_scanning(term, expected):
+    # Shorter than a trigram, so every value is scanned for the substring
+    index = SearchIndex(NAMES)
+    assert search(index, term) == expected
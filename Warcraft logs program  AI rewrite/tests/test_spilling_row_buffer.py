@@ -0,0 +1,91 @@
+'''
+SpillingRowBuffer must give back every row in arrival order however many
+times it spilled, and CSVtoCSV under a tiny memory budget must write the
+same files as without one, including when a wipe is rejected after some of
+its rows were already spilled.
+'''
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import CSVtoCSV
+import pipeline_io
+from encounter_filter import EncounterFilter
+from pipeline import load_log_filter
+from pipeline_io import SpillingRowBuffer
+from sample_log import log_lines
+
+def make_rows(count):
+    # Strings, as rows come back from a spilled run
+    return [[str(i), f"row {i}", "x" * (i % 7)] for i in range(count)]
+
+def test_spilled_rows_merge_back_in_order(tmp_path):
+    buffer = SpillingRowBuffer(memory_budget=2000, temp_dir=tmp_path)
+    rows = make_rows(1000)
+    for row in rows:
+        buffer.append(row)
+    assert len(buffer.runs) > 1 and buffer.rows
+    assert len(buffer) == len(rows)
+    assert list(buffer) == rows
+    buffer.close()
+    assert list(tmp_path.iterdir()) == []
+
+def test_compacted_runs_keep_order(tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline_io, "MAX_OPEN_RUNS", 3)
+    buffer = SpillingRowBuffer(memory_budget=500, temp_dir=tmp_path)
+    rows = make_rows(2000)
+    for row in rows:
+        buffer.append(row)
+    assert len(buffer.runs) < 3
+    assert list(buffer) == rows
+    buffer.close()
+
+def test_truncate_after_spill(tmp_path):
+    buffer = SpillingRowBuffer(memory_budget=2000, temp_dir=tmp_path)
+    rows = make_rows(300)
+    for row in rows:
+        buffer.append(row)
+    spilled = buffer.spilled
+    assert 0 < spilled < len(rows)
+
+    # Only rows still in memory are dropped
+    assert buffer.truncate(spilled + 5)
+    assert list(buffer) == rows[:spilled + 5]
+
+    # Rows already on disk can't be dropped: the in-memory tail goes and the caller filters the rest
+    assert not buffer.truncate(spilled - 5)
+    assert len(buffer) == spilled
+    assert list(buffer) == rows[:spilled]
+    buffer.close()
+
+@pytest.fixture(scope="module")
+def filtered_log(tmp_path_factory):
+    '''The log filter's output for the sample log, wipes included'''
+    folder = tmp_path_factory.mktemp("log")
+    log_path = folder / "log.txt"
+    log_path.write_text("\n".join(log_lines()[0]) + "\n", encoding="utf-8", newline="")
+    return load_log_filter().filter_log(log_path, folder / "filtered.csv")
+
+@pytest.mark.parametrize("kills_only", [False, True])
+def test_memory_budget_output_matches_unbudgeted(tmp_path, monkeypatch, filtered_log, kills_only):
+    truncations = []
+    truncate = SpillingRowBuffer.truncate
+    monkeypatch.setattr(SpillingRowBuffer, "truncate",
+                        lambda self, index: truncations.append(truncate(self, index)) or truncations[-1])
+
+    outputs = {}
+    for name, budget in (("unbudgeted", None), ("budgeted", 0.01)):
+        output_path = tmp_path / name / "out.csv"
+        output_path.parent.mkdir()
+        assert CSVtoCSV.load_csv(filtered_log, output_path, EncounterFilter(kills_only=kills_only),
+                                 memory_budget_mb=budget) is not None
+        outputs[name] = {path.name: path.read_bytes() for path in output_path.parent.iterdir()
+                         if not path.name.endswith("_checkpoint.json")}
+
+    assert outputs["budgeted"] == outputs["unbudgeted"]
+    if kills_only:
+        # The wipes were rejected unbudgeted with their rows in memory, and budgeted after some were spilled
+        assert truncations.count(True) == 2 and False in truncations
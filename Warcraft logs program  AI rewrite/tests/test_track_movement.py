@@ -0,0 +1,96 @@
+'''
+The collapsed position runs must give the same movement path as the event
+rows they were built from, including when a death threshold cuts a
+stationary run in half.
+'''
+import sys
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+for module in ("tkinterdnd2", "seaborn", "matplotlib", "PIL"):
+    pytest.importorskip(module)
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from CSVtoCSV import PositionTrackBuilder
+from main_UI import CSVVisualizer
+
+class Value:
+    def __init__(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+# (encounter id, fight time, x, y) of one unit; runs of repeated positions
+# straddle the deaths below
+SAMPLES = [
+    (1, 0.0, 10.0, 10.0), (1, 1.0, 10.0, 10.0), (1, 2.0, 12.0, 10.0),
+    (1, 3.0, 12.0, 10.0), (1, 4.0, 12.0, 10.0), (1, 5.0, 12.0, 10.0),
+    (1, 6.0, 15.0, 11.0), (1, 7.0, 15.0, 11.0),
+    (2, 0.5, 20.0, 20.0), (2, 1.5, 21.0, 20.0), (2, 2.5, 21.0, 20.0),
+    (2, 3.5, 21.0, 20.0), (2, 4.5, 21.0, 20.0),
+]
+# (encounter id, fight time) of each death
+DEATHS = [(1, 3.0), (1, 6.0), (2, 2.5)]
+
+def make_visualizer(tmp_path):
+    builder = PositionTrackBuilder()
+    for enc_id, t, x, y in SAMPLES:
+        builder.add(enc_id, 0, "Hero0-Realm-EU", t, x, y, 1.5, 2290)
+    builder.finish()
+    builder.write(tmp_path / "log_positions.csv", {1: 1, 2: 2})
+
+    visualizer = CSVVisualizer.__new__(CSVVisualizer)
+    visualizer.merge_pets_var = Value(False)
+    visualizer.floor_var = Value("All floors")
+    visualizer.floor_ranges = None
+    visualizer.floor_rows = None
+    visualizer.position_tracks = visualizer.read_position_tracks(tmp_path / "log.csv", None, lambda message: None)
+    deaths = pd.DataFrame(DEATHS, columns=['encounter id', 'relative fight time (s)'])
+    deaths['timestamp'] = pd.Timestamp("2024-11-24 20:00") + pd.to_timedelta(deaths['relative fight time (s)'], unit='s')
+    deaths['unit died sequence'] = range(1, len(deaths) + 1)
+    deaths['death number'] = deaths.groupby('encounter id').cumcount() + 1
+    visualizer.death_table = deaths
+    return visualizer
+
+def row_path(visualizer, death_threshold, min_time=None, max_time=None):
+    '''The row-based path, collapsed to the first and last sample of each stationary run'''
+    rows = pd.DataFrame(SAMPLES, columns=['encounter id', 'relative fight time (s)', 'x', 'y'])
+    times = rows['relative fight time (s)'].to_numpy()
+    keep = times <= visualizer.death_cutoffs(death_threshold, rows['encounter id'].to_numpy(),
+                                              'relative fight time (s)')
+    if min_time is not None:
+        keep &= times >= min_time
+    if max_time is not None:
+        keep &= times <= max_time
+    points = []
+    previous = None
+    for enc_id, t, x, y in rows[keep].itertuples(index=False):
+        if previous is not None and previous[0] == (enc_id, x, y):
+            previous[2] = t
+            continue
+        previous = [(enc_id, x, y), t, t]
+        points.append(previous)
+    expanded = []
+    for (enc_id, x, y), start, end in points:
+        expanded.append((enc_id, start, x, y))
+        if end > start:
+            expanded.append((enc_id, end, x, y))
+    return expanded
+
+@pytest.mark.parametrize("death_threshold", [None, 1, 2])
+def test_track_path_matches_row_path(tmp_path, death_threshold):
+    visualizer = make_visualizer(tmp_path)
+    movement = visualizer.track_movement("Hero0-Realm-EU", death_threshold=death_threshold)
+    points = list(movement[['encounter id', 'relative fight time (s)', 'x', 'y']].itertuples(index=False, name=None))
+    assert points == row_path(visualizer, death_threshold)
+
+def test_track_path_matches_row_path_in_time_window(tmp_path):
+    visualizer = make_visualizer(tmp_path)
+    movement = visualizer.track_movement("Hero0-Realm-EU", [1], death_threshold=2, min_time=2.0, max_time=6.0)
+    points = list(movement[['encounter id', 'relative fight time (s)', 'x', 'y']].itertuples(index=False, name=None))
+    assert points == [point for point in row_path(visualizer, 2, 2.0, 6.0) if point[0] == 1]